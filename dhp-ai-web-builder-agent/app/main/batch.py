@@ -0,0 +1,62 @@
+"""
+Offline batch generation from a JSONL file of generation requests.
+
+Each line is a SimpleGenerationRequest (the /generate body), optionally with an
+"id" (or "request_id") used as its key in the checkpoint and results. Projects
+are generated and packaged exactly like /generate, without going through the API.
+
+Usage (from dhp-ai-web-builder-agent/):
+    python -m app.main.batch requests.jsonl --results results.jsonl
+        [--concurrency 8] [--tpm 400000] [--rpm 240] [--checkpoint PATH]
+        [--retry-failed] [--limit N]
+
+Re-running the same command resumes: lines recorded in the checkpoint
+(default <results>.checkpoint) are skipped, failed ones only with --retry-failed.
+"""
+import argparse
+import asyncio
+import json
+from pathlib import Path
+
+from app.main.configs.MainConfig import settings
+from app.main.services.batch import BatchGenerationService
+from app.main.services.llm_client import get_llm_client
+
+
+async def run(args) -> dict:
+    batch = BatchGenerationService(
+        concurrency=args.concurrency,
+        tokens_per_minute=args.tpm,
+        requests_per_minute=args.rpm
+    )
+    try:
+        return await batch.run(
+            Path(args.requests),
+            Path(args.results),
+            checkpoint_path=Path(args.checkpoint) if args.checkpoint else None,
+            retry_failed=args.retry_failed,
+            limit=args.limit
+        )
+    finally:
+        await get_llm_client().close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("requests", help="JSONL file of generation requests")
+    parser.add_argument("--results", required=True, help="JSONL file the results are appended to")
+    parser.add_argument("--checkpoint", help="checkpoint file (default: <results>.checkpoint)")
+    parser.add_argument("--concurrency", type=int, default=settings.GENERATION_MAX_CONCURRENCY,
+                        help="generations running at once (default: GENERATION_MAX_CONCURRENCY)")
+    parser.add_argument("--tpm", type=int, help="tokens per minute for this batch (default: AZURE_TPM_LIMIT)")
+    parser.add_argument("--rpm", type=int, help="requests per minute for this batch (default: AZURE_RPM_LIMIT)")
+    parser.add_argument("--retry-failed", action="store_true", help="run lines that failed in an earlier run again")
+    parser.add_argument("--limit", type=int, help="generate at most this many pending lines")
+    args = parser.parse_args()
+
+    counts = asyncio.run(run(args))
+    print(json.dumps(counts))
+
+
+if __name__ == "__main__":
+    main()
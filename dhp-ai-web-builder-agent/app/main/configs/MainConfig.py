@@ -17,10 +17,127 @@ class Settings:
     # Paths
     OUTPUT_PATH: str = os.getenv("OUTPUT_PATH")
     BASE_PROJECTS_PATH: str = os.getenv("BASE_PROJECTS_PATH")
-    PROMPTS_PATH: str = os.getenv("PROMPTS_PATH")
+    PROMPTS_PATH: str = os.getenv("PROMPTS_PATH")  # staged pipeline prompts; defaults to the workspace-level prompts/
     SA_CONNECTION: str = os.getenv("SA_CONNECTION")
     SA_SHARE_NAME: str = os.getenv("SA_SHARE_NAME")
 
+    # Azure OpenAI client pool, retries and deployment quota (0 = unlimited)
+    LLM_MAX_CONNECTIONS: int = int(os.getenv("LLM_MAX_CONNECTIONS", "20"))
+    LLM_TIMEOUT_SECONDS: float = float(os.getenv("LLM_TIMEOUT_SECONDS", "600"))
+    LLM_MAX_RETRIES: int = int(os.getenv("LLM_MAX_RETRIES", "5"))
+    LLM_BACKOFF_BASE_SECONDS: float = float(os.getenv("LLM_BACKOFF_BASE_SECONDS", "1"))
+    LLM_BACKOFF_MAX_SECONDS: float = float(os.getenv("LLM_BACKOFF_MAX_SECONDS", "60"))
+    LLM_EXPECTED_COMPLETION_TOKENS: int = int(os.getenv("LLM_EXPECTED_COMPLETION_TOKENS", "16000"))
+    AZURE_TPM_LIMIT: int = int(os.getenv("AZURE_TPM_LIMIT", "0"))
+    AZURE_RPM_LIMIT: int = int(os.getenv("AZURE_RPM_LIMIT", "0"))
+    # Hedged requests: a completion still without a first token (streams) or response after the given percentile
+    # of recent latencies is sent again, to LLM_HEDGE_DEPLOYMENT if set, and the first to answer wins; at most
+    # LLM_HEDGE_BUDGET_RATIO of requests are hedged
+    LLM_HEDGING_ENABLED: bool = os.getenv("LLM_HEDGING_ENABLED", "false").lower() == "true"
+    LLM_HEDGE_DEPLOYMENT: str = os.getenv("LLM_HEDGE_DEPLOYMENT")  # defaults to AZURE_MODEL
+    LLM_HEDGE_PERCENTILE: float = float(os.getenv("LLM_HEDGE_PERCENTILE", "95"))
+    LLM_HEDGE_MIN_DELAY_SECONDS: float = float(os.getenv("LLM_HEDGE_MIN_DELAY_SECONDS", "2"))
+    LLM_HEDGE_MIN_SAMPLES: int = int(os.getenv("LLM_HEDGE_MIN_SAMPLES", "20"))
+    LLM_HEDGE_BUDGET_RATIO: float = float(os.getenv("LLM_HEDGE_BUDGET_RATIO", "0.05"))
+    LLM_HEDGE_BUDGET_BURST: float = float(os.getenv("LLM_HEDGE_BUDGET_BURST", "3"))
+
+    # Generation mode: "single" (one large completion) or "staged" (plan -> pages -> router, React with NucleusCSS)
+    GENERATION_MODE: str = os.getenv("GENERATION_MODE", "single")
+    # Scaffold overlay: the model writes only src/ files and a dependency delta, packaged onto base_projects
+    SCAFFOLD_OVERLAY_ENABLED: bool = os.getenv("SCAFFOLD_OVERLAY_ENABLED", "false").lower() == "true"
+    # Prompt layout: "inline" (request inside the template) or "prefix" (byte-stable template prefix per
+    # framework/language/styling, request-specific values in a final message, for provider prompt caching)
+    PROMPT_LAYOUT: str = os.getenv("PROMPT_LAYOUT", "inline")
+    # Structured output: request the project as JSON matching a schema (files as [{path, content}]) instead of
+    # relying on the prompt; needs a model and API version (2024-08-01-preview or later) that support it,
+    # otherwise generation falls back to plain JSON
+    LLM_STRUCTURED_OUTPUT: bool = os.getenv("LLM_STRUCTURED_OUTPUT", "false").lower() == "true"
+    # Static validation of parsed projects (JSON files, relative import graph, package.json) and
+    # targeted regeneration of only the missing or broken files
+    VALIDATION_ENABLED: bool = os.getenv("VALIDATION_ENABLED", "true").lower() == "true"
+    VALIDATION_REPAIR_ATTEMPTS: int = int(os.getenv("VALIDATION_REPAIR_ATTEMPTS", "1"))
+    VALIDATION_CONTEXT_MAX_CHARS: int = int(os.getenv("VALIDATION_CONTEXT_MAX_CHARS", "40000"))
+    # Incremental edits: characters of existing file content sent as context, attempts to get applicable patches
+    EDIT_CONTEXT_MAX_CHARS: int = int(os.getenv("EDIT_CONTEXT_MAX_CHARS", "60000"))
+    EDIT_MAX_ATTEMPTS: int = int(os.getenv("EDIT_MAX_ATTEMPTS", "2"))
+    PIPELINE_PAGE_CONCURRENCY: int = int(os.getenv("PIPELINE_PAGE_CONCURRENCY", "4"))
+    PIPELINE_PAGE_RETRIES: int = int(os.getenv("PIPELINE_PAGE_RETRIES", "2"))
+
+    # Generation result cache (memory LRU + disk tier under OUTPUT_PATH/cache)
+    GENERATION_CACHE_ENABLED: bool = os.getenv("GENERATION_CACHE_ENABLED", "true").lower() == "true"
+    GENERATION_CACHE_MEMORY_ENTRIES: int = int(os.getenv("GENERATION_CACHE_MEMORY_ENTRIES", "64"))
+    GENERATION_CACHE_DISK_MB: float = float(os.getenv("GENERATION_CACHE_DISK_MB", "512"))
+    GENERATION_CACHE_TTL_SECONDS: float = float(os.getenv("GENERATION_CACHE_TTL_SECONDS", "86400"))
+    # Seconds between mtime checks of instruction templates (negative disables hot reload)
+    TEMPLATE_RELOAD_INTERVAL_SECONDS: float = float(os.getenv("TEMPLATE_RELOAD_INTERVAL_SECONDS", "5"))
+    # Bump to invalidate cached generations after prompt/parsing changes
+    PROMPT_TEMPLATE_VERSION: str = os.getenv("PROMPT_TEMPLATE_VERSION", "1")
+
+    # NucleusCSS prompts: include only the catalog entries relevant to the request (core set + retrieval)
+    NUCLEUS_CONTEXT_COMPACT: bool = os.getenv("NUCLEUS_CONTEXT_COMPACT", "true").lower() == "true"
+    NUCLEUS_CONTEXT_TOKEN_BUDGET: int = int(os.getenv("NUCLEUS_CONTEXT_TOKEN_BUDGET", "800"))
+    NUCLEUS_CATALOG_PATH: str = os.getenv("NUCLEUS_CATALOG_PATH")  # defaults to the workspace-level data/nucleus_css
+
+    # Project packaging: "memory" zips the generated files in a spooled buffer and uploads it directly,
+    # "disk" writes OUTPUT_PATH/projects/<id> and OUTPUT_PATH/zips/<id>.zip first
+    PACKAGING_MODE: str = os.getenv("PACKAGING_MODE", "memory")
+    # Archives larger than this spill from memory to an anonymous temp file while being built
+    PACKAGING_SPOOL_MAX_MB: float = float(os.getenv("PACKAGING_SPOOL_MAX_MB", "16"))
+    # Recently built archives kept in memory to serve downloads without touching disk
+    PACKAGING_MEMORY_CACHE_MB: float = float(os.getenv("PACKAGING_MEMORY_CACHE_MB", "256"))
+
+    # Chunk size used when streaming archives to clients (local disk or file share)
+    DOWNLOAD_CHUNK_SIZE_KB: int = int(os.getenv("DOWNLOAD_CHUNK_SIZE_KB", "1024"))
+
+    # File share uploads: range size (max 4 MB) and parallel ranges per archive
+    STORAGE_UPLOAD_RANGE_MB: float = float(os.getenv("STORAGE_UPLOAD_RANGE_MB", "4"))
+    STORAGE_UPLOAD_CONCURRENCY: int = int(os.getenv("STORAGE_UPLOAD_CONCURRENCY", "4"))
+
+    # Preview launches: shared node_modules cache keyed by the package.json dependency set
+    NODE_MODULES_CACHE_ENABLED: bool = os.getenv("NODE_MODULES_CACHE_ENABLED", "true").lower() == "true"
+    NODE_MODULES_CACHE_PATH: str = os.getenv("NODE_MODULES_CACHE_PATH")  # defaults to OUTPUT_PATH/node_modules_cache
+    NODE_MODULES_CACHE_MAX_GB: float = float(os.getenv("NODE_MODULES_CACHE_MAX_GB", "10"))
+    NPM_INSTALL_TIMEOUT_SECONDS: float = float(os.getenv("NPM_INSTALL_TIMEOUT_SECONDS", "600"))
+
+    # Preview launches: local cache of project archives downloaded from the file share (archives packaged by
+    # this process are taken from the in-memory archive cache or OUTPUT_PATH/zips instead)
+    ZIP_CACHE_ENABLED: bool = os.getenv("ZIP_CACHE_ENABLED", "true").lower() == "true"
+    ZIP_CACHE_PATH: str = os.getenv("ZIP_CACHE_PATH")  # defaults to OUTPUT_PATH/zip_cache
+    ZIP_CACHE_MAX_MB: float = float(os.getenv("ZIP_CACHE_MAX_MB", "2048"))
+
+    # Preview supervisor: port range, concurrency cap, readiness and idle reaping
+    PREVIEW_PORT_START: int = int(os.getenv("PREVIEW_PORT_START", "5173"))
+    PREVIEW_PORT_END: int = int(os.getenv("PREVIEW_PORT_END", "5299"))
+    PREVIEW_MAX_CONCURRENT: int = int(os.getenv("PREVIEW_MAX_CONCURRENT", "8"))
+    PREVIEW_READY_TIMEOUT_SECONDS: float = float(os.getenv("PREVIEW_READY_TIMEOUT_SECONDS", "180"))
+    PREVIEW_IDLE_TIMEOUT_SECONDS: float = float(os.getenv("PREVIEW_IDLE_TIMEOUT_SECONDS", "1800"))
+    PREVIEW_REAP_INTERVAL_SECONDS: float = float(os.getenv("PREVIEW_REAP_INTERVAL_SECONDS", "30"))
+
+    # Stream completions and publish per-file progress events
+    LLM_STREAMING: bool = os.getenv("LLM_STREAMING", "true").lower() == "true"
+    # Ask for a final usage chunk on streams (token metrics); needs API version 2024-09-01-preview or later
+    LLM_STREAM_INCLUDE_USAGE: bool = os.getenv("LLM_STREAM_INCLUDE_USAGE", "true").lower() == "true"
+    SSE_HEARTBEAT_SECONDS: float = float(os.getenv("SSE_HEARTBEAT_SECONDS", "15"))
+
+    # Generation status store: "memory" (single process) or "sqlite" (WAL, shared by workers on a volume)
+    STATUS_STORE_BACKEND: str = os.getenv("STATUS_STORE_BACKEND", "memory")
+    STATUS_STORE_PATH: str = os.getenv("STATUS_STORE_PATH")  # defaults to OUTPUT_PATH/status.db
+    STATUS_FLUSH_INTERVAL_SECONDS: float = float(os.getenv("STATUS_FLUSH_INTERVAL_SECONDS", "1"))
+    STATUS_TTL_SECONDS: float = float(os.getenv("STATUS_TTL_SECONDS", "86400"))
+    STATUS_EVICTION_INTERVAL_SECONDS: float = float(os.getenv("STATUS_EVICTION_INTERVAL_SECONDS", "300"))
+    # Unfinished jobs without a status update for this long (e.g. their process restarted) are marked failed
+    STATUS_STALE_SECONDS: float = float(os.getenv("STATUS_STALE_SECONDS", "3600"))
+
+    # Generation job queue
+    GENERATION_MAX_CONCURRENCY: int = int(os.getenv("GENERATION_MAX_CONCURRENCY", "4"))
+    GENERATION_QUEUE_SIZE: int = int(os.getenv("GENERATION_QUEUE_SIZE", "32"))
+    # Attach identical in-flight requests to the running generation instead of starting a new one
+    GENERATION_COALESCE_ENABLED: bool = os.getenv("GENERATION_COALESCE_ENABLED", "true").lower() == "true"
+    GENERATION_ETA_DEFAULT_SECONDS: float = float(os.getenv("GENERATION_ETA_DEFAULT_SECONDS", "180"))
+
+    # OpenTelemetry spans per generation stage (needs opentelemetry installed and configured)
+    TRACING_ENABLED: bool = os.getenv("TRACING_ENABLED", "false").lower() == "true"
+
     def __init__(self):
         # Ensure output directory exists
         os.makedirs(self.OUTPUT_PATH, exist_ok=True)
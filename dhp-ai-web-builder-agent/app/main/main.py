@@ -1,13 +1,29 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
-from .routers import generator, process
+from .routers import generator, metrics, process
+from .services.llm_client import get_llm_client
 from fastapi.middleware.cors import CORSMiddleware
 
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await generator.status_store.start()
+    await generator.generation_queue.start()
+    await process.preview_supervisor.start()
+    yield
+    await process.preview_supervisor.stop()
+    generator.fail_abandoned_jobs(await generator.generation_queue.stop())
+    await generator.status_store.stop()
+    await get_llm_client().close()
+
+
 def create_app() -> FastAPI:
     app = FastAPI(
         title="AI Web Builder",
         description="Generate modern web applications with AI",
-        version="1.0.0"
+        version="1.0.0",
+        lifespan=lifespan
     )
 
     app.add_middleware(
@@ -21,6 +37,7 @@ def create_app() -> FastAPI:
     # Include routers
     app.include_router(generator.router)
     app.include_router(process.router)
+    app.include_router(metrics.router)
     return app
 
 
@@ -1,26 +1,44 @@
-from fastapi import APIRouter, HTTPException
-from fastapi.responses import FileResponse
+import asyncio
+import contextlib
+import time
+from fastapi import APIRouter, Header, HTTPException, Request
+from fastapi.responses import Response, StreamingResponse
 from datetime import datetime
-from typing import Dict
-import os
+from typing import List, Optional
 
-from app.main.services.models import SimpleGenerationRequest, GenerationStatus
+from app.main.services import metrics
+from app.main.services.models import SimpleGenerationRequest, GenerationStatus, ProjectEditRequest
 from app.main.services.generator import SimpleGeneratorService
 from app.main.services.project_manager import ProjectManagerService
+from app.main.services.editor import ProjectEditService
+from app.main.services.downloads import DownloadService, RangeNotSatisfiableError
+from app.main.services.job_queue import GenerationQueueService, QueueFullError, QueueClosedError
+from app.main.services.events import GenerationEventBus
+from app.main.services.status_store import TERMINAL_STATUSES, create_status_store
+from app.main.services.single_flight import InflightRegistry, new_generation_id, request_fingerprint
+from app.main.configs.MainConfig import settings
 
 router = APIRouter(prefix="/v1/generator", tags=["generator"])
 
 # Initialize services
 simple_generator = SimpleGeneratorService()
 project_manager = ProjectManagerService()
+download_service = DownloadService(project_manager)
+project_editor = ProjectEditService(project_manager, download_service)
+generation_queue = GenerationQueueService()
+event_bus = GenerationEventBus()
+inflight_generations = InflightRegistry()
 
-# In-memory storage for generation status
-generation_status: Dict[str, GenerationStatus] = {}
+# Generation status store (memory or SQLite, see STATUS_STORE_BACKEND)
+status_store = create_status_store()
+# Jobs still waiting in (or run by) the queue are never failed as stale
+status_store.job_is_active = generation_queue.holds
 
 
 @router.post("/generate", summary="Generate React or Vue project with AI")
 async def generate_project_freely(
-    request: SimpleGenerationRequest
+    request: SimpleGenerationRequest,
+    idempotency_key: Optional[str] = Header(default=None, max_length=255)
 ):
     """
     Generate a complete React or Vue project with AI assistance.
@@ -33,6 +51,9 @@ async def generate_project_freely(
     - framework: React or Vue
     - language: JavaScript or TypeScript
     - styling: TailwindCSS or NucleusCSS
+    - mode: optional, "single" or "staged" (plan, parallel pages, router; React with NucleusCSS only)
+    - bypass_cache: optional, skip the generation cache and always generate fresh
+    - scaffold_overlay: optional, generate only src/ files on top of the base project scaffold
 
     The AI will handle:
     - Project structure and architecture
@@ -40,100 +61,489 @@ async def generate_project_freely(
     - Styling and responsive design (Tailwind CSS or Nucleus CSS)
     - Modern framework patterns and best practices
     - Complete working application with all necessary files
+
+    The request returns immediately with a generation_id; poll
+    /status/{generation_id} for queue position, ETA and progress.
+
+    Send an Idempotency-Key header to make retries safe: a repeated key returns
+    the original generation. Identical requests that arrive while a matching
+    generation is still queued or running are attached to it ("coalesced": true).
     """
-    generation_id = f"simple_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+    fingerprint = request_fingerprint(request)
+    generation_id = new_generation_id()
+
+    # A retried request with the same Idempotency-Key gets the original generation back
+    if idempotency_key:
+        owner_id, owner_fingerprint = await status_store.reserve_idempotency_key(
+            idempotency_key, fingerprint, generation_id
+        )
+        if owner_id != generation_id:
+            if owner_fingerprint != fingerprint:
+                raise HTTPException(status_code=422, detail="Idempotency-Key was already used for a different request")
+            existing = status_store.get(owner_id)
+            if existing is not None:
+                return generation_response(existing, replayed=True)
+            # The original generation expired or was rejected: take the key over
+            await status_store.release_idempotency_key(idempotency_key)
+            await status_store.reserve_idempotency_key(idempotency_key, fingerprint, generation_id)
+
+    # An identical request already queued or running: attach to it instead of spending another LLM run
+    if settings.GENERATION_COALESCE_ENABLED:
+        inflight_id = inflight_generations.attach(fingerprint, is_live=job_in_progress)
+        existing = status_store.get(inflight_id) if inflight_id else None
+        if existing is not None:
+            if idempotency_key:
+                await status_store.release_idempotency_key(idempotency_key)
+                await status_store.reserve_idempotency_key(idempotency_key, fingerprint, inflight_id)
+            return generation_response(existing, coalesced=True)
 
     # Initialize status
-    generation_status[generation_id] = GenerationStatus(
+    status = GenerationStatus(
         id=generation_id,
-        status="starting",
+        status="queued",
+        progress=0,
+        message=f"Your {request.styling} project is waiting for a free generation slot...",
+        created_at=datetime.now()
+    )
+    status_store.save(status, immediate=True)
+    inflight_generations.register(fingerprint, generation_id)
+    publish_status(generation_id)
+
+    # Hand the job to the worker pool and return immediately
+    try:
+        status.queue_position = await generation_queue.submit(
+            generation_id,
+            lambda: generate_project_background(generation_id, request)
+        )
+    except (QueueFullError, QueueClosedError) as e:
+        status_store.delete(generation_id)
+        inflight_generations.release(generation_id)
+        if idempotency_key:
+            await status_store.release_idempotency_key(idempotency_key)
+        if isinstance(e, QueueClosedError):
+            raise HTTPException(status_code=503, detail=str(e))
+        raise HTTPException(
+            status_code=429,
+            detail=str(e),
+            headers={"Retry-After": str(generation_queue.retry_after())}
+        )
+
+    status.eta_seconds = generation_queue.estimate_wait(generation_id)
+    return generation_response(status)
+
+
+@router.post("/edit/{generation_id}", summary="Apply a change request to a generated project")
+async def edit_project(generation_id: str, request: ProjectEditRequest):
+    """
+    Apply a change request to an existing project and package it as a new revision.
+
+    The project is loaded from the archive store (or OUTPUT_PATH/projects/<id>); the
+    AI sees the list of files and only the files relevant to the change, and returns
+    per-file patches. The new revision's zip reuses every unchanged entry.
+
+    generation_id may be a generation id or a project id (e.g. an earlier revision).
+    Like /generate, the request returns immediately with a new generation_id to poll.
+    """
+    base = status_store.get(generation_id)
+    project_id, download_path = generation_id, None
+    if base is not None:
+        if base.status != "completed" or not base.project_info:
+            raise HTTPException(status_code=409, detail="Project is not ready for editing")
+        project_id, download_path = base.project_info.id, base.project_info.download_path
+    if not await project_editor.project_exists(project_id, download_path):
+        raise HTTPException(status_code=404, detail="Project not found")
+
+    edit_id = new_generation_id()
+    status = GenerationStatus(
+        id=edit_id,
+        status="queued",
         progress=0,
-        message=f"AI is preparing to create your project with {request.styling} styling...",
+        message="Your change request is waiting for a free generation slot...",
         created_at=datetime.now()
     )
+    status_store.save(status, immediate=True)
+    publish_status(edit_id)
+
+    try:
+        status.queue_position = await generation_queue.submit(
+            edit_id,
+            lambda: edit_project_background(edit_id, project_id, download_path, request)
+        )
+    except (QueueFullError, QueueClosedError) as e:
+        status_store.delete(edit_id)
+        if isinstance(e, QueueClosedError):
+            raise HTTPException(status_code=503, detail=str(e))
+        raise HTTPException(
+            status_code=429,
+            detail=str(e),
+            headers={"Retry-After": str(generation_queue.retry_after())}
+        )
 
-    # Start background generation
-    response = await generate_project_background(generation_id, request)
-    print(response)
+    status.eta_seconds = generation_queue.estimate_wait(edit_id)
+    return generation_response(status)
 
-    return response.project_info.__dict__
+
+def job_in_progress(generation_id: str) -> bool:
+    """True while a generation is queued or running"""
+    status = status_store.get(generation_id)
+    return status is not None and status.status not in TERMINAL_STATUSES
+
+
+def generation_response(status: GenerationStatus, coalesced: bool = False, replayed: bool = False) -> dict:
+    """Body returned by /generate, for new, coalesced and idempotent-replay requests alike"""
+    if status.status not in ("completed", "failed") and status_store.is_local(status.id):
+        status.queue_position = generation_queue.position(status.id)
+        status.eta_seconds = generation_queue.estimate_wait(status.id)
+    return {
+        "generation_id": status.id,
+        "status": status.status,
+        "queue_position": status.queue_position,
+        "eta_seconds": status.eta_seconds,
+        "status_url": f"{router.prefix}/status/{status.id}",
+        "coalesced": coalesced,
+        "replayed": replayed
+    }
 
 
 @router.get("/status/{generation_id}", summary="Get generation status")
 async def get_generation_status(generation_id: str):
     """Get generation status"""
-    if generation_id not in generation_status:
+    status = status_store.get(generation_id)
+    if status is None:
         raise HTTPException(status_code=404, detail="Generation not found")
 
-    return generation_status[generation_id]
+    if status.status not in ("completed", "failed") and status_store.is_local(generation_id):
+        status.queue_position = generation_queue.position(generation_id)
+        status.eta_seconds = generation_queue.estimate_wait(generation_id)
+    return status
 
 
-@router.get("/download/{generation_id}", summary="Download generated project")
-async def download_project(generation_id: str):
-    """Download project as zip file"""
-    if generation_id not in generation_status:
+@router.get("/events/{generation_id}", summary="Stream generation events (SSE)")
+async def stream_generation_events(generation_id: str):
+    """
+    Server-Sent Events stream for a generation.
+
+    Events:
+    - status: progress updates (same shape as /status)
+    - file: a generated file, emitted as soon as the AI finishes writing it
+    - completed / failed: terminal event, the stream closes afterwards
+    """
+    status = None if event_bus.has_stream(generation_id) else status_store.get(generation_id)
+    if status is None and not event_bus.has_stream(generation_id):
         raise HTTPException(status_code=404, detail="Generation not found")
 
-    status = generation_status[generation_id]
-    if status.status != "completed" or not status.project_info:
-        raise HTTPException(status_code=400, detail="Project not ready for download")
+    # Only jobs with a history or still running here will publish to the bus
+    if status is None or status_store.is_local(generation_id) and status.status not in TERMINAL_STATUSES:
+        messages = event_bus.subscribe(generation_id, heartbeat=settings.SSE_HEARTBEAT_SECONDS)
+    else:
+        messages = stored_status_events(generation_id, status)
+
+    async def event_source():
+        async for message in messages:
+            yield event_bus.format_sse(message)
+
+    return StreamingResponse(
+        event_source(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@router.get("/cache", summary="Get generation cache statistics")
+async def get_cache_stats():
+    """Get generation cache hit/miss counters"""
+    if simple_generator.cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **simple_generator.cache.stats()}
+
+
+@router.get("/statuses", summary="Get generation status store statistics")
+async def get_status_store_stats():
+    """Get status store backend, batching and eviction counters"""
+    return status_store.stats()
 
-    zip_path = await project_manager.get_project_zip(status.project_info.id)
-    if not zip_path or not os.path.exists(zip_path):
+
+@router.get("/queue", summary="Get generation queue statistics")
+async def get_queue_stats():
+    """Get worker pool, queue and request coalescing statistics"""
+    return {**generation_queue.stats(), "single_flight": inflight_generations.stats()}
+
+
+@router.get("/download/{generation_id}", summary="Download generated project")
+async def download_project(generation_id: str, request: Request):
+    """
+    Stream the project zip in chunks with ETag / If-None-Match and single Range support.
+    Served from this replica when possible, otherwise from the Azure file share,
+    so any replica can serve any download.
+    """
+    status = status_store.get(generation_id)
+    download_path = None
+    if status is not None:
+        if status.status != "completed" or not status.project_info:
+            raise HTTPException(status_code=400, detail="Project not ready for download")
+        download_path = status.project_info.download_path
+        generation_id = status.project_info.id
+
+    source = await download_service.resolve(generation_id, download_path)
+    if source is None:
         raise HTTPException(status_code=404, detail="Project file not found")
 
-    return FileResponse(
-        zip_path,
+    headers = {
+        "ETag": source.etag,
+        "Accept-Ranges": "bytes",
+        "Content-Disposition": f'attachment; filename="{generation_id}.zip"'
+    }
+    if download_service.etag_matches(request.headers.get("if-none-match"), source.etag):
+        return Response(status_code=304, headers=headers)
+
+    byte_range = None
+    if_range = request.headers.get("if-range")
+    if if_range is None or download_service.if_range_matches(if_range, source.etag):
+        try:
+            byte_range = download_service.parse_range(request.headers.get("range"), source.size)
+        except RangeNotSatisfiableError:
+            return Response(status_code=416, headers={**headers, "Content-Range": f"bytes */{source.size}"})
+
+    if byte_range is None:
+        start, end, status_code = 0, source.size - 1, 200
+    else:
+        (start, end), status_code = byte_range, 206
+        headers["Content-Range"] = f"bytes {start}-{end}/{source.size}"
+    headers["Content-Length"] = str(end - start + 1)
+
+    return StreamingResponse(
+        source.iter_range(start, end),
+        status_code=status_code,
         media_type="application/zip",
-        filename=f"{generation_id}.zip"
+        headers=headers
     )
 
 
 async def generate_project_background(generation_id: str, request: SimpleGenerationRequest):
     """Background task for free-form project generation"""
-    try:
-        status = generation_status[generation_id]
+    with metrics.generation_context(request.framework, request.language, request.styling), \
+            metrics.span("generation", generation_id=generation_id):
+        return await run_generation(generation_id, request)
+
 
+async def run_generation(generation_id: str, request: SimpleGenerationRequest):
+    """Generate and package one project, keeping its status up to date"""
+    status = status_store.get(generation_id)
+    try:
         # Update status
         status.status = "generating"
+        status.started_at = datetime.now()
+        metrics.observe_stage("queue_wait", (status.started_at - status.created_at).total_seconds())
+        status.queue_position = 0
         status.progress = 50
         status.message = f"AI is designing and building your project with {request.styling} styling..."
+        publish_status(generation_id)
+        files_streamed = []
+
+        def on_file(path: str, content: str):
+            files_streamed.append(path)
+            event_bus.publish(generation_id, "file", {
+                "index": len(files_streamed),
+                "path": path,
+                "size": len(content),
+                "content": content
+            })
 
         # Generate complete project with AI freedom
-        project_result = await simple_generator.generate_complete_project(
-            request.instructions,
-            request.framework,
-            request.language,
-            request.styling,
-            request.projectName,  # Pass user-provided project name
-            progress_callback=lambda p, m: update_progress(generation_id, p, m)
-        )
+        with metrics.track_usage() as token_usage:
+            status.token_usage = token_usage
+            project_result = await simple_generator.generate_complete_project(
+                request.instructions,
+                request.framework,
+                request.language,
+                request.styling,
+                request.projectName,  # Pass user-provided project name
+                progress_callback=lambda p, m: update_progress(generation_id, p, m),
+                file_callback=on_file,
+                mode=request.mode,
+                bypass_cache=request.bypass_cache,
+                scaffold_overlay=request.scaffold_overlay
+            )
 
         # Package the project
         status.status = "packaging"
         status.progress = 90
         status.message = "Finalizing project..."
+        publish_status(generation_id)
 
-        project_info = await project_manager.package_simple_project(
-            generation_id,
-            project_result
-        )
+        with metrics.stage_timer("package"):
+            project_info = await project_manager.package_simple_project(
+                generation_id,
+                project_result
+            )
 
         # Complete
         status.status = "completed"
         status.progress = 100
         status.message = "Project created successfully!"
         status.project_info = project_info
+        status.completed_at = datetime.now()
 
     except Exception as e:
         status.status = "failed"
         status.message = f"Generation failed: {str(e)}"
         status.error = str(e)
+        status.completed_at = datetime.now()
+    finally:
+        status.queue_position = None
+        status.eta_seconds = None
+    status_store.save(status)
+    inflight_generations.release(generation_id)
+    metrics.GENERATIONS.inc(status=status.status, **metrics.generation_labels())
+    event_bus.publish(generation_id, status.status, status.model_dump(mode="json"))
+    return status
+
+
+async def edit_project_background(
+    edit_id: str,
+    project_id: str,
+    download_path: Optional[str],
+    request: ProjectEditRequest
+):
+    """Background task for incremental project edits"""
+    with metrics.span("edit", generation_id=edit_id, project_id=project_id):
+        return await run_edit(edit_id, project_id, download_path, request)
+
+
+async def run_edit(edit_id: str, project_id: str, download_path: Optional[str], request: ProjectEditRequest):
+    """Patch one stored project and package the result as a new revision, keeping its status up to date"""
+    status = status_store.get(edit_id)
+    project = None
+    with contextlib.ExitStack() as labels:
+        try:
+            status.status = "editing"
+            status.started_at = datetime.now()
+            metrics.observe_stage("queue_wait", (status.started_at - status.created_at).total_seconds())
+            status.queue_position = 0
+            status.progress = 10
+            status.message = "Loading your project..."
+            publish_status(edit_id)
+
+            project = await project_editor.load_project(project_id, download_path)
+            if project is None:
+                raise FileNotFoundError(f"Project {project_id} not found")
+            labels.enter_context(metrics.generation_context(
+                project.info.get("framework"), project.info.get("language"), project.info.get("styling")
+            ))
+
+            with metrics.track_usage() as token_usage:
+                status.token_usage = token_usage
+                result = await project_editor.edit_project(
+                    project,
+                    request.instructions,
+                    progress_callback=lambda p, m: update_progress(edit_id, p, m)
+                )
+            for path, content in result.changes.items():
+                event_bus.publish(edit_id, "file", {
+                    "path": path,
+                    "deleted": content is None,
+                    "size": len(content or ""),
+                    "content": content
+                })
+
+            status.status = "packaging"
+            status.progress = 90
+            status.message = f"Updating {len(result.changes)} files in a new revision..."
+            publish_status(edit_id)
+
+            with metrics.stage_timer("package"):
+                project_info = await project_manager.package_project_revision(
+                    edit_id,
+                    project.archive,
+                    project.info,
+                    result.changes,
+                    result.files,
+                    request.instructions
+                )
+
+            status.status = "completed"
+            status.progress = 100
+            status.message = result.summary or "Project updated successfully!"
+            status.project_info = project_info
+            status.completed_at = datetime.now()
+
+        except Exception as e:
+            status.status = "failed"
+            status.message = f"Edit failed: {str(e)}"
+            status.error = str(e)
+            status.completed_at = datetime.now()
+        finally:
+            status.queue_position = None
+            status.eta_seconds = None
+            if project is not None:
+                project.close()
+        status_store.save(status)
+        metrics.GENERATIONS.inc(status=status.status, **metrics.generation_labels())
+    event_bus.publish(edit_id, status.status, status.model_dump(mode="json"))
     return status
 
 
+def fail_abandoned_jobs(job_ids: List[str]):
+    """Mark jobs the queue dropped at shutdown as failed so clients stop waiting on them"""
+    for job_id in job_ids:
+        status = status_store.get(job_id)
+        if status is None or status.status in TERMINAL_STATUSES:
+            continue
+        status.status = "failed"
+        status.error = "The server shut down before the job finished"
+        status.message = f"Job failed: {status.error}"
+        status.completed_at = datetime.now()
+        status.queue_position = None
+        status.eta_seconds = None
+        status_store.save(status)
+        inflight_generations.release(job_id)
+        event_bus.publish(job_id, status.status, status.model_dump(mode="json"))
+
+
+async def stored_status_events(generation_id: str, status: Optional[GenerationStatus]):
+    """
+    Events for a job without an event history in this process (its stream was dropped from the
+    history, or it ran in another worker or before a restart): the stored status, polled until
+    it is terminal.
+    """
+    published = None
+    last_sent = time.monotonic()
+    while status is not None:
+        if status.status in TERMINAL_STATUSES:
+            yield {"event": status.status, "data": status.model_dump(mode="json")}
+            return
+        if (status.status, status.progress, status.message) != published:
+            published = (status.status, status.progress, status.message)
+            last_sent = time.monotonic()
+            yield {"event": "status", "data": status_event(status)}
+        elif time.monotonic() - last_sent >= settings.SSE_HEARTBEAT_SECONDS:
+            last_sent = time.monotonic()
+            yield None
+        await asyncio.sleep(settings.STATUS_FLUSH_INTERVAL_SECONDS)
+        status = status_store.get(generation_id)
+
+
 def update_progress(generation_id: str, progress: int, message: str):
     """Update generation progress"""
-    if generation_id in generation_status:
-        generation_status[generation_id].progress = progress
-        generation_status[generation_id].message = message
+    status = status_store.get(generation_id)
+    if status is not None:
+        status.progress = progress
+        status.message = message
+        publish_status(generation_id)
+
+
+def publish_status(generation_id: str):
+    """Publish the current status of a generation to SSE subscribers and mark it for the next store flush"""
+    status = status_store.get(generation_id)
+    status_store.save(status)
+    event_bus.publish(generation_id, "status", status_event(status))
+
+
+def status_event(status: GenerationStatus) -> dict:
+    """Payload of a "status" event"""
+    return {
+        "id": status.id,
+        "status": status.status,
+        "progress": status.progress,
+        "message": status.message
+    }
@@ -0,0 +1,13 @@
+from fastapi import APIRouter
+from fastapi.responses import Response
+
+from app.main.services.metrics import registry
+
+
+router = APIRouter(tags=["metrics"])
+
+
+@router.get("/metrics", summary="Prometheus metrics")
+async def get_metrics():
+    """Per-stage latency histograms and token counters of this process, in Prometheus text format"""
+    return Response(registry.render(), media_type=registry.CONTENT_TYPE)
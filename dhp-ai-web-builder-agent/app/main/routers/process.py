@@ -1,31 +1,73 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
 from typing import Optional
 
+from app.main.routers.generator import project_manager
+from app.main.services.preview_supervisor import PortUnavailableError, PreviewCapacityError, PreviewSupervisor
 from app.main.services.process import ProcessService
 
 
 router = APIRouter(prefix="/v1/process", tags=["process"])
-process_service = ProcessService()
+preview_supervisor = PreviewSupervisor()
+process_service = ProcessService(preview_supervisor, project_manager)
 
 
 class CreateLaunchProjectDTO(BaseModel):
     file_path: Optional[str] = None
-    live_preview_port: Optional[int] = None
+    live_preview_port: Optional[int] = None  # allocated from PREVIEW_PORT_START-PREVIEW_PORT_END when omitted
     live_preview_path: Optional[str] = None
+    wait_ready: bool = True
 
 
 class CreateStopProjectDTO(BaseModel):
-    pid: Optional[int] = None
+    pid: Optional[int] = None  # legacy: the preview port
+    preview_id: Optional[str] = None
 
 
 @router.post("/launch", summary="Launch a Project")
-def launch_project(request_body: CreateLaunchProjectDTO):
-    process_service.launch_project(request_body)
-    return {"message": "Project launched successfully"}
+async def launch_project(request_body: CreateLaunchProjectDTO):
+    try:
+        result = await process_service.launch_project(request_body)
+    except PreviewCapacityError as e:
+        raise HTTPException(status_code=429, detail=str(e))
+    except PortUnavailableError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+    if result.get("status") == "exited":
+        raise HTTPException(status_code=500, detail=f"Preview exited with code {result['exit_code']} during startup")
+    return result
+
+
+@router.get("/previews", summary="List running previews")
+async def list_previews():
+    return {"previews": preview_supervisor.list(), **preview_supervisor.stats()}
+
+
+@router.get("/previews/{preview_id}", summary="Get preview status")
+async def get_preview(preview_id: str):
+    preview = preview_supervisor.get(preview_id)
+    if preview is None:
+        raise HTTPException(status_code=404, detail="Preview not found")
+    return preview.to_dict()
+
+
+@router.get("/node-modules-cache", summary="Get node_modules cache statistics")
+def get_node_modules_cache_stats():
+    if process_service.node_modules_cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **process_service.node_modules_cache.stats()}
+
+
+@router.get("/zip-cache", summary="Get project archive cache statistics")
+def get_zip_cache_stats():
+    if process_service.zip_cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **process_service.zip_cache.stats()}
 
 
 @router.post("/stop", summary="Stop a Project")
-def launch_project(request_body: CreateStopProjectDTO):
-    process_service.stop_project(request_body)
-    return {"message": "Project stopped successfully"}
+async def stop_project(request_body: CreateStopProjectDTO):
+    result = await process_service.stop_project(request_body)
+    if result is None:
+        raise HTTPException(status_code=404, detail="Preview not found")
+    return result
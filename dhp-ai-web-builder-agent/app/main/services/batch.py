@@ -0,0 +1,241 @@
+import asyncio
+import json
+import logging
+import os
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Iterator, Optional, Set, Tuple
+
+from pydantic import ValidationError
+
+from app.main.services import metrics
+from app.main.services.generator import SimpleGeneratorService
+from app.main.services.llm_client import RateLimitScheduler, get_llm_client
+from app.main.services.models import SimpleGenerationRequest
+from app.main.services.project_manager import ProjectManagerService
+from app.main.services.single_flight import new_generation_id
+
+
+class BatchCheckpoint:
+    """
+    Keys of finished batch lines, rewritten atomically after every job so an
+    interrupted batch resumes where it stopped.
+    """
+
+    def __init__(self, path: Path, requests_path: Path):
+        self.path = path
+        self.requests_path = requests_path
+        self.completed: Set[str] = set()
+        self.failed: Set[str] = set()
+        if path.exists():
+            data = json.loads(path.read_text(encoding="utf-8"))
+            self.completed = set(data.get("completed", []))
+            self.failed = set(data.get("failed", []))
+
+    def done(self, key: str, retry_failed: bool = False) -> bool:
+        return key in self.completed or (key in self.failed and not retry_failed)
+
+    def record(self, key: str, succeeded: bool):
+        if succeeded:
+            self.completed.add(key)
+            self.failed.discard(key)
+        else:
+            self.failed.add(key)
+        data = {
+            "requests_file": str(self.requests_path),
+            "updated_at": datetime.now().isoformat(),
+            "completed": sorted(self.completed),
+            "failed": sorted(self.failed)
+        }
+        tmp_path = self.path.with_name(self.path.name + ".tmp")
+        tmp_path.write_text(json.dumps(data), encoding="utf-8")
+        os.replace(tmp_path, self.path)
+
+
+class BatchGenerationService:
+    """
+    Offline bulk generation from a JSONL file of SimpleGenerationRequests.
+
+    Lines run through SimpleGeneratorService and ProjectManagerService exactly like
+    /generate, at most `concurrency` at a time, with the LLM client's TPM/RPM
+    scheduler doing the rate limiting. Every finished line is appended to a JSONL
+    results file (timings, token usage, project) and recorded in a checkpoint.
+
+    A line's key is its "id" or "request_id" field, otherwise "line-<n>".
+    """
+
+    def __init__(
+        self,
+        generator: Optional[SimpleGeneratorService] = None,
+        project_manager: Optional[ProjectManagerService] = None,
+        concurrency: int = 4,
+        tokens_per_minute: Optional[int] = None,
+        requests_per_minute: Optional[int] = None
+    ):
+        self.generator = generator or SimpleGeneratorService()
+        self.project_manager = project_manager or ProjectManagerService()
+        self.concurrency = max(1, concurrency)
+        self.logger = logging.getLogger(__name__)
+        if tokens_per_minute is not None or requests_per_minute is not None:
+            # The batch runs in its own process, so it can be given its own share of the deployment quota
+            llm = get_llm_client()
+            llm.scheduler = RateLimitScheduler(
+                tokens_per_minute if tokens_per_minute is not None else self._limit(llm.scheduler.tokens),
+                requests_per_minute if requests_per_minute is not None else self._limit(llm.scheduler.requests)
+            )
+
+    @staticmethod
+    def _limit(bucket) -> int:
+        """Per-minute limit of a scheduler bucket (0 = unlimited)"""
+        return int(bucket.capacity) if bucket else 0
+
+    @staticmethod
+    def read_requests(requests_path: Path) -> Iterator[Tuple[int, str, Optional[dict]]]:
+        """(line number, key, raw object or None if the line is not JSON) of every non-empty line"""
+        with open(requests_path, "r", encoding="utf-8") as f:
+            for line_number, line in enumerate(f, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    data = json.loads(line)
+                except json.JSONDecodeError:
+                    data = None
+                key = None
+                if isinstance(data, dict):
+                    key = data.get("id") or data.get("request_id")
+                yield line_number, str(key or f"line-{line_number}"), data
+
+    async def run(
+        self,
+        requests_path: Path,
+        results_path: Path,
+        checkpoint_path: Optional[Path] = None,
+        retry_failed: bool = False,
+        limit: Optional[int] = None
+    ) -> dict:
+        """Generate every pending line; returns counts for the run"""
+        checkpoint = BatchCheckpoint(
+            checkpoint_path or results_path.with_name(results_path.name + ".checkpoint"), requests_path
+        )
+        counts = {"completed": 0, "failed": 0, "skipped": 0, "duplicates": 0}
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.concurrency * 2)
+        results_lock = asyncio.Lock()
+        started = time.monotonic()
+
+        async def worker():
+            with open(results_path, "a", encoding="utf-8") as results:
+                while True:
+                    item = await queue.get()
+                    if item is None:
+                        return
+                    result = await self.run_one(*item)
+                    async with results_lock:
+                        results.write(json.dumps(result) + "\n")
+                        results.flush()
+                        checkpoint.record(result["key"], result["status"] == "completed")
+                        counts[result["status"] if result["status"] == "completed" else "failed"] += 1
+                    self.logger.info(
+                        f"Batch {result['key']}: {result['status']} in {result['duration_seconds']}s "
+                        f"({counts['completed']} completed, {counts['failed']} failed)"
+                    )
+
+        workers = [asyncio.create_task(worker()) for _ in range(self.concurrency)]
+
+        async def put(item):
+            """Queue an item, failing instead of blocking forever if a worker died (e.g. checkpoint I/O)"""
+            put_task = asyncio.ensure_future(queue.put(item))
+            running = {task for task in workers if not task.done()}
+            try:
+                while running:
+                    done, pending = await asyncio.wait({put_task, *running}, return_when=asyncio.FIRST_COMPLETED)
+                    if put_task in done:
+                        return
+                    running = pending - {put_task}
+                    for task in done:
+                        task.result()  # raises the worker's error
+                raise RuntimeError("No batch worker left to take queued requests")
+            finally:
+                put_task.cancel()
+
+        submitted = 0
+        seen = set()
+        try:
+            for line_number, key, data in self.read_requests(requests_path):
+                if key in seen:
+                    counts["duplicates"] += 1
+                    self.logger.warning(f"Batch line {line_number}: duplicate key {key}, skipped")
+                    continue
+                seen.add(key)
+                if checkpoint.done(key, retry_failed):
+                    counts["skipped"] += 1
+                    continue
+                if limit is not None and submitted >= limit:
+                    break
+                await put((line_number, key, data))
+                submitted += 1
+            for _ in workers:
+                await put(None)
+            await asyncio.gather(*workers)
+        finally:
+            for task in workers:
+                task.cancel()
+
+        counts["duration_seconds"] = round(time.monotonic() - started, 1)
+        self.logger.info(f"Batch finished: {counts}")
+        return counts
+
+    async def run_one(self, line_number: int, key: str, data: Optional[dict]) -> dict:
+        """Generate and package one line; never raises, failures are reported in the result"""
+        generation_id = new_generation_id()
+        result = {
+            "key": key,
+            "line": line_number,
+            "generation_id": generation_id,
+            "started_at": datetime.now().isoformat()
+        }
+        started = time.monotonic()
+        try:
+            if data is None:
+                raise ValueError("line is not valid JSON")
+            request = SimpleGenerationRequest(**data)
+        except (ValueError, ValidationError, TypeError) as e:
+            return {**result, "status": "invalid", "error": str(e), "duration_seconds": 0.0}
+
+        with metrics.generation_context(request.framework, request.language, request.styling), \
+                metrics.track_usage() as token_usage:
+            try:
+                project_result = await self.generator.generate_complete_project(
+                    request.instructions,
+                    request.framework,
+                    request.language,
+                    request.styling,
+                    request.projectName,
+                    mode=request.mode,
+                    bypass_cache=request.bypass_cache,
+                    scaffold_overlay=request.scaffold_overlay
+                )
+                generated = time.monotonic()
+                with metrics.stage_timer("package"):
+                    project_info = await self.project_manager.package_simple_project(generation_id, project_result)
+                status = "completed"
+                result.update({
+                    "project_name": project_result.project_name,
+                    "files": len(project_result.files),
+                    "repaired_files": project_result.repaired_files,
+                    "download_path": project_info.download_path,
+                    "size_mb": project_info.size_mb,
+                    "generate_seconds": round(generated - started, 2),
+                    "package_seconds": round(time.monotonic() - generated, 2)
+                })
+            except Exception as e:
+                status = "failed"
+                result["error"] = str(e)
+            metrics.GENERATIONS.inc(status=status, **metrics.generation_labels())
+
+        return {
+            **result,
+            "status": status,
+            "duration_seconds": round(time.monotonic() - started, 2),
+            "token_usage": token_usage
+        }
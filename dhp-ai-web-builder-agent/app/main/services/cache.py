@@ -0,0 +1,163 @@
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional
+
+from app.main.configs.MainConfig import settings
+from app.main.services.models import SimpleProjectResult
+
+
+class GenerationCacheService:
+    """
+    Two-tier cache of generated projects keyed on normalized request parameters:
+    an in-memory LRU in front of JSON files under OUTPUT_PATH/cache.
+    Both tiers honour a TTL; the disk tier is also bounded by total size.
+    """
+
+    def __init__(
+        self,
+        memory_entries: int = settings.GENERATION_CACHE_MEMORY_ENTRIES,
+        disk_max_mb: float = settings.GENERATION_CACHE_DISK_MB,
+        ttl_seconds: float = settings.GENERATION_CACHE_TTL_SECONDS
+    ):
+        self.memory_entries = memory_entries
+        self.disk_max_bytes = int(disk_max_mb * 1024 * 1024)
+        self.ttl_seconds = ttl_seconds
+        self.logger = logging.getLogger(__name__)
+
+        self.cache_dir = Path(settings.OUTPUT_PATH) / "cache"
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+        self._memory: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._disk_bytes = sum(path.stat().st_size for path in self.cache_dir.glob("*.json"))
+        self.counters = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "stores": 0, "evictions": 0}
+
+    @staticmethod
+    def normalize_instructions(instructions: str) -> str:
+        """Case- and whitespace-insensitive form so trivially different prompts share an entry"""
+        return re.sub(r"\s+", " ", instructions).strip().casefold()
+
+    @staticmethod
+    def make_key(
+        instructions: str,
+        framework: str,
+        language: str,
+        styling: str,
+        mode: str,
+        template_version: str
+    ) -> str:
+        language_key = "ts" if language.lower() in ["typescript", "ts"] else "js"
+        payload = json.dumps([
+            GenerationCacheService.normalize_instructions(instructions),
+            framework.strip().lower(),
+            language_key,
+            styling.strip().lower(),
+            mode.strip().lower(),
+            template_version
+        ])
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[SimpleProjectResult]:
+        """Look up a cached result (memory first, then disk)"""
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                stored_at, data = entry
+                if now - stored_at <= self.ttl_seconds:
+                    self._memory.move_to_end(key)
+                    self.counters["memory_hits"] += 1
+                    return SimpleProjectResult(**data)
+                del self._memory[key]
+
+        path = self.cache_dir / f"{key}.json"
+        try:
+            stored_at = path.stat().st_mtime
+            if now - stored_at > self.ttl_seconds:
+                self._remove_disk_entry(path)
+            else:
+                with open(path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+                with self._lock:
+                    self._remember(key, stored_at, data)
+                    self.counters["disk_hits"] += 1
+                return SimpleProjectResult(**data)
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError) as e:
+            self.logger.warning(f"Discarding unreadable cache entry {path.name}: {str(e)}")
+            self._remove_disk_entry(path)
+
+        with self._lock:
+            self.counters["misses"] += 1
+        return None
+
+    def put(self, key: str, result: SimpleProjectResult):
+        """Store a result in both tiers"""
+        data = result.model_dump()
+        now = time.time()
+        with self._lock:
+            self._remember(key, now, data)
+            self.counters["stores"] += 1
+
+        path = self.cache_dir / f"{key}.json"
+        tmp_path = path.with_suffix(".tmp")
+        try:
+            previous_size = path.stat().st_size if path.exists() else 0
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(data, f)
+            os.replace(tmp_path, path)
+            with self._lock:
+                self._disk_bytes += path.stat().st_size - previous_size
+            self._evict_disk()
+        except OSError as e:
+            self.logger.warning(f"Failed to write cache entry {path.name}: {str(e)}")
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.counters["memory_hits"] + self.counters["disk_hits"] + self.counters["misses"]
+            hits = self.counters["memory_hits"] + self.counters["disk_hits"]
+            return {
+                **self.counters,
+                "hit_ratio": round(hits / lookups, 3) if lookups else 0.0,
+                "memory_entries": len(self._memory),
+                "disk_bytes": self._disk_bytes
+            }
+
+    def _remember(self, key: str, stored_at: float, data: dict):
+        self._memory[key] = (stored_at, data)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def _remove_disk_entry(self, path: Path):
+        try:
+            size = path.stat().st_size
+            path.unlink()
+        except FileNotFoundError:
+            return
+        with self._lock:
+            self._disk_bytes -= size
+            self.counters["evictions"] += 1
+
+    def _evict_disk(self):
+        """Drop expired entries, then the oldest ones until the disk tier fits its size budget"""
+        if self._disk_bytes <= self.disk_max_bytes:
+            return
+
+        now = time.time()
+        entries = sorted(
+            ((path.stat().st_mtime, path) for path in self.cache_dir.glob("*.json")),
+            key=lambda entry: entry[0]
+        )
+        for stored_at, path in entries:
+            if self._disk_bytes <= self.disk_max_bytes and now - stored_at <= self.ttl_seconds:
+                break
+            self._remove_disk_entry(path)
@@ -0,0 +1,196 @@
+import asyncio
+import hashlib
+import logging
+import os
+import re
+from typing import AsyncIterator, Callable, Optional, Tuple
+
+from app.main.configs.MainConfig import settings
+from app.main.services.project_manager import ProjectManagerService
+from app.main.services.storage import StorageService, archive_etag, stream_md5
+
+
+class RangeNotSatisfiableError(ValueError):
+    """Raised when a Range header does not overlap the archive"""
+
+
+class ArchiveSource:
+    """
+    A project archive that can be streamed in byte ranges, wherever it lives:
+    the in-memory archive cache, OUTPUT_PATH/zips or the Azure file share.
+    The ETag is derived from the archive's MD5 for every origin, so conditional and
+    resumed downloads keep matching across origins and replicas.
+    """
+
+    def __init__(
+        self,
+        origin: str,
+        size: int,
+        etag: str,
+        read_range: Callable[[int, int], AsyncIterator[bytes]]
+    ):
+        self.origin = origin
+        self.size = size
+        self.etag = etag
+        self._read_range = read_range
+
+    def iter_range(self, start: int, end: int) -> AsyncIterator[bytes]:
+        """Stream bytes start..end (inclusive)"""
+        return self._read_range(start, end)
+
+
+class DownloadService:
+    """Locates project archives and streams them in chunks, honouring HTTP Range requests"""
+
+    _SAFE_ID = re.compile(r"^[A-Za-z0-9_.-]+$")
+    _RANGE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+    def __init__(
+        self,
+        project_manager: ProjectManagerService,
+        chunk_size: int = settings.DOWNLOAD_CHUNK_SIZE_KB * 1024
+    ):
+        self.project_manager = project_manager
+        self.storage_service = project_manager.storage_service
+        self.chunk_size = chunk_size
+        self.logger = logging.getLogger(__name__)
+
+    async def resolve(self, project_id: str, download_path: Optional[str] = None) -> Optional[ArchiveSource]:
+        """Find the archive: in-memory cache, then the local zip, then the file share"""
+        if not self._SAFE_ID.match(project_id) or project_id.startswith("."):
+            return None
+
+        archive = await self.project_manager.get_project_archive(project_id)
+        if archive is not None:
+            return self._memory_source(archive)
+
+        zip_path = await self.project_manager.get_project_zip(project_id)
+        if zip_path:
+            try:
+                return await asyncio.to_thread(self._local_source, zip_path)
+            except FileNotFoundError:
+                pass
+
+        share_path = download_path or f"{StorageService.PROJECTS_DIRECTORY}/{project_id}.zip"
+        try:
+            properties = await asyncio.to_thread(self.storage_service.get_file_properties, share_path)
+        except Exception as e:
+            self.logger.error(f"Failed to look up {share_path} on the file share: {str(e)}")
+            return None
+        if properties is None:
+            return None
+        size, etag = properties
+        return self._share_source(share_path, size, etag)
+
+    def parse_range(self, range_header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+        """
+        Parse a single "bytes=" range into inclusive (start, end).
+        Returns None for a missing, malformed or multi-range header (serve the whole file).
+        """
+        if not range_header:
+            return None
+        match = self._RANGE.match(range_header.strip())
+        if not match or (not match.group(1) and not match.group(2)):
+            return None
+
+        first, last = match.group(1), match.group(2)
+        if first:
+            start = int(first)
+            end = min(int(last), size - 1) if last else size - 1
+            if last and int(last) < start:
+                return None
+        else:
+            # Suffix range: the last N bytes
+            suffix = int(last)
+            if suffix == 0:
+                raise RangeNotSatisfiableError(range_header)
+            start = max(0, size - suffix)
+            end = size - 1
+
+        if start >= size:
+            raise RangeNotSatisfiableError(range_header)
+        return start, end
+
+    @staticmethod
+    def etag_matches(header: Optional[str], etag: str) -> bool:
+        """Weak comparison for If-None-Match"""
+        if not header:
+            return False
+        if header.strip() == "*":
+            return True
+        candidates = [candidate.strip() for candidate in header.split(",")]
+        return any(candidate.removeprefix("W/") == etag.removeprefix("W/") for candidate in candidates)
+
+    @staticmethod
+    def if_range_matches(header: Optional[str], etag: str) -> bool:
+        """Strong comparison for If-Range (RFC 9110 13.1.5): a weak validator never matches"""
+        if not header:
+            return False
+        candidate = header.strip()
+        return not candidate.startswith("W/") and not etag.startswith("W/") and candidate == etag
+
+    def _memory_source(self, archive: bytes) -> ArchiveSource:
+        etag = archive_etag(hashlib.md5(archive).hexdigest())
+        chunk_size = self.chunk_size
+
+        async def read_range(start: int, end: int) -> AsyncIterator[bytes]:
+            view = memoryview(archive)
+            for offset in range(start, end + 1, chunk_size):
+                yield bytes(view[offset:min(offset + chunk_size, end + 1)])
+
+        return ArchiveSource("memory", len(archive), etag, read_range)
+
+    def _local_source(self, zip_path: str) -> ArchiveSource:
+        """Blocking (hashes the archive on first use): call it from a worker thread"""
+        stat = os.stat(zip_path)
+        etag = archive_etag(self._local_md5(zip_path, stat))
+        chunk_size = self.chunk_size
+
+        async def read_range(start: int, end: int) -> AsyncIterator[bytes]:
+            with open(zip_path, "rb") as f:
+                f.seek(start)
+                remaining = end - start + 1
+                while remaining > 0:
+                    chunk = await asyncio.to_thread(f.read, min(chunk_size, remaining))
+                    if not chunk:
+                        break
+                    remaining -= len(chunk)
+                    yield chunk
+
+        return ArchiveSource("local", stat.st_size, etag, read_range)
+
+    @staticmethod
+    def _local_md5(zip_path: str, stat: os.stat_result) -> str:
+        """MD5 of a local archive, cached next to it as <zip>.md5 and keyed on its size and mtime"""
+        sidecar = zip_path + ".md5"
+        stamp = f"{stat.st_size:x}-{stat.st_mtime_ns:x}"
+        try:
+            with open(sidecar, "r", encoding="utf-8") as f:
+                cached_stamp, md5_hex = f.read().split()
+            if cached_stamp == stamp:
+                return md5_hex
+        except (OSError, ValueError):
+            pass
+        with open(zip_path, "rb") as f:
+            md5_hex = stream_md5(f)
+        try:
+            with open(sidecar, "w", encoding="utf-8") as f:
+                f.write(f"{stamp} {md5_hex}")
+        except OSError:
+            pass
+        return md5_hex
+
+    def _share_source(self, share_path: str, size: int, etag: str) -> ArchiveSource:
+        chunk_size = self.chunk_size
+
+        async def read_range(start: int, end: int) -> AsyncIterator[bytes]:
+            chunks = await asyncio.to_thread(
+                self.storage_service.iter_file_range, share_path, start, end - start + 1, chunk_size
+            )
+            while True:
+                chunk = await asyncio.to_thread(next, chunks, None)
+                if chunk is None:
+                    break
+                yield chunk
+
+        return ArchiveSource("share", size, etag, read_range)
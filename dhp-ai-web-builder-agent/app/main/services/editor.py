@@ -0,0 +1,314 @@
+import json
+import logging
+import math
+import os
+import re
+import tempfile
+import zipfile
+from datetime import datetime
+from pathlib import Path
+from typing import IO, Callable, Dict, List, Optional, Tuple
+
+from app.main.configs.MainConfig import settings
+from app.main.services import metrics
+from app.main.services.downloads import DownloadService
+from app.main.services.json_repair import JSONRepairError, TolerantJSONParser
+from app.main.services.llm_client import get_llm_client
+from app.main.services.project_manager import ProjectManagerService
+from app.main.services.templates import AGENT_PROMPTS_DIR, TemplateRegistry
+
+
+class EditError(Exception):
+    """Raised when a change request cannot be applied to a project"""
+
+
+class StoredProject:
+    """A packaged project loaded back for editing: its text files plus the archive they came from"""
+
+    def __init__(self, project_id: str, info: dict, files: Dict[str, str], binary_files: List[str], archive: IO[bytes]):
+        self.project_id = project_id
+        self.info = info
+        self.files = files
+        self.binary_files = binary_files
+        self.archive = archive
+
+    def close(self):
+        self.archive.close()
+
+
+class EditResult:
+    def __init__(
+        self,
+        summary: str,
+        changes: Dict[str, Optional[str]],
+        files: Dict[str, str],
+        context_files: List[str]
+    ):
+        self.summary = summary
+        self.changes = changes  # path -> new content, None = deleted
+        self.files = files  # every text file after the edit
+        self.context_files = context_files
+
+
+class ProjectEditService:
+    """
+    Incremental edits of a generated project: the model sees the file list and only
+    the files relevant to the change request, and answers with per-file patches
+    (search/replace edits, new or replaced files, deletions) that are applied to
+    the stored project.
+    """
+
+    SYSTEM_PROMPT = (
+        "You are a senior developer making precise, minimal changes to an existing web application. "
+        "IMPORTANT: Always return valid JSON with properly escaped strings."
+    )
+    # Entry points that usually matter for navigation and layout changes
+    ENTRY_STEMS = {"app", "main", "index", "router", "routes", "layout", "navigation"}
+    STOPWORDS = {
+        "the", "and", "for", "with", "that", "this", "from", "into", "make", "change", "add", "please",
+        "page", "all", "use", "should", "can", "want", "need", "new", "also", "more", "less", "have"
+    }
+    _WORD = re.compile(r"[a-z0-9]+")
+
+    def __init__(self, project_manager: ProjectManagerService, download_service: DownloadService):
+        self.llm = get_llm_client()
+        self.project_manager = project_manager
+        self.download_service = download_service
+        self.context_max_chars = settings.EDIT_CONTEXT_MAX_CHARS
+        self.max_attempts = max(1, settings.EDIT_MAX_ATTEMPTS)
+        self.logger = logging.getLogger(__name__)
+
+        self.templates = TemplateRegistry(
+            os.path.join(AGENT_PROMPTS_DIR, "edit"),
+            pattern="*.md",
+            required_placeholders={"instructions", "file_list", "file_contents"},
+            default_template="edit_instruction.md"
+        )
+        self.templates.load_all()
+
+    async def project_exists(self, project_id: str, download_path: Optional[str] = None) -> bool:
+        if (self.project_manager.output_path / "projects" / project_id / "project-info.json").is_file():
+            return True
+        return await self.download_service.resolve(project_id, download_path) is not None
+
+    async def load_project(self, project_id: str, download_path: Optional[str] = None) -> Optional[StoredProject]:
+        """Load a project from its archive (memory cache, OUTPUT_PATH/zips, file share) or OUTPUT_PATH/projects/<id>"""
+        archive = tempfile.SpooledTemporaryFile(max_size=self.project_manager.spool_max_bytes)
+        source = await self.download_service.resolve(project_id, download_path)
+        if source is not None:
+            async for chunk in source.iter_range(0, source.size - 1):
+                archive.write(chunk)
+        else:
+            project_dir = self.project_manager.output_path / "projects" / project_id
+            if not (project_dir / "project-info.json").is_file():
+                archive.close()
+                return None
+            archive.close()
+            archive = self._archive_directory(project_dir)
+
+        archive.seek(0)
+        info, files, binary_files = {}, {}, []
+        with zipfile.ZipFile(archive) as zf:
+            for entry in zf.infolist():
+                if entry.is_dir():
+                    continue
+                data = zf.read(entry)
+                if entry.filename == "project-info.json":
+                    info = json.loads(data)
+                    continue
+                try:
+                    files[entry.filename] = data.decode("utf-8")
+                except UnicodeDecodeError:
+                    binary_files.append(entry.filename)
+        archive.seek(0)
+        self.logger.info(
+            f"Loaded project {project_id} for editing ({len(files)} text files, {len(binary_files)} binary)"
+        )
+        return StoredProject(project_id, info, files, binary_files, archive)
+
+    def _archive_directory(self, project_dir: Path) -> IO[bytes]:
+        """Zip a disk-mode project tree so edits can always work from an archive"""
+        spool = tempfile.SpooledTemporaryFile(max_size=self.project_manager.spool_max_bytes)
+        with zipfile.ZipFile(spool, "w", zipfile.ZIP_DEFLATED) as zf:
+            for file_path in sorted(project_dir.rglob("*")):
+                if file_path.is_file() and file_path.name not in self.project_manager.SKIPPED_NAMES:
+                    zf.write(file_path, file_path.relative_to(project_dir).as_posix())
+        return spool
+
+    def _terms(self, text: str) -> List[str]:
+        text = re.sub(r"([a-z])([A-Z])", r"\1 \2", text).lower()
+        return [word for word in self._WORD.findall(text) if len(word) > 2 and word not in self.STOPWORDS]
+
+    def select_files(self, files: Dict[str, str], change_request: str) -> List[str]:
+        """
+        Files to show the model: those the request names, then the best matches on path
+        and content terms, plus the app entry points, within EDIT_CONTEXT_MAX_CHARS.
+        """
+        request_lower = change_request.lower()
+        terms = set(self._terms(change_request))
+        scores: Dict[str, float] = {}
+        for path, content in files.items():
+            name = path.rsplit("/", 1)[-1]
+            stem = name.split(".", 1)[0].lower()
+            score = 0.0
+            if path.lower() in request_lower or (len(stem) > 2 and re.search(rf"\b{re.escape(stem)}\b", request_lower)):
+                score += 100
+            path_terms = set(self._terms(path))
+            score += 5 * len(terms & path_terms)
+            content_lower = content.lower()
+            score += sum(math.log1p(min(content_lower.count(term), 20)) for term in terms)
+            if stem in self.ENTRY_STEMS and path.startswith("src/"):
+                score += 2
+            if score > 0 and path.endswith((".json", ".lock")) and "package" not in terms:
+                score /= 4
+            scores[path] = score
+
+        selected, used = [], 0
+        for path in sorted(scores, key=lambda item: (-scores[item], item)):
+            size = len(files[path])
+            if scores[path] <= 0 or used + size > self.context_max_chars:
+                continue
+            selected.append(path)
+            used += size
+        if not selected and files:
+            # Nothing matched: fall back to the smallest entry point
+            def entry_rank(path: str):
+                stem = path.rsplit("/", 1)[-1].split(".")[0].lower()
+                return (stem not in self.ENTRY_STEMS, len(files[path]))
+            selected = [min(files, key=entry_rank)]
+        return sorted(selected)
+
+    def build_prompt(self, project: StoredProject, change_request: str, context_files: List[str]) -> str:
+        file_list = "\n".join(
+            f"- {path} ({len(project.files[path])} chars)" for path in sorted(project.files)
+        )
+        if project.binary_files:
+            file_list += "\n" + "\n".join(f"- {path} (binary)" for path in sorted(project.binary_files))
+        file_contents = "\n\n".join(f"=== {path} ===\n{project.files[path]}" for path in context_files)
+        return self.templates.get("edit_instruction.md").render({
+            "instructions": change_request,
+            "framework": project.info.get("framework", "React"),
+            "language": project.info.get("language", "JavaScript"),
+            "file_list": file_list,
+            "file_contents": file_contents
+        })
+
+    async def edit_project(
+        self,
+        project: StoredProject,
+        change_request: str,
+        progress_callback: Optional[Callable[[int, str], None]] = None
+    ) -> EditResult:
+        """Ask for patches and apply them; a patch set that does not apply is sent back once for correction"""
+        context_files = self.select_files(project.files, change_request)
+        with metrics.stage_timer("render"):
+            prompt = self.build_prompt(project, change_request, context_files)
+        self.logger.info(
+            f"Editing {project.project_id} with {len(context_files)}/{len(project.files)} files in context "
+            f"({len(prompt)} chars)"
+        )
+        if progress_callback:
+            progress_callback(30, f"AI is updating {len(context_files)} relevant files...")
+
+        messages = [{"role": "system", "content": self.SYSTEM_PROMPT}, {"role": "user", "content": prompt}]
+        for attempt in range(1, self.max_attempts + 1):
+            start_time = datetime.now()
+            response = await self.llm.chat_completion(messages=messages, timeout=settings.LLM_TIMEOUT_SECONDS)
+            content = response.choices[0].message.content
+            elapsed = (datetime.now() - start_time).total_seconds()
+            self.logger.info(f"Edit completion {attempt} took {elapsed:.2f} seconds")
+            try:
+                with metrics.stage_timer("parse"):
+                    summary, patches = self.parse_patches(content)
+                    changes = self.apply_patches(project.files, patches)
+            except EditError as e:
+                if attempt >= self.max_attempts:
+                    raise
+                self.logger.warning(f"Edit patches rejected (attempt {attempt}/{self.max_attempts}): {str(e)}")
+                messages += [
+                    {"role": "assistant", "content": content},
+                    {
+                        "role": "user",
+                        "content": f"Your patches could not be applied: {str(e)}\nReturn the complete corrected JSON."
+                    }
+                ]
+                continue
+
+            files = {path: text for path, text in project.files.items() if changes.get(path, text) is not None}
+            files.update({path: text for path, text in changes.items() if text is not None})
+            return EditResult(summary, changes, files, context_files)
+        raise EditError(f"No applicable patches after {self.max_attempts} attempts")
+
+    def parse_patches(self, response: str) -> Tuple[str, List[dict]]:
+        json_start = response.find("{")
+        if json_start == -1:
+            raise EditError("No JSON found in the response")
+        try:
+            data, _ = json.JSONDecoder().raw_decode(response, json_start)
+        except json.JSONDecodeError:
+            try:
+                data = TolerantJSONParser(response).parse()
+            except JSONRepairError as e:
+                raise EditError(f"Response is not valid JSON: {str(e)}")
+        patches = data.get("patches") if isinstance(data, dict) else None
+        if not isinstance(patches, list) or not patches:
+            raise EditError("Response contains no patches")
+        return str(data.get("summary") or ""), patches
+
+    def apply_patches(self, files: Dict[str, str], patches: List[dict]) -> Dict[str, Optional[str]]:
+        """
+        Apply all patches or none: path -> new content (None = delete).
+        Every search text must match the current file exactly once.
+        """
+        changes: Dict[str, Optional[str]] = {}
+        errors = []
+        for patch in patches:
+            if not isinstance(patch, dict):
+                errors.append("patch is not an object")
+                continue
+            path = self.project_manager._archive_name(str(patch.get("path") or ""))
+            action = str(patch.get("action") or "edit").lower()
+            if path is None or path == "project-info.json":
+                errors.append(f"invalid path {patch.get('path')!r}")
+                continue
+            current = changes[path] if path in changes else files.get(path)
+
+            if action in ("create", "replace"):
+                if not isinstance(patch.get("content"), str):
+                    errors.append(f"{path}: {action} needs the complete content")
+                    continue
+                changes[path] = patch["content"]
+            elif action == "delete":
+                if current is None:
+                    errors.append(f"{path}: cannot delete a file that does not exist")
+                    continue
+                changes[path] = None
+            elif action == "edit":
+                if current is None:
+                    errors.append(f"{path}: cannot edit a file that does not exist")
+                    continue
+                for edit in patch.get("edits") or []:
+                    find, replace = edit.get("find"), edit.get("replace")
+                    if not isinstance(find, str) or not find or not isinstance(replace, str):
+                        errors.append(f"{path}: every edit needs non-empty find and a replace string")
+                        break
+                    occurrences = current.count(find)
+                    if occurrences != 1:
+                        errors.append(
+                            f"{path}: find text {'not found' if occurrences == 0 else f'matches {occurrences} times'}: "
+                            f"{find[:80]!r}"
+                        )
+                        break
+                    current = current.replace(find, replace, 1)
+                else:
+                    changes[path] = current
+            else:
+                errors.append(f"{path}: unknown action {action!r}")
+
+        if errors:
+            raise EditError("; ".join(errors))
+        # Drop no-op patches so the new revision only touches real changes
+        return {
+            path: content for path, content in changes.items()
+            if content != files.get(path) or content is None and path in files
+        }
@@ -0,0 +1,75 @@
+import asyncio
+import json
+from collections import deque
+from typing import AsyncIterator, Dict, List, Optional
+
+
+TERMINAL_EVENTS = ("completed", "failed")
+
+
+class GenerationEventBus:
+    """
+    In-process publish/subscribe hub for generation events.
+
+    Every generation keeps a short history so that clients connecting late
+    (or reconnecting) replay what already happened before receiving live events.
+    """
+
+    def __init__(self, history_size: int = 500, retained_streams: int = 256):
+        self.history_size = history_size
+        self._history: Dict[str, deque] = {}
+        self._subscribers: Dict[str, List[asyncio.Queue]] = {}
+        self._closed: deque = deque()
+        self._retained_streams = retained_streams
+
+    def publish(self, generation_id: str, event: str, data: dict):
+        """Record an event and fan it out to all live subscribers"""
+        message = {"event": event, "data": data}
+        history = self._history.setdefault(generation_id, deque(maxlen=self.history_size))
+        history.append(message)
+
+        for queue in self._subscribers.get(generation_id, []):
+            queue.put_nowait(message)
+
+        if event in TERMINAL_EVENTS:
+            self._closed.append(generation_id)
+            while len(self._closed) > self._retained_streams:
+                self._history.pop(self._closed.popleft(), None)
+
+    def has_stream(self, generation_id: str) -> bool:
+        return generation_id in self._history
+
+    async def subscribe(self, generation_id: str, heartbeat: Optional[float] = None) -> AsyncIterator[Optional[dict]]:
+        """
+        Yield past and live events for a generation until a terminal event.
+        Yields None every `heartbeat` seconds of inactivity.
+        """
+        queue: asyncio.Queue = asyncio.Queue()
+        for message in self._history.get(generation_id, []):
+            queue.put_nowait(message)
+        self._subscribers.setdefault(generation_id, []).append(queue)
+
+        try:
+            while True:
+                try:
+                    message = await asyncio.wait_for(queue.get(), timeout=heartbeat)
+                except asyncio.TimeoutError:
+                    yield None
+                    continue
+
+                yield message
+                if message["event"] in TERMINAL_EVENTS:
+                    return
+        finally:
+            subscribers = self._subscribers.get(generation_id, [])
+            if queue in subscribers:
+                subscribers.remove(queue)
+            if not subscribers:
+                self._subscribers.pop(generation_id, None)
+
+    @staticmethod
+    def format_sse(message: Optional[dict]) -> str:
+        """Serialize an event (or a heartbeat for None) in text/event-stream format"""
+        if message is None:
+            return ": keep-alive\n\n"
+        return f"event: {message['event']}\ndata: {json.dumps(message['data'], default=str)}\n\n"
@@ -1,22 +1,45 @@
+import asyncio
 import json
 import logging
 import os
 from datetime import datetime
-from typing import Optional, Callable
-from openai import AzureOpenAI
+from typing import Dict, List, Optional, Callable, Tuple
 
 from app.main.configs.MainConfig import settings
+from app.main.services import metrics, structured_output
+from app.main.services.cache import GenerationCacheService
+from app.main.services.json_repair import parse_project_json, restore_path_escapes
+from app.main.services.llm_client import get_llm_client
 from app.main.services.models import SimpleProjectResult
+from app.main.services.pipeline import PipelineGeneratorService
+from app.main.services.scaffold import ScaffoldService
+from app.main.services.stream_parser import StreamingFilesExtractor
+from app.main.services.templates import AGENT_PROMPTS_DIR, CompiledTemplate, TemplateError, TemplateRegistry
+from app.main.services.validation import ProjectValidator, ValidationIssue
 
 
 class SimpleGeneratorService:
+    # Reference sections of the Nucleus templates; the first is replaced by the compact context, the rest dropped
+    NUCLEUS_REFERENCE_SECTIONS = (
+        "NUCLEUS CSS DESIGN SYSTEM - MANDATORY:",
+        "NUCLEUS CSS COMPONENT CLASSES - CRITICAL:",
+        "NUCLEUS CSS TYPOGRAPHY SYSTEM - CRITICAL:",
+        "NUCLEUS CSS SPACING SYSTEM - CRITICAL:",
+        "NUCLEUS CSS VISUAL ELEMENTS - CRITICAL:",
+    )
+    # Stand-ins for the request-specific placeholders when rendering the static prefix (PROMPT_LAYOUT=prefix)
+    REQUEST_REFERENCES = {
+        "instructions": "the application described in the PROJECT REQUEST at the end",
+        "project_name": "<project name from the PROJECT REQUEST>"
+    }
+
     def __init__(self):
-        # Azure OpenAI configuration
-        self.client = AzureOpenAI(
-            api_version=settings.AZURE_API_VERSION,
-            azure_endpoint=settings.AZURE_ENDPOINT,
-            api_key=settings.AZURE_OPENAI_API_KEY
-        )
+        # Shared async Azure OpenAI client (connection pool, retries, quota scheduling)
+        self.llm = get_llm_client()
+        self.pipeline = PipelineGeneratorService()
+        self.scaffold_service = self.pipeline.scaffold_service
+        self.nucleus_context = self.pipeline.nucleus_context
+        self.cache = GenerationCacheService() if settings.GENERATION_CACHE_ENABLED else None
         self.logger = logging.getLogger(__name__)
 
         # Setup logging
@@ -26,50 +49,50 @@ class SimpleGeneratorService:
         )
 
         # Set base directory for prompts
-        self.base_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
-        self.prompts_dir = os.path.join(self.base_dir, 'prompts')
+        self.base_dir = os.path.dirname(AGENT_PROMPTS_DIR)
+        self.prompts_dir = AGENT_PROMPTS_DIR
+
+        # Load and validate every instruction template once; misconfigured templates fail startup
+        self.templates = TemplateRegistry(self.prompts_dir)
+        self.templates.load_all()
+        self._fallback_template = CompiledTemplate("fallback", self._get_fallback_template())
+
+        # Replacement prompt sections for scaffold overlay mode (application files only)
+        self.overlay_templates = TemplateRegistry(
+            os.path.join(self.prompts_dir, 'overlay'),
+            pattern="*.md",
+            required_placeholders=set(),
+            default_template=None
+        )
+        self.overlay_templates.load_all()
+
+        # Static validation of parsed projects; only the files behind a problem are regenerated
+        self.validator = ProjectValidator() if settings.VALIDATION_ENABLED else None
+        self.validation_attempts = max(0, settings.VALIDATION_REPAIR_ATTEMPTS)
+        self.repair_templates = TemplateRegistry(
+            os.path.join(self.prompts_dir, 'repair'),
+            pattern="*.md",
+            required_placeholders={"issues", "file_contents"},
+            default_template="repair_instruction.md"
+        )
+        self.repair_templates.load_all()
+
+        # Rendered static prefixes per template version and variant; identical bytes on every request
+        self.prompt_layout = settings.PROMPT_LAYOUT
+        # JSON schema structured output; switched off for good once the deployment rejects it
+        self.structured_output = settings.LLM_STRUCTURED_OUTPUT
+        self._prompt_prefixes: Dict[str, str] = {}
 
-    def _load_instruction_template(self, framework: str, styling: str) -> str:
+    def _load_instruction_template(self, framework: str, styling: str) -> CompiledTemplate:
         """
-        Load instruction template for the specified framework and styling.
+        Get the precompiled instruction template for the specified framework and styling.
         Falls back to react tailwind if framework-specific template doesn't exist.
         """
-        framework_lower = framework.lower()
-        styling_lower = styling.lower()
-
-        # Determine template file based on styling
-        if styling_lower == "nucleuscss":
-            template_file = f"{framework_lower}_nucleus_instruction.md"
-        else:
-            # Default to tailwind (existing templates)
-            template_file = f"{framework_lower}_instruction.md"
-
-        template_path = os.path.join(self.prompts_dir, template_file)
-        print(template_path)
-
-        # If framework-specific template doesn't exist, use react as default
-        if not os.path.exists(template_path):
-            if styling_lower == "nucleuscss":
-                # Try to fall back to react nucleus template
-                template_path = os.path.join(self.prompts_dir, 'react_nucleus_instruction.md')
-                if not os.path.exists(template_path):
-                    # If nucleus template doesn't exist, fall back to regular react template
-                    template_path = os.path.join(self.prompts_dir, 'react_instruction.md')
-                    self.logger.warning(f"No nucleus template found for {framework}, using React tailwind as fallback")
-            else:
-                template_path = os.path.join(self.prompts_dir, 'react_instruction.md')
-                self.logger.warning(f"No template found for {framework}, using React template as fallback")
-
         try:
-            with open(template_path, 'r', encoding='utf-8') as file:
-                return file.read()
-        except FileNotFoundError:
-            self.logger.error(f"Template file not found: {template_path}")
-            # Return a basic fallback template
-            return self._get_fallback_template()
-        except Exception as e:
-            self.logger.error(f"Error reading template file: {str(e)}")
-            return self._get_fallback_template()
+            return self.templates.resolve(framework, styling)
+        except TemplateError as e:
+            self.logger.error(str(e))
+            return self._fallback_template
 
     def _get_fallback_template(self) -> str:
         """Fallback template if file loading fails"""
@@ -102,30 +125,163 @@ Return ONLY valid JSON with properly escaped strings:
         language: str = "JavaScript",
         styling: str = "TailwindCSS",
         project_name: str = "AI Generated Project",
-        progress_callback: Optional[Callable[[int, str], None]] = None
+        progress_callback: Optional[Callable[[int, str], None]] = None,
+        file_callback: Optional[Callable[[str, str], None]] = None,
+        stream: Optional[bool] = None,
+        mode: Optional[str] = None,
+        bypass_cache: bool = False,
+        scaffold_overlay: Optional[bool] = None
     ) -> SimpleProjectResult:
         """
         Generate a complete React project with AI freedom.
         Focused on React with JavaScript or TypeScript.
+
+        When streaming (settings.LLM_STREAMING by default), file_callback is called
+        with (path, content) as soon as each generated file is complete.
+        mode="staged" runs the plan -> pages -> router pipeline instead of one large call.
+        Results are served from the generation cache unless bypass_cache is set.
+        With scaffold_overlay (settings.SCAFFOLD_OVERLAY_ENABLED by default) the model only
+        writes src/ files plus a dependency delta, and packaging overlays them onto base_projects.
         """
+        mode = (mode or settings.GENERATION_MODE).lower()
+        if mode == "staged" and not self.pipeline.supports(framework, styling):
+            self.logger.warning(f"Staged generation not available for {framework} with {styling}, using single mode")
+            mode = "single"
+
+        overlay = settings.SCAFFOLD_OVERLAY_ENABLED if scaffold_overlay is None else scaffold_overlay
+        if overlay and mode == "single" and not self._scaffold_available(framework, language):
+            overlay = False
+        if overlay and mode == "single":
+            mode = "overlay"
+
+        if self.cache is None:
+            return await self._generate_project(
+                instructions, framework, language, styling, project_name,
+                progress_callback, file_callback, stream, mode
+            )
+
+        cache_key = self.cache.make_key(
+            instructions, framework, language, styling, mode,
+            self._template_version(framework, styling, mode)
+        )
+        if not bypass_cache:
+            cached = await asyncio.to_thread(self.cache.get, cache_key)
+            if cached is not None:
+                self.logger.info(f"Generation cache hit for {cache_key[:12]}")
+                for path, content in cached.files.items():
+                    if file_callback:
+                        file_callback(path, content)
+                if progress_callback:
+                    progress_callback(90, "Reused a previously generated project!")
+                return cached.model_copy(update={"project_name": project_name})
+
+        project_result = await self._generate_project(
+            instructions, framework, language, styling, project_name,
+            progress_callback, file_callback, stream, mode
+        )
+        if project_result is None or not project_result.files:
+            return project_result
+        if project_result.validation_issues:
+            # Known to be broken: a fresh generation next time has a chance to get it right
+            self.logger.info(f"Not caching {cache_key[:12]}: {len(project_result.validation_issues)} validation issues")
+        else:
+            await asyncio.to_thread(self.cache.put, cache_key, project_result)
+        return project_result
+
+    def _template_version(self, framework: str, styling: str, mode: str) -> str:
+        """Identify the prompt set a generation depends on, for cache keys"""
+        if mode == "staged":
+            try:
+                digest = self.pipeline.prompt_version()
+            except OSError as e:
+                # A staged prompt removed after supports() was checked; the generation itself reports it
+                self.logger.warning(f"Staged prompts unreadable: {str(e)}")
+                digest = "unavailable"
+        else:
+            digest = self._load_instruction_template(framework, styling).version
+            if mode == "overlay":
+                digest += ":" + ":".join(
+                    self.overlay_templates.get(name).version for name in self._overlay_section_names(framework).values()
+                )
+            if self._compact_nucleus(styling):
+                digest += f":nucleus:{self.nucleus_context.version}:{self.nucleus_context.token_budget}"
+            if self.prompt_layout == "prefix":
+                digest += ":prefix"
+            if self.structured_output:
+                digest += ":schema"
+        return f"{settings.PROMPT_TEMPLATE_VERSION}:{mode}:{digest}"
+
+    async def _generate_project(
+        self,
+        instructions: str,
+        framework: str,
+        language: str,
+        styling: str,
+        project_name: str,
+        progress_callback: Optional[Callable[[int, str], None]],
+        file_callback: Optional[Callable[[str, str], None]],
+        stream: Optional[bool],
+        mode: str
+    ) -> SimpleProjectResult:
+        """Run a fresh generation in the given mode"""
+        if stream is None:
+            stream = settings.LLM_STREAMING
+
         try:
+            if mode == "staged":
+                project_result = await self.pipeline.generate_project(
+                    instructions, framework, language, styling, project_name,
+                    progress_callback=progress_callback,
+                    file_callback=file_callback
+                )
+                return await self._validate_project(
+                    project_result, instructions, framework, language, styling, progress_callback, file_callback
+                )
+
             if progress_callback:
                 progress_callback(10, "AI is analyzing your request...")
 
             # Create instruction with specific framework, language, and styling
-            ultimate_instruction = self._create_ultimate_instruction(instructions, framework, language, styling, project_name)
+            overlay = mode == "overlay"
+            with metrics.stage_timer("render"):
+                if self.prompt_layout == "prefix":
+                    ultimate_instruction, request_block = self._create_prompt_parts(
+                        instructions, framework, language, styling, project_name, overlay=overlay
+                    )
+                else:
+                    ultimate_instruction = self._create_ultimate_instruction(
+                        instructions, framework, language, styling, project_name, overlay=overlay
+                    )
+                    request_block = None
 
             if progress_callback:
                 progress_callback(30, f"AI is designing the complete solution with {styling} styling...")
 
             # Single AI call to generate everything
-            response = await self._call_llm(ultimate_instruction)
+            if stream:
+                response = await self._call_llm_stream(
+                    ultimate_instruction,
+                    self._file_progress_reporter(progress_callback, file_callback),
+                    request_block
+                )
+            else:
+                response = await self._call_llm(ultimate_instruction, request_block)
 
             if progress_callback:
                 progress_callback(70, "AI is finalizing the project...")
 
             # Parse the AI's complete response
-            project_result = self._parse_project_response(response, project_name)
+            with metrics.stage_timer("parse"):
+                project_result = self._parse_project_response(
+                    response, project_name,
+                    scaffold=self.scaffold_service.variant(framework, language) if overlay else None
+                )
+            if project_result is not None and project_result.repaired_files:
+                metrics.REPAIRED_FILES.inc(len(project_result.repaired_files), **metrics.generation_labels())
+
+            project_result = await self._validate_project(
+                project_result, instructions, framework, language, styling, progress_callback, file_callback
+            )
 
             if progress_callback:
                 progress_callback(90, "Project ready!")
@@ -135,10 +291,245 @@ Return ONLY valid JSON with properly escaped strings:
         except Exception as e:
             self.logger.error(f"Failed to generate project: {str(e)}")
 
-    def _create_ultimate_instruction(self, instructions: str, framework: str, language: str, styling: str, project_name: str) -> str:
+    async def _validate_project(
+        self,
+        project_result: Optional[SimpleProjectResult],
+        instructions: str,
+        framework: str,
+        language: str,
+        styling: str,
+        progress_callback: Optional[Callable[[int, str], None]],
+        file_callback: Optional[Callable[[str, str], None]]
+    ) -> Optional[SimpleProjectResult]:
+        """
+        Check a parsed project before packaging and regenerate only the missing or broken files,
+        for up to VALIDATION_REPAIR_ATTEMPTS rounds. Problems left over end up in validation_issues.
+        """
+        if project_result is None or self.validator is None:
+            return project_result
+
+        issues = await self._find_issues(project_result)
+        for kind in {issue.kind for issue in issues}:
+            metrics.VALIDATION_ISSUES.inc(
+                len([issue for issue in issues if issue.kind == kind]), kind=kind, **metrics.generation_labels()
+            )
+        project_result, issues = self._add_known_dependencies(project_result, issues, framework, language)
+
+        for attempt in range(1, self.validation_attempts + 1):
+            if not issues:
+                break
+            targets = sorted({issue.target for issue in issues})
+            self.logger.warning(
+                f"Validation found {len(issues)} problems (attempt {attempt}/{self.validation_attempts}), "
+                f"regenerating {targets}: {[str(issue) for issue in issues]}"
+            )
+            if progress_callback:
+                progress_callback(80, f"AI is fixing {len(targets)} files...")
+            try:
+                repaired = await self._regenerate_files(
+                    project_result, issues, instructions, framework, language, styling
+                )
+            except Exception as e:
+                self.logger.error(f"Targeted regeneration failed: {str(e)}")
+                break
+            if repaired is None:
+                break
+
+            for path, content in repaired.files.items():
+                if file_callback:
+                    file_callback(path, content)
+            project_result = self._declare_dependencies(
+                project_result.model_copy(update={"files": {**project_result.files, **repaired.files}}),
+                {name: ("dependencies", version) for name, version in repaired.dependencies.items()}
+            )
+            issues = await self._find_issues(project_result)
+            project_result, issues = self._add_known_dependencies(project_result, issues, framework, language)
+
+        if issues:
+            self.logger.warning(
+                f"Packaging with {len(issues)} unresolved validation problems: {[str(issue) for issue in issues]}"
+            )
+        return project_result.model_copy(update={"validation_issues": [str(issue) for issue in issues]})
+
+    async def _find_issues(self, project_result: SimpleProjectResult) -> List[ValidationIssue]:
+        """Validate the project as it will be packaged (overlaid onto its scaffold, if any)"""
+        with metrics.stage_timer("validate"):
+            files = project_result.files
+            if project_result.scaffold:
+                files = self.scaffold_service.compose(
+                    project_result.scaffold, files, project_result.dependencies, project_result.dev_dependencies
+                )
+            # Regex scans of a few dozen files: one worker thread keeps them off the event loop
+            issues = await asyncio.to_thread(self.validator.validate, files)
+        if project_result.scaffold:
+            # Scaffold files are not the model's to fix, only application files and the dependency delta
+            issues = [
+                issue for issue in issues
+                if issue.kind == "missing_dependency" or issue.target.startswith(ScaffoldService.OVERLAY_PREFIXES)
+            ]
+        return issues
+
+    def _add_known_dependencies(
+        self,
+        project_result: SimpleProjectResult,
+        issues: List[ValidationIssue],
+        framework: str,
+        language: str
+    ) -> Tuple[SimpleProjectResult, List[ValidationIssue]]:
+        """Declare missing packages whose version the scaffold pins, without asking the model"""
+        missing = {issue.module for issue in issues if issue.kind == "missing_dependency"}
+        known = self._known_dependencies(framework, language) if missing else {}
+        added = {name: known[name] for name in missing if name in known}
+        if not added:
+            return project_result, issues
+
+        remaining = [issue for issue in issues if not (issue.kind == "missing_dependency" and issue.module in added)]
+        return self._declare_dependencies(project_result, added), remaining
+
+    def _declare_dependencies(
+        self,
+        project_result: SimpleProjectResult,
+        packages: Dict[str, Tuple[str, str]]
+    ) -> SimpleProjectResult:
+        """Add packages (name -> (package.json section, version)) to the dependency delta or package.json"""
+        if not packages:
+            return project_result
+        if project_result.scaffold:
+            added = {name: version for name, (_, version) in packages.items()}
+            update = {"dependencies": {**project_result.dependencies, **added}}
+        else:
+            try:
+                package = json.loads(project_result.files.get("package.json", ""))
+            except ValueError:
+                return project_result
+            if not isinstance(package, dict):
+                return project_result
+            for name, (section, version) in packages.items():
+                if not isinstance(package.get(section), dict):
+                    package[section] = {}
+                package[section].setdefault(name, version)
+            update = {"files": {**project_result.files, "package.json": json.dumps(package, indent=2)}}
+        self.logger.info(f"Declared missing packages in package.json: {sorted(packages)}")
+        return project_result.model_copy(update=update)
+
+    def _known_dependencies(self, framework: str, language: str) -> Dict[str, Tuple[str, str]]:
+        """Package name -> (package.json section, version) pinned by the scaffold"""
+        known = {name: ("dependencies", version) for name, version in ScaffoldService.REQUIRED_DEPENDENCIES.items()}
+        try:
+            package = json.loads(self.scaffold_service.load_files(framework, language)["package.json"])
+        except (ValueError, KeyError, OSError) as e:
+            self.logger.debug(f"No scaffold package.json for dependency versions: {str(e)}")
+            return known
+        for section in ("devDependencies", "dependencies"):
+            for name, version in (package.get(section) or {}).items():
+                known[name] = (section, version)
+        return known
+
+    async def _regenerate_files(
+        self,
+        project_result: SimpleProjectResult,
+        issues: List[ValidationIssue],
+        instructions: str,
+        framework: str,
+        language: str,
+        styling: str
+    ) -> Optional[SimpleProjectResult]:
+        """Ask the model for just the files needed to fix the issues; the rest of the project is only listed"""
+        files = project_result.files
+        # The broken files and the files importing missing modules, within VALIDATION_CONTEXT_MAX_CHARS
+        context_paths = []
+        for issue in issues:
+            for path in (issue.target, issue.path):
+                if path in files and path not in context_paths:
+                    context_paths.append(path)
+        contents, used = [], 0
+        for path in context_paths:
+            if used + len(files[path]) > settings.VALIDATION_CONTEXT_MAX_CHARS:
+                continue
+            contents.append(f"=== {path} ===\n{files[path]}")
+            used += len(files[path])
+
+        with metrics.stage_timer("render"):
+            prompt = self.repair_templates.get("repair_instruction.md").render({
+                "instructions": instructions,
+                "framework": framework,
+                "language": language,
+                "styling": styling,
+                "issues": "\n".join(f"- {issue}" for issue in issues),
+                "file_list": "\n".join(f"- {path}" for path in sorted(files)),
+                "file_contents": "\n\n".join(contents) or "(no existing files involved)"
+            })
+        response = await self._call_llm(prompt)
+        with metrics.stage_timer("parse"):
+            # Parsed like an overlay response so the dependency delta is kept in every mode
+            return self._parse_project_response(
+                response, project_result.project_name,
+                scaffold=project_result.scaffold or self.scaffold_service.variant(framework, language)
+            )
+
+    def _create_ultimate_instruction(
+        self,
+        instructions: str,
+        framework: str,
+        language: str,
+        styling: str,
+        project_name: str,
+        overlay: bool = False
+    ) -> str:
         """
         Create framework-specific instruction by loading from template file.
+        In overlay mode the boilerplate sections are swapped for the scaffold overlay ones.
         """
+        instruction = self._render_instruction(instructions, framework, language, styling, project_name, overlay)
+        if not self._compact_nucleus(styling):
+            return instruction
+
+        # The compact reference takes the place of the design system section
+        reference = self._nucleus_reference(self._strip_nucleus_sections(instruction), instructions)
+        instruction = self._replace_section(instruction, self.NUCLEUS_REFERENCE_SECTIONS[0], reference)
+        return self._strip_nucleus_sections(instruction)
+
+    def _create_prompt_parts(
+        self,
+        instructions: str,
+        framework: str,
+        language: str,
+        styling: str,
+        project_name: str,
+        overlay: bool = False
+    ) -> Tuple[str, str]:
+        """
+        (static prefix, request block) for PROMPT_LAYOUT=prefix. The prefix depends only on the
+        template variant, so consecutive requests share it byte for byte and hit the provider's
+        prompt cache; everything request-specific goes into the request block sent after it.
+        """
+        template_version = self._template_version(framework, styling, 'overlay' if overlay else 'single')
+        key = f"{template_version}:{framework.lower()}:{language.lower()}:{styling.lower()}"
+        prefix = self._prompt_prefixes.get(key)
+        if prefix is None:
+            prefix = self._render_instruction(
+                self.REQUEST_REFERENCES["instructions"], framework, language, styling,
+                self.REQUEST_REFERENCES["project_name"], overlay
+            )
+            if self._compact_nucleus(styling):
+                prefix = self._strip_nucleus_sections(prefix)
+            self._prompt_prefixes[key] = prefix
+
+        request_block = f"PROJECT REQUEST:\n- Project name: {project_name}\n- Application to build: {instructions}"
+        if self._compact_nucleus(styling):
+            request_block += "\n\n" + self._nucleus_reference(prefix, instructions)
+        return prefix, request_block
+
+    def _render_instruction(
+        self,
+        instructions: str,
+        framework: str,
+        language: str,
+        styling: str,
+        project_name: str,
+        overlay: bool
+    ) -> str:
+        """Render the instruction template (with the overlay sections in overlay mode)"""
 
         # Determine file extensions and imports based on language and framework
         if language.lower() in ['typescript', 'ts']:
@@ -160,59 +551,135 @@ Return ONLY valid JSON with properly escaped strings:
                 main_ext = "jsx"  # React uses .jsx for JavaScript
             config_files = ""
 
-        # Load the instruction template with styling parameter
+        # Load the precompiled instruction template with styling parameter
         template = self._load_instruction_template(framework, styling)
 
-        # Format the template with the provided variables
+        # Render the template with the provided variables
+        values = {
+            "instructions": instructions,
+            "framework": framework,
+            "language": language,
+            "styling": styling,
+            "project_name": project_name,  # Add project name to template
+            "file_ext": file_ext,
+            "main_ext": main_ext,
+            "config_files": config_files
+        }
+        instruction = template.render(values)
+        if not overlay:
+            return instruction
+
+        values["config_files"] = ""
+        values["entry_file"] = f"src/main.{main_ext}"
+        values["scaffold_files"] = ", ".join(self.scaffold_service.describe(framework, language))
+        for header, name in self._overlay_section_names(framework).items():
+            section = self.overlay_templates.get(name).render(values).strip()
+            instruction = self._replace_section(instruction, header, section)
+        return instruction
+
+    @staticmethod
+    def _overlay_section_names(framework: str) -> dict:
+        """Template section header -> overlay template replacing it"""
+        return {
+            "TECHNICAL REQUIREMENTS - CRITICAL:": "technical_requirements.md",
+            "OUTPUT FORMAT:": "vue_output_format.md" if framework.lower() == "vue" else "react_output_format.md"
+        }
+
+    def _compact_nucleus(self, styling: str) -> bool:
+        return self.nucleus_context is not None and styling.lower() == "nucleuscss"
+
+    def _strip_nucleus_sections(self, instruction: str) -> str:
+        for header in self.NUCLEUS_REFERENCE_SECTIONS:
+            instruction = self._replace_section(instruction, header, "", append=False)
+        return instruction
+
+    def _nucleus_reference(self, stripped_instruction: str, instructions: str) -> str:
+        """Catalog entries relevant to this request; names the remaining rules and examples use stay defined"""
+        pinned = self.nucleus_context.referenced_names(stripped_instruction)
+        return self.nucleus_context.select(instructions, pinned=pinned).render()
+
+    @staticmethod
+    def _replace_section(text: str, header: str, replacement: str, append: bool = True) -> str:
+        """
+        Replace a prompt section (header line up to the next blank line), appending it if absent.
+        An empty replacement removes the section together with its separating blank line.
+        """
+        start = text.find(header)
+        if start == -1:
+            return text.rstrip() + "\n\n" + replacement if append else text
+        end = text.find("\n\n", start)
+        if end == -1:
+            end = len(text)
+        if not replacement:
+            return text[:start].rstrip("\n") + text[end:] if start else text[end:].lstrip("\n")
+        return text[:start] + replacement + text[end:]
+
+    def _scaffold_available(self, framework: str, language: str) -> bool:
         try:
-            formatted_instruction = template.format(
-                instructions=instructions,
-                framework=framework,
-                language=language,
-                styling=styling,
-                project_name=project_name,  # Add project name to template
-                file_ext=file_ext,
-                main_ext=main_ext,
-                config_files=config_files
-            )
-            return formatted_instruction
-        except KeyError as e:
-            self.logger.error(f"Template formatting error - missing variable: {str(e)}")
-            # Return template with basic substitution
-            return template.replace("{instructions}",
-                                    instructions).replace("{framework}",
-                                                          framework).replace("{language}",
-                                                                             language).replace("{styling}",
-                                                                                               styling).replace("{project_name}",
-                                                                                                                project_name)
-
-    async def _call_llm(self, instruction: str) -> str:
+            self.scaffold_service.get_scaffold_dir(framework, language)
+            return True
+        except (ValueError, FileNotFoundError) as e:
+            self.logger.warning(f"Scaffold overlay disabled: {str(e)}")
+            return False
+
+    def _system_prompt(self) -> str:
+        return (
+            "You are a world-class developer with unlimited creative freedom. "
+            "Create amazing web applications. "
+            + (structured_output.SYSTEM_NOTE if self.structured_output else
+               "IMPORTANT: Always return valid JSON with properly escaped strings.")
+        )
+
+    def _build_messages(self, instruction: str, request_block: Optional[str] = None) -> list:
+        """System message and instruction, plus the request block as a final message in the prefix layout"""
+        messages = [
+            {
+                "role": "system",
+                "content": self._system_prompt()
+            },
+            {
+                "role": "user",
+                "content": instruction
+            }
+        ]
+        if request_block is not None:
+            messages.append({"role": "user", "content": request_block})
+        return messages
+
+    def _file_progress_reporter(
+        self,
+        progress_callback: Optional[Callable[[int, str], None]],
+        file_callback: Optional[Callable[[str, str], None]]
+    ) -> Callable[[str, str], None]:
+        """Build an on_file handler that maps streamed files onto the 30-70% progress band"""
+        files_done = []
+
+        def on_file(path: str, content: str):
+            files_done.append(path)
+            if file_callback:
+                file_callback(path, content)
+            if progress_callback:
+                progress = min(30 + 3 * len(files_done), 69)
+                progress_callback(progress, f"AI generated {path} ({len(files_done)} files so far)...")
+
+        return on_file
+
+    async def _call_llm(self, instruction: str, request_block: Optional[str] = None) -> str:
         """Call Azure OpenAI with the ultimate instruction"""
         try:
             start_time = datetime.now()
             self.logger.info(f"Calling Azure OpenAI with ultimate instruction ({len(instruction)} chars)")
 
-            response = self.client.chat.completions.create(
-                model=settings.AZURE_MODEL,
-                messages=[
-                    {
-                        "role": "system",
-                        "content": (
-                            "You are a world-class developer with unlimited creative freedom. "
-                            "Create amazing web applications. "
-                            "IMPORTANT: Always return valid JSON with properly escaped strings."
-                        )
-                    },
-                    {
-                        "role": "user",
-                        "content": instruction
-                    }
-                ],
-                timeout=600
+            response = await self._chat_completion(
+                self._build_messages(instruction, request_block),
+                timeout=settings.LLM_TIMEOUT_SECONDS
             )
 
             elapsed_time = (datetime.now() - start_time).total_seconds()
             response_content = response.choices[0].message.content
+            if response_content is None:
+                # Structured output reports refusals separately from the content
+                raise ValueError(f"Completion has no content: {getattr(response.choices[0].message, 'refusal', None)}")
             self.logger.info(f"Azure OpenAI call completed in {elapsed_time:.2f} seconds")
             self.logger.info(f"Response length: {len(response_content)} characters")
 
@@ -225,234 +692,140 @@ Return ONLY valid JSON with properly escaped strings:
             self.logger.error(f"Azure OpenAI API call failed: {str(e)}")
             raise
 
-    def _parse_project_response(self, response: str, project_name: str) -> SimpleProjectResult:
-        """Parse the AI's response into a structured project"""
+    async def _chat_completion(self, messages: list, **kwargs):
+        """
+        Completion with the project JSON schema as response format when structured output is on.
+        A deployment without structured output support (model or API version) gets the request
+        again as plain JSON, and every later request skips the schema.
+        """
+        if self.structured_output:
+            try:
+                return await self.llm.chat_completion(
+                    messages=messages, response_format=structured_output.PROJECT_RESPONSE_FORMAT, **kwargs
+                )
+            except Exception as e:
+                if not structured_output.is_unsupported(e):
+                    raise
+                self.structured_output = False
+                self.logger.warning(f"Structured output not supported by the deployment, using plain JSON: {str(e)}")
+                messages = [{"role": "system", "content": self._system_prompt()}] + messages[1:]
+        return await self.llm.chat_completion(messages=messages, **kwargs)
+
+    async def _call_llm_stream(
+        self,
+        instruction: str,
+        on_file: Callable[[str, str], None],
+        request_block: Optional[str] = None
+    ) -> str:
+        """Call Azure OpenAI in streaming mode, reporting each file as soon as it is complete"""
         try:
-            # Try to extract JSON from the response
-            json_start = response.find('{')
-            json_end = response.rfind('}') + 1
+            start_time = datetime.now()
+            first_token_time = None
+            self.logger.info(f"Streaming Azure OpenAI call with ultimate instruction ({len(instruction)} chars)")
 
-            if json_start == -1 or json_end == 0:
-                raise ValueError("No JSON found in response")
+            stream = await self._chat_completion(
+                self._build_messages(instruction, request_block),
+                timeout=settings.LLM_TIMEOUT_SECONDS,
+                stream=True
+            )
+
+            extractor = StreamingFilesExtractor()
+            parts = []
+            async for chunk in stream:
+                # Azure sends content-filter chunks without choices
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if not delta:
+                    continue
+                if first_token_time is None:
+                    first_token_time = datetime.now()
+                    self.logger.info(
+                        f"First token after {(first_token_time - start_time).total_seconds():.2f} seconds"
+                    )
+                parts.append(delta)
+                for path, content in extractor.feed(delta):
+                    on_file(path, content)
+
+            response_content = "".join(parts)
+            elapsed_time = (datetime.now() - start_time).total_seconds()
+            self.logger.info(f"Azure OpenAI stream completed in {elapsed_time:.2f} seconds")
+            self.logger.info(
+                f"Response length: {len(response_content)} characters, {len(extractor.files)} files streamed"
+            )
 
-            json_str = response[json_start:json_end]
+            return response_content
 
-            # Log the problematic JSON for debugging
-            self.logger.debug(f"Attempting to parse JSON: {json_str[:500]}...")
+        except Exception as e:
+            self.logger.error(f"Azure OpenAI streaming call failed: {str(e)}")
+            raise
 
-            # Try to fix common JSON escape issues
-            json_str = self._fix_json_escapes(json_str)
+    @staticmethod
+    def _dependency_delta(value) -> dict:
+        """Dependency delta from the response; anything but a name -> version mapping is dropped"""
+        if isinstance(value, list):
+            # Structured output: [{"name", "version"}]
+            value = {item.get("name"): item.get("version") for item in value if isinstance(item, dict)}
+        if not isinstance(value, dict):
+            return {}
+        return {name: version for name, version in value.items() if isinstance(name, str) and isinstance(version, str)}
+
+    def _parse_project_response(
+        self,
+        response: str,
+        project_name: str,
+        scaffold: Optional[str] = None
+    ) -> SimpleProjectResult:
+        """
+        Parse the AI's response into a structured project.
+        With a scaffold the files are application files and the dependency delta is kept for packaging.
+        """
+        try:
+            json_start = response.find('{')
+            if json_start == -1:
+                raise ValueError("No JSON found in response")
+
+            # Fast path: well-formed JSON (trailing prose/fences are ignored by raw_decode)
+            try:
+                project_data, _ = json.JSONDecoder().raw_decode(response, json_start)
+                repaired_files = []
+            except json.JSONDecodeError as e:
+                self.logger.warning(f"Response is not valid JSON ({str(e)}), running tolerant parser")
+                project_data, repaired_files = parse_project_json(response)
+
+            files = project_data.get("files", {})
+            if isinstance(files, list):
+                # Structured output: [{"path", "content"}]
+                files = {
+                    item["path"]: item.get("content")
+                    for item in files if isinstance(item, dict) and isinstance(item.get("path"), str)
+                }
+            if not isinstance(files, dict):
+                raise ValueError("Response JSON has no files object")
+            # Normalize Windows-style path separators in file names ("src\types" may have been decoded as a tab)
+            files = {
+                restore_path_escapes(path).replace('\\', '/'): content
+                for path, content in files.items() if isinstance(content, str)
+            }
+            repaired_files = [restore_path_escapes(path).replace('\\', '/') for path in repaired_files]
+            if not files:
+                raise ValueError("No files could be recovered from the response")
 
-            project_data = json.loads(json_str)
+            if repaired_files:
+                self.logger.warning(f"Recovered {len(files)} files, repaired {len(repaired_files)}: {repaired_files}")
 
             return SimpleProjectResult(
                 project_name=project_name,  # Use user-provided project name
                 framework=project_data.get("framework", "React"),
                 language=project_data.get("language", "JavaScript"),
                 instructions=project_data.get("instructions", "AI generated web application"),
-                files=project_data.get("files", {})
+                files=files,
+                repaired_files=repaired_files,
+                scaffold=scaffold,
+                dependencies=self._dependency_delta(project_data.get("dependencies")) if scaffold else {},
+                dev_dependencies=self._dependency_delta(project_data.get("devDependencies")) if scaffold else {}
             )
 
-        except json.JSONDecodeError as e:
-            self.logger.error(f"Failed to parse JSON response: {str(e)}")
-            self.logger.error(f"JSON error at position {e.pos}: {str(e)}")
-
-            # Log problematic section for debugging
-            start_pos = max(0, e.pos - 100)
-            end_pos = min(len(json_str), e.pos + 100)
-            problematic_section = json_str[start_pos:end_pos]
-            self.logger.error(f"Problematic JSON section: {problematic_section}")
-
-            # Log first 500 characters of the full JSON for context
-            self.logger.debug(f"Full JSON preview: {json_str[:500]}...")
-
-            # Try a more aggressive fix and retry
-            try:
-                fixed_json = self._aggressive_json_fix(json_str, project_name)
-                project_data = json.loads(fixed_json)
-                self.logger.info("Successfully parsed JSON after aggressive fix")
-                return SimpleProjectResult(
-                    project_name=project_name,  # Use user-provided project name
-                    framework=project_data.get("framework", "React"),
-                    language=project_data.get("language", "JavaScript"),
-                    instructions=project_data.get("instructions", "AI generated web application"),
-                    files=project_data.get("files", {})
-                )
-            except Exception as e2:
-                self.logger.error(f"Aggressive fix also failed: {str(e2)}")
         except Exception as e:
             self.logger.error(f"Failed to parse response: {str(e)}")
-
-    def _fix_json_escapes(self, json_str: str) -> str:
-        """Fix common JSON escape issues that cause parsing errors"""
-
-        # Simple but effective approach: fix the most common issues
-        # 1. Replace Windows-style paths with forward slashes in keys
-        # 2. Convert multiline string values to single line with proper escaping
-
-        lines = json_str.split('\n')
-        result_lines = []
-        in_multiline_string = False
-        current_multiline_content = []
-        current_line_prefix = ""
-
-        for line in lines:
-            stripped = line.strip()
-
-            # Skip empty lines
-            if not stripped:
-                continue
-
-            # Check if this line starts a potential multiline string value
-            if '": "' in stripped and not stripped.endswith('",') and not stripped.endswith('"'):
-                # This might be starting a multiline string
-                parts = stripped.split('": "', 1)
-                if len(parts) == 2:
-                    key_part = parts[0]
-                    value_start = parts[1]
-
-                    # Fix backslashes in the key (file paths)
-                    key_part = key_part.replace('\\', '/')
-
-                    # Start collecting multiline content
-                    in_multiline_string = True
-                    current_line_prefix = key_part + '": "'
-                    current_multiline_content = [value_start]
-                    continue
-
-            # If we're in a multiline string, collect content until we find the end
-            if in_multiline_string:
-                if stripped.endswith('",') or stripped.endswith('"'):
-                    # End of multiline string
-                    if stripped.endswith('",'):
-                        current_multiline_content.append(stripped[:-2])
-                        suffix = '",'
-                    else:
-                        current_multiline_content.append(stripped[:-1])
-                        suffix = '"'
-
-                    # Join all content and escape it properly
-                    full_content = '\n'.join(current_multiline_content)
-
-                    # Escape the content for JSON
-                    full_content = full_content.replace('\\', '\\\\')  # Escape backslashes
-                    full_content = full_content.replace('"', '\\"')   # Escape quotes
-                    full_content = full_content.replace('\n', '\\n')  # Escape newlines
-                    full_content = full_content.replace('\r', '\\r')  # Escape carriage returns
-                    full_content = full_content.replace('\t', '\\t')  # Escape tabs
-
-                    # Reconstruct the line
-                    result_lines.append(current_line_prefix + full_content + suffix)
-
-                    # Reset state
-                    in_multiline_string = False
-                    current_multiline_content = []
-                    current_line_prefix = ""
-                else:
-                    # Continue collecting multiline content
-                    current_multiline_content.append(stripped)
-                continue
-
-            # Regular line processing
-            if '": "' in stripped and (stripped.endswith('",') or stripped.endswith('"')):
-                # Single line key-value pair
-                parts = stripped.split('": "', 1)
-                if len(parts) == 2:
-                    key_part = parts[0]
-                    value_part = parts[1]
-
-                    # Fix backslashes in the key
-                    key_part = key_part.replace('\\', '/')
-
-                    # The value should already be properly formatted, but fix just in case
-                    result_lines.append(key_part + '": "' + value_part)
-                else:
-                    result_lines.append(stripped)
-            else:
-                # Fix backslashes in keys that might be object keys
-                if stripped.startswith('"') and '": {' in stripped:
-                    result_lines.append(stripped.replace('\\', '/'))
-                else:
-                    result_lines.append(stripped)
-
-        return '\n'.join(result_lines)
-
-    def _aggressive_json_fix(self, json_str: str, user_project_name: str) -> str:
-        """More aggressive JSON fixing for severely malformed JSON"""
-
-        # Last resort: try to extract key-value pairs and reconstruct valid JSON
-        try:
-            # Look for the basic structure and extract what we can
-            import re
-            import json
-
-            project_name = user_project_name  # Use user-provided project name
-            framework = "React"
-            language = "JavaScript"
-            instructions = "AI generated web application"
-            files = {}
-
-            # Try to extract project_name
-            name_match = re.search(r'"project_name":\s*"([^"]*)"', json_str)
-            if name_match:
-                project_name = name_match.group(1)
-
-            # Try to extract framework
-            framework_match = re.search(r'"framework":\s*"([^"]*)"', json_str)
-            if framework_match:
-                framework = framework_match.group(1)
-
-            # Try to extract language
-            language_match = re.search(r'"language":\s*"([^"]*)"', json_str)
-            if language_match:
-                language = language_match.group(1)
-
-            # Extract instructions
-            desc_match = re.search(r'"instructions":\s*"([^"]*)"', json_str)
-            if desc_match:
-                instructions = desc_match.group(1)
-
-            # For files, create a simple default structure
-            files = {
-                "src/App.js": (
-                    f"import React from 'react';\n"
-                    f"function App() {{\n"
-                    f"  return <div><h1>{project_name}</h1></div>;\n"
-                    f"}}\n"
-                    f"export default App;"
-                ),
-                "package.json": (
-                    f'{{\n'
-                    f'  "name": "{project_name.lower().replace(" ", "-")}",\n'
-                    f'  "version": "1.0.0",\n'
-                    f'  "dependencies": {{\n'
-                    f'    "react": "^18.0.0"\n'
-                    f'  }}\n'
-                    f'}}'
-                )
-            }
-
-            # Construct valid JSON manually
-            result = {
-                "project_name": project_name,
-                "framework": framework,
-                "language": language,
-                "instructions": instructions,
-                "files": files
-            }
-
-            return json.dumps(result)
-
-        except Exception:
-            # If even this fails, return minimal valid JSON
-            import json
-            return json.dumps({
-                "project_name": user_project_name,  # Use user-provided project name
-                "framework": "React",
-                "language": "JavaScript",
-                "instructions": "Fallback project due to parsing errors",
-                "files": {
-                    "src/App.js": "import React from 'react'; function App() { return <div>Fallback App</div>; } "
-                    "export default App;"
-                }
-            })
+            self.logger.debug(f"Response preview: {response[:500]}...")
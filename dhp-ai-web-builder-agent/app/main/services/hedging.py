@@ -0,0 +1,88 @@
+import bisect
+import math
+from collections import deque
+from typing import Dict, Optional
+
+
+class LatencyWindow:
+    """Latencies of the most recent completions, for percentile lookups"""
+
+    def __init__(self, size: int):
+        self._samples = deque(maxlen=size)
+        self._sorted = []
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def add(self, seconds: float):
+        if len(self._samples) == self._samples.maxlen:
+            del self._sorted[bisect.bisect_left(self._sorted, self._samples[0])]
+        self._samples.append(seconds)
+        bisect.insort(self._sorted, seconds)
+
+    def percentile(self, percent: float) -> float:
+        # Nearest-rank percentile
+        index = min(len(self._sorted) - 1, max(0, math.ceil(percent / 100.0 * len(self._sorted)) - 1))
+        return self._sorted[index]
+
+
+class HedgeBudget:
+    """
+    Caps hedges to a share of requests: every request earns `ratio` credit
+    (up to `burst`) and a hedge spends one.
+    """
+
+    def __init__(self, ratio: float, burst: float):
+        self.ratio = ratio
+        self.burst = max(1.0, burst)
+        self.credit = 0.0
+
+    def earn(self):
+        self.credit = min(self.burst, self.credit + self.ratio)
+
+    def spend(self) -> bool:
+        if self.credit < 1.0:
+            return False
+        self.credit -= 1.0
+        return True
+
+
+class HedgePolicy:
+    """
+    When to send a second copy of a slow completion request.
+
+    A request is hedged once it has waited longer than the given percentile of
+    recent latencies of its kind (time to first token for streams, total time
+    otherwise) and the budget has credit. Until `min_samples` latencies are
+    known nothing is hedged.
+    """
+
+    def __init__(
+        self,
+        percentile: float,
+        min_delay: float,
+        min_samples: int,
+        budget_ratio: float,
+        budget_burst: float,
+        window: int = 500
+    ):
+        self.percentile = percentile
+        self.min_delay = min_delay
+        self.min_samples = max(1, min_samples)
+        self.budget = HedgeBudget(budget_ratio, budget_burst)
+        self._window_size = window
+        self._latencies: Dict[str, LatencyWindow] = {}
+
+    def observe(self, kind: str, seconds: float):
+        """Record how long an unhedged (or winning) request of this kind took"""
+        if kind not in self._latencies:
+            self._latencies[kind] = LatencyWindow(self._window_size)
+        self._latencies[kind].add(seconds)
+
+    def delay(self, kind: str) -> Optional[float]:
+        """Seconds to wait before hedging a new request of this kind, None while there are too few samples"""
+        self.budget.earn()
+        latencies = self._latencies.get(kind)
+        if latencies is None or len(latencies) < self.min_samples:
+            return None
+        return max(self.min_delay, latencies.percentile(self.percentile))
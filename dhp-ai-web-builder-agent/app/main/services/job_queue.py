@@ -0,0 +1,159 @@
+import asyncio
+import logging
+import math
+import time
+from collections import OrderedDict, deque
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from app.main.configs.MainConfig import settings
+
+
+class QueueFullError(Exception):
+    """Raised when the generation queue cannot accept more jobs"""
+
+
+class QueueClosedError(Exception):
+    """Raised when jobs are submitted while the queue is shutting down"""
+
+
+class GenerationQueueService:
+    """
+    Bounded asyncio job queue with a fixed pool of workers.
+    Jobs are submitted as coroutine factories and run in FIFO order,
+    at most `max_concurrency` at a time.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = settings.GENERATION_MAX_CONCURRENCY,
+        max_queue_size: int = settings.GENERATION_QUEUE_SIZE,
+        default_duration: float = settings.GENERATION_ETA_DEFAULT_SECONDS
+    ):
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_queue_size = max(1, max_queue_size)
+        self.default_duration = default_duration
+        self.logger = logging.getLogger(__name__)
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: List[asyncio.Task] = []
+        self._pending: "OrderedDict[str, Callable[[], Awaitable]]" = OrderedDict()
+        self._running: Dict[str, float] = {}
+        self._durations: deque = deque(maxlen=20)
+        self._closed = False
+
+    async def start(self):
+        """Start the worker pool (idempotent)"""
+        if self._workers:
+            return
+        self._closed = False
+        self._queue = asyncio.Queue(maxsize=self.max_queue_size)
+        self._workers = [
+            asyncio.create_task(self._worker(i), name=f"generation-worker-{i}")
+            for i in range(self.max_concurrency)
+        ]
+        self.logger.info(
+            f"Generation queue started with {self.max_concurrency} workers, queue size {self.max_queue_size}"
+        )
+
+    async def stop(self) -> List[str]:
+        """
+        Stop accepting jobs and cancel the worker pool.
+        Returns the ids of jobs that were still queued or running, so their
+        statuses can be closed instead of staying non-terminal forever.
+        """
+        self._closed = True
+        abandoned = list(self._running) + list(self._pending)
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        self._pending.clear()
+        self._running.clear()
+        if abandoned:
+            self.logger.warning(f"Generation queue stopped with {len(abandoned)} unfinished jobs")
+        return abandoned
+
+    async def submit(self, job_id: str, job_factory: Callable[[], Awaitable]) -> int:
+        """
+        Enqueue a job and return its 1-based queue position.
+        Raises QueueFullError when the queue is at capacity.
+        """
+        if self._closed:
+            raise QueueClosedError("Generation queue is shutting down")
+        if not self._workers:
+            await self.start()
+
+        try:
+            self._queue.put_nowait(job_id)
+        except asyncio.QueueFull:
+            raise QueueFullError(f"Generation queue is full ({self.max_queue_size} jobs waiting)")
+
+        self._pending[job_id] = job_factory
+        return len(self._pending)
+
+    def holds(self, job_id: str) -> bool:
+        """True while the job is waiting or running"""
+        return job_id in self._pending or job_id in self._running
+
+    def position(self, job_id: str) -> Optional[int]:
+        """1-based position among waiting jobs, 0 if running, None if unknown"""
+        if job_id in self._running:
+            return 0
+        for index, pending_id in enumerate(self._pending):
+            if pending_id == job_id:
+                return index + 1
+        return None
+
+    def average_duration(self) -> float:
+        """Moving average of recent job durations in seconds"""
+        if not self._durations:
+            return self.default_duration
+        return sum(self._durations) / len(self._durations)
+
+    def estimate_wait(self, job_id: str) -> Optional[float]:
+        """Estimated seconds until the job completes"""
+        average = self.average_duration()
+        if job_id in self._running:
+            elapsed = time.monotonic() - self._running[job_id]
+            return round(max(average - elapsed, 0.0), 1)
+
+        position = self.position(job_id)
+        if position is None:
+            return None
+        # Each "wave" of max_concurrency jobs takes roughly one average duration
+        waves = math.ceil((position + len(self._running)) / self.max_concurrency)
+        return round(waves * average, 1)
+
+    def retry_after(self) -> int:
+        """Suggested Retry-After seconds when the queue rejects a job"""
+        return max(1, int(self.average_duration() / self.max_concurrency))
+
+    def stats(self) -> dict:
+        return {
+            "max_concurrency": self.max_concurrency,
+            "max_queue_size": self.max_queue_size,
+            "queued": len(self._pending),
+            "running": len(self._running),
+            "average_duration_seconds": round(self.average_duration(), 1),
+        }
+
+    async def _worker(self, index: int):
+        while True:
+            job_id = await self._queue.get()
+            job_factory = self._pending.pop(job_id, None)
+            if job_factory is None:
+                self._queue.task_done()
+                continue
+
+            started = time.monotonic()
+            self._running[job_id] = started
+            try:
+                await job_factory()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.logger.error(f"Generation job {job_id} failed in worker {index}: {str(e)}")
+            finally:
+                self._running.pop(job_id, None)
+                self._durations.append(time.monotonic() - started)
+                self._queue.task_done()
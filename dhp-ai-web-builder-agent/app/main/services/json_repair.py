@@ -0,0 +1,296 @@
+import re
+from typing import Any, List, Optional, Tuple
+
+
+class JSONRepairError(ValueError):
+    """Raised when no JSON object can be recovered from a response"""
+
+
+_STRING_SPECIAL = re.compile(r'["\\\x00-\x1f]')
+_NUMBER = re.compile(r"-?(?:0|[1-9]\d*)(?:\.\d+)?(?:[eE][+-]?\d+)?")
+_WHITESPACE = re.compile(r"\s*")
+_ESCAPES = {'"': '"', "\\": "\\", "/": "/", "b": "\b", "f": "\f", "n": "\n", "r": "\r", "t": "\t"}
+# Escapes that decode to control characters; in a file path key "\t" is "src\types", not a tab
+_CONTROL_ESCAPES = {"b": "\b", "f": "\f", "n": "\n", "r": "\r", "t": "\t"}
+_PATH_CONTROL = {ord(char): "\\" + escape for escape, char in _CONTROL_ESCAPES.items()}
+_KEY_AHEAD = re.compile(r'"[^"\n]{0,300}"\s*:')
+_LITERALS = (("true", True), ("false", False), ("null", None))
+
+
+class TolerantJSONParser:
+    """
+    Single-pass JSON parser that recovers the mistakes LLMs make in large JSON payloads:
+
+    - raw newlines, tabs and other control characters inside strings
+    - invalid escapes such as Windows paths ("src\\components\\App.jsx")
+    - unescaped double quotes inside string values
+    - missing or trailing commas
+    - output truncated before the closing brackets
+
+    Every recovery is recorded in `repairs` as (path, reason), where path is the
+    tuple of keys/indexes leading to the repaired value.
+    """
+
+    def __init__(self, text: str):
+        self.text = text
+        self.length = len(text)
+        self.pos = 0
+        self.repairs: List[Tuple[tuple, str]] = []
+        # Open containers ("{" or "["), used to validate what may follow a closing quote
+        self._stack: List[str] = []
+
+    def parse(self) -> Any:
+        start = self.text.find("{")
+        if start == -1:
+            raise JSONRepairError("No JSON object found in response")
+        self.pos = start
+        return self._parse_value(())
+
+    def _repair(self, path: tuple, reason: str):
+        self.repairs.append((path, reason))
+
+    def _skip_whitespace(self):
+        self.pos = _WHITESPACE.match(self.text, self.pos).end()
+
+    def _peek(self) -> Optional[str]:
+        self._skip_whitespace()
+        return self.text[self.pos] if self.pos < self.length else None
+
+    def _parse_value(self, path: tuple) -> Any:
+        char = self._peek()
+        if char is None:
+            self._repair(path, "truncated")
+            return None
+        if char == "{":
+            return self._parse_object(path)
+        if char == "[":
+            return self._parse_array(path)
+        if char == '"':
+            return self._parse_string(path)
+
+        for literal, value in _LITERALS:
+            if self.text.startswith(literal, self.pos):
+                self.pos += len(literal)
+                return value
+
+        match = _NUMBER.match(self.text, self.pos)
+        if match:
+            self.pos = match.end()
+            number = match.group(0)
+            return float(number) if any(c in number for c in ".eE") else int(number)
+
+        # Bare text where a value should be: read it up to the next delimiter as a string
+        end = self.pos
+        while end < self.length and self.text[end] not in ",}]\n":
+            end += 1
+        value = self.text[self.pos:end].strip()
+        self.pos = end
+        self._repair(path, "unquoted value")
+        return value
+
+    def _parse_object(self, path: tuple) -> dict:
+        self.pos += 1  # {
+        self._stack.append("{")
+        try:
+            return self._parse_members(path)
+        finally:
+            self._stack.pop()
+
+    def _parse_members(self, path: tuple) -> dict:
+        result = {}
+        while True:
+            char = self._peek()
+            if char is None:
+                self._repair(path, "truncated")
+                return result
+            if char == "}":
+                self.pos += 1
+                return result
+            if char == ",":
+                # Stray or trailing comma
+                self.pos += 1
+                continue
+            if char != '"':
+                # Garbage where a key should be; skip to the next quote or closing brace
+                self._repair(path, f"unexpected character {char!r}")
+                next_quote = self.text.find('"', self.pos)
+                next_close = self.text.find("}", self.pos)
+                if next_quote == -1 and next_close == -1:
+                    self.pos = self.length
+                elif next_quote == -1 or (next_close != -1 and next_close < next_quote):
+                    self.pos = next_close
+                else:
+                    self.pos = next_quote
+                continue
+
+            key = self._parse_string(path, key=True)
+            if self._peek() == ":":
+                self.pos += 1
+            else:
+                self._repair(path + (key,), "missing colon")
+            result[key] = self._parse_value(path + (key,))
+
+            char = self._peek()
+            if char == ",":
+                self.pos += 1
+            elif char not in ("}", None):
+                self._repair(path + (key,), "missing comma")
+
+    def _parse_array(self, path: tuple) -> list:
+        self.pos += 1  # [
+        self._stack.append("[")
+        try:
+            return self._parse_items(path)
+        finally:
+            self._stack.pop()
+
+    def _parse_items(self, path: tuple) -> list:
+        result = []
+        while True:
+            char = self._peek()
+            if char is None:
+                self._repair(path, "truncated")
+                return result
+            if char == "]":
+                self.pos += 1
+                return result
+            if char == ",":
+                self.pos += 1
+                continue
+            result.append(self._parse_value(path + (len(result),)))
+            char = self._peek()
+            if char == ",":
+                self.pos += 1
+            elif char not in ("]", None):
+                self._repair(path + (len(result) - 1,), "missing comma")
+
+    def _parse_string(self, path: tuple, key: bool = False) -> str:
+        text = self.text
+        self.pos += 1  # opening quote
+        parts = []
+        first_repair = len(self.repairs)
+        while True:
+            match = _STRING_SPECIAL.search(text, self.pos)
+            if match is None:
+                parts.append(text[self.pos:])
+                self.pos = self.length
+                self._repair(path, "truncated")
+                break
+
+            index = match.start()
+            parts.append(text[self.pos:index])
+            char = text[index]
+
+            if char == '"':
+                if self._is_string_end(index + 1, key):
+                    self.pos = index + 1
+                    break
+                # Unescaped quote inside the value
+                parts.append('"')
+                self.pos = index + 1
+                self._repair(path, "unescaped quote")
+            elif char == "\\":
+                escape = text[index + 1:index + 2]
+                if key and escape in _CONTROL_ESCAPES:
+                    # Windows path separator in a file name (src\types\index.ts)
+                    parts.append("\\")
+                    self.pos = index + 1
+                    self._repair(path, "invalid escape")
+                elif escape in _ESCAPES:
+                    parts.append(_ESCAPES[escape])
+                    self.pos = index + 2
+                elif escape == "u" and re.fullmatch(r"[0-9a-fA-F]{4}", text[index + 2:index + 6]):
+                    parts.append(chr(int(text[index + 2:index + 6], 16)))
+                    self.pos = index + 6
+                else:
+                    # Invalid escape such as a Windows path separator: keep the backslash
+                    parts.append("\\")
+                    self.pos = index + 1
+                    self._repair(path, "invalid escape")
+            else:
+                # Raw control character (usually a newline) inside the string
+                parts.append(char)
+                self.pos = index + 1
+                self._repair(path, "unescaped control character")
+
+        value = "".join(parts)
+        if key:
+            # Repairs inside a key are reported against the member it names
+            for index in range(first_repair, len(self.repairs)):
+                self.repairs[index] = (path + (value,), self.repairs[index][1])
+        return value
+
+    def _is_string_end(self, index: int, key: bool) -> bool:
+        """
+        Decide whether a quote closes the string by checking that the text after it is
+        a valid continuation of the enclosing containers (a closer, or a comma followed
+        by the next member). JSX like `title: "Home" },` fails that check and stays content.
+        """
+        text = self.text
+        index = _WHITESPACE.match(text, index).end()
+        if key:
+            return index >= self.length or text[index] == ":"
+
+        depth = len(self._stack) - 1
+        while True:
+            if index >= self.length or depth < 0:
+                return True
+            char = text[index]
+            container = self._stack[depth]
+            if char == ("}" if container == "{" else "]"):
+                depth -= 1
+                index = _WHITESPACE.match(text, index + 1).end()
+                continue
+            if container == "{" and self._starts_key(index):
+                # Missing comma before the next member
+                return True
+            if char != ",":
+                return False
+            # After a comma the next member must be a key (object) or any value (array)
+            index = _WHITESPACE.match(text, index + 1).end()
+            if index >= self.length:
+                return True
+            if container == "[":
+                return text[index] in '"{[-0123456789tfn]'
+            return text[index] == "}" or self._starts_key(index)
+
+    def _starts_key(self, index: int) -> bool:
+        """True if a '"key":' member starts at index"""
+        if self.text[index] != '"':
+            return False
+        match = _KEY_AHEAD.match(self.text, index)
+        return match is not None
+
+
+def restore_path_escapes(path: str) -> str:
+    """
+    Undo control-character escapes decoded from a Windows-style file path key by a strict
+    JSON parser: "src<TAB>ypes" -> "src\\types". File names never contain control characters.
+    """
+    return path.translate(_PATH_CONTROL)
+
+
+def parse_project_json(text: str) -> Tuple[dict, List[str]]:
+    """
+    Parse an LLM project response, returning (data, repaired_files).
+    repaired_files lists the paths of the "files" entries that needed a repair to be recovered,
+    for both the object form and the structured-output array form ([{"path", "content"}]).
+    """
+    parser = TolerantJSONParser(text)
+    data = parser.parse()
+    if not isinstance(data, dict):
+        raise JSONRepairError("Response JSON is not an object")
+
+    files = data.get("files")
+    repaired_files = []
+    for path, _reason in parser.repairs:
+        if len(path) < 2 or path[0] != "files":
+            continue
+        name = path[1]
+        if isinstance(files, list):
+            # Array repairs are located by item index: report the item's path instead
+            item = files[name] if isinstance(name, int) and name < len(files) else None
+            name = item.get("path") if isinstance(item, dict) else None
+        if isinstance(name, str) and name not in repaired_files:
+            repaired_files.append(name)
+    return data, repaired_files
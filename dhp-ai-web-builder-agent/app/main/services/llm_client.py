@@ -0,0 +1,334 @@
+import asyncio
+import logging
+import random
+import time
+from typing import Optional
+
+import httpx
+import openai
+from openai import AsyncAzureOpenAI, DefaultAsyncHttpxClient
+
+from app.main.configs.MainConfig import settings
+from app.main.services import metrics
+from app.main.services.hedging import HedgePolicy
+
+
+class TokenBucket:
+    """Token bucket refilled continuously at `capacity` units per minute"""
+
+    def __init__(self, capacity: float):
+        self.capacity = capacity
+        self.tokens = capacity
+        self.rate = capacity / 60.0
+        self.updated = time.monotonic()
+
+    def refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float) -> float:
+        """Seconds until `amount` units are available (0 if available now)"""
+        # Requests larger than the whole bucket are let through once it is full
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) / self.rate
+
+    def consume(self, amount: float):
+        self.tokens -= min(amount, self.capacity)
+
+
+class RateLimitScheduler:
+    """
+    Client-side scheduler for an Azure OpenAI deployment quota.
+    Callers wait locally for TPM/RPM budget instead of being throttled with 429s.
+    A limit of 0 disables that bucket.
+    """
+
+    def __init__(self, tokens_per_minute: int, requests_per_minute: int):
+        self.tokens = TokenBucket(tokens_per_minute) if tokens_per_minute > 0 else None
+        self.requests = TokenBucket(requests_per_minute) if requests_per_minute > 0 else None
+        self._lock = asyncio.Lock()
+        self._paused_until = 0.0
+
+    async def acquire(self, estimated_tokens: int):
+        """Wait until one request of `estimated_tokens` fits within the quota"""
+        async with self._lock:
+            while True:
+                wait = self._paused_until - time.monotonic()
+                if self.tokens:
+                    self.tokens.refill()
+                    wait = max(wait, self.tokens.wait_time(estimated_tokens))
+                if self.requests:
+                    self.requests.refill()
+                    wait = max(wait, self.requests.wait_time(1))
+                if wait <= 0:
+                    break
+                await asyncio.sleep(wait)
+
+            if self.tokens:
+                self.tokens.consume(estimated_tokens)
+            if self.requests:
+                self.requests.consume(1)
+
+    def reconcile(self, estimated_tokens: int, actual_tokens: int):
+        """Correct the token bucket once the real usage of a request is known"""
+        if self.tokens:
+            self.tokens.refill()
+            self.tokens.tokens = min(self.tokens.capacity, self.tokens.tokens + estimated_tokens - actual_tokens)
+
+    def pause(self, seconds: float):
+        """Hold every caller back, e.g. after the service answered with Retry-After"""
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+
+class LLMClient:
+    """
+    Shared AsyncAzureOpenAI client with a pooled HTTP connection set,
+    jittered exponential backoff on 429/5xx, local quota scheduling and
+    optional hedging of slow requests.
+    """
+
+    RETRYABLE_STATUS = (408, 409, 429, 500, 502, 503, 504)
+
+    def __init__(self):
+        self.logger = logging.getLogger(__name__)
+        self.http_client = DefaultAsyncHttpxClient(
+            limits=httpx.Limits(
+                max_connections=settings.LLM_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.LLM_MAX_CONNECTIONS
+            ),
+            timeout=httpx.Timeout(settings.LLM_TIMEOUT_SECONDS, connect=10.0)
+        )
+        self.client = AsyncAzureOpenAI(
+            api_version=settings.AZURE_API_VERSION,
+            azure_endpoint=settings.AZURE_ENDPOINT,
+            api_key=settings.AZURE_OPENAI_API_KEY,
+            http_client=self.http_client,
+            # Retries are handled here so they can honour the shared scheduler
+            max_retries=0
+        )
+        self.scheduler = RateLimitScheduler(settings.AZURE_TPM_LIMIT, settings.AZURE_RPM_LIMIT)
+        self.max_retries = settings.LLM_MAX_RETRIES
+        self.backoff_base = settings.LLM_BACKOFF_BASE_SECONDS
+        self.backoff_max = settings.LLM_BACKOFF_MAX_SECONDS
+        self.hedging = HedgePolicy(
+            settings.LLM_HEDGE_PERCENTILE,
+            settings.LLM_HEDGE_MIN_DELAY_SECONDS,
+            settings.LLM_HEDGE_MIN_SAMPLES,
+            settings.LLM_HEDGE_BUDGET_RATIO,
+            settings.LLM_HEDGE_BUDGET_BURST
+        ) if settings.LLM_HEDGING_ENABLED else None
+        self.hedge_deployment = settings.LLM_HEDGE_DEPLOYMENT or settings.AZURE_MODEL
+
+    @staticmethod
+    def estimate_tokens(messages: list) -> int:
+        """Rough prompt + completion token estimate used for quota scheduling"""
+        prompt_chars = sum(len(message.get("content") or "") for message in messages)
+        return prompt_chars // 4 + settings.LLM_EXPECTED_COMPLETION_TOKENS
+
+    async def chat_completion(self, messages: list, **kwargs):
+        """
+        Create a chat completion (or a stream when stream=True) with retries.
+        For streams only establishing the response is retried.
+        """
+        if kwargs.get("stream") and settings.LLM_STREAM_INCLUDE_USAGE:
+            kwargs.setdefault("stream_options", {"include_usage": True})
+        if self.hedging is None:
+            return await self._create(settings.AZURE_MODEL, messages, kwargs)
+        if kwargs.get("stream"):
+            stream, chunks = await self._hedged(
+                "first_token",
+                lambda model: self._open_stream(model, messages, kwargs),
+                discard=lambda opened: opened[0].aclose()
+            )
+            return self._resume_stream(stream, chunks)
+        return await self._hedged("total", lambda model: self._create(model, messages, kwargs))
+
+    async def _create(self, model: str, messages: list, kwargs: dict):
+        estimated_tokens = self.estimate_tokens(messages)
+        attempt = 0
+        started = time.perf_counter()
+
+        while True:
+            await self.scheduler.acquire(estimated_tokens)
+            try:
+                response = await self.client.chat.completions.create(
+                    model=model,
+                    messages=messages,
+                    **kwargs
+                )
+            except (openai.APIConnectionError, openai.APIStatusError) as e:
+                status_code = getattr(e, "status_code", None)
+                retryable = status_code is None or status_code in self.RETRYABLE_STATUS
+                if not retryable or attempt >= self.max_retries:
+                    raise
+
+                delay = self._backoff_delay(attempt, e)
+                if status_code == 429:
+                    self.scheduler.pause(delay)
+                attempt += 1
+                self.logger.warning(
+                    f"Azure OpenAI call failed ({status_code or type(e).__name__}), "
+                    f"retry {attempt}/{self.max_retries} in {delay:.1f} seconds"
+                )
+                await asyncio.sleep(delay)
+                continue
+
+            if kwargs.get("stream"):
+                return self._instrument_stream(response, started, estimated_tokens)
+
+            metrics.observe_stage("llm_total", time.perf_counter() - started)
+            self._record_usage(getattr(response, "usage", None), estimated_tokens)
+            return response
+
+    async def _open_stream(self, model: str, messages: list, kwargs: dict) -> tuple:
+        """Start a stream and read it up to the first content chunk; returns (stream, chunks read)"""
+        stream = await self._create(model, messages, kwargs)
+        chunks = []
+        try:
+            async for chunk in stream:
+                chunks.append(chunk)
+                if chunk.choices and chunk.choices[0].delta.content:
+                    break
+        except BaseException:
+            await stream.aclose()
+            raise
+        return stream, chunks
+
+    @staticmethod
+    async def _resume_stream(stream, chunks: list):
+        try:
+            for chunk in chunks:
+                yield chunk
+            async for chunk in stream:
+                yield chunk
+        finally:
+            await stream.aclose()
+
+    @staticmethod
+    def _succeeded(task: asyncio.Task) -> bool:
+        return not task.cancelled() and task.exception() is None
+
+    async def _hedged(self, kind: str, start, discard=None):
+        """
+        Run start(deployment) and, if it has not returned after the policy's delay and the
+        budget allows, start(hedge deployment) as well; the first to succeed wins and the
+        other one is cancelled, or passed to discard() if it succeeded at the same time.
+        Only the primary request's latency is added to the policy's samples: its own when it
+        succeeds first, or the time until the hedge won (a lower bound) when it is cancelled,
+        so slow primaries keep counting and the hedge delay does not drift down.
+        """
+        started = time.perf_counter()
+        primary = asyncio.create_task(start(settings.AZURE_MODEL))
+        delay = self.hedging.delay(kind)
+        try:
+            if delay is not None:
+                await asyncio.wait({primary}, timeout=delay)
+            if delay is None or primary.done() or not self.hedging.budget.spend():
+                if delay is not None and not primary.done():
+                    metrics.LLM_HEDGES.inc(kind=kind, outcome="over_budget")
+                result = await primary
+                self.hedging.observe(kind, time.perf_counter() - started)
+                return result
+        except asyncio.CancelledError:
+            primary.cancel()
+            raise
+
+        self.logger.info(f"No {kind.replace('_', ' ')} after {delay:.1f} seconds, hedging on {self.hedge_deployment}")
+        metrics.observe_stage("llm_hedge_delay", delay)
+        hedge = asyncio.create_task(start(self.hedge_deployment))
+        tasks = {primary: "primary", hedge: "hedge"}
+        pending = set(tasks)
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                if primary in done and self._succeeded(primary):
+                    self.hedging.observe(kind, time.perf_counter() - started)
+                winners = [task for task in done if self._succeeded(task)]
+                if winners:
+                    winner = primary if primary in winners else winners[0]
+                    for task in winners:
+                        if task is not winner and discard is not None:
+                            await discard(task.result())
+                    if not primary.done():
+                        self.hedging.observe(kind, time.perf_counter() - started)
+                    metrics.LLM_HEDGES.inc(kind=kind, outcome=f"{tasks[winner]}_won")
+                    return winner.result()
+            metrics.LLM_HEDGES.inc(kind=kind, outcome="failed")
+            return primary.result()
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def _instrument_stream(self, stream, started: float, estimated_tokens: int):
+        """Pass a completion stream through, recording time to first token, total time and usage"""
+        first_token = False
+        usage = None
+        try:
+            async for chunk in stream:
+                if not first_token and chunk.choices and chunk.choices[0].delta.content:
+                    first_token = True
+                    metrics.observe_stage("llm_first_token", time.perf_counter() - started)
+                usage = getattr(chunk, "usage", None) or usage
+                yield chunk
+        finally:
+            metrics.observe_stage("llm_total", time.perf_counter() - started)
+            self._record_usage(usage, estimated_tokens)
+            if hasattr(stream, "close"):
+                # Releases the connection when the stream is abandoned early (e.g. a losing hedge)
+                await stream.close()
+
+    def _record_usage(self, usage, estimated_tokens: int):
+        """Token metrics, per-request log line (prompt cache hits included) and quota reconciliation"""
+        if usage is None:
+            return
+        metrics.record_tokens(usage)
+        counts = metrics.usage_counts(usage)
+        self.logger.info(
+            f"Completion usage: {counts['prompt_tokens']} prompt tokens "
+            f"({counts['cached_tokens']} cached), {counts['completion_tokens']} completion tokens"
+        )
+        if getattr(usage, "total_tokens", None):
+            self.scheduler.reconcile(estimated_tokens, usage.total_tokens)
+
+    def _backoff_delay(self, attempt: int, error: Exception) -> float:
+        """Exponential backoff with full jitter, never shorter than Retry-After"""
+        delay = random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+        retry_after = self._retry_after(error)
+        if retry_after is not None:
+            delay = max(delay, retry_after + random.uniform(0, self.backoff_base))
+        return delay
+
+    @staticmethod
+    def _retry_after(error: Exception) -> Optional[float]:
+        response = getattr(error, "response", None)
+        if response is None:
+            return None
+
+        headers = response.headers
+        try:
+            if "retry-after-ms" in headers:
+                return float(headers["retry-after-ms"]) / 1000.0
+            if "retry-after" in headers:
+                return float(headers["retry-after"])
+        except ValueError:
+            # HTTP-date form of Retry-After is not used by Azure OpenAI
+            return None
+        return None
+
+    async def close(self):
+        await self.client.close()
+
+
+_llm_client: Optional[LLMClient] = None
+
+
+def get_llm_client() -> LLMClient:
+    """Process-wide LLM client so every service shares one connection pool and quota"""
+    global _llm_client
+    if _llm_client is None:
+        _llm_client = LLMClient()
+    return _llm_client
@@ -0,0 +1,285 @@
+import bisect
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+from app.main.configs.MainConfig import settings
+
+try:
+    from opentelemetry import trace as otel_trace
+except ImportError:  # tracing is optional
+    otel_trace = None
+
+# framework / language / styling of the generation running in the current task;
+# asyncio tasks and asyncio.to_thread inherit it, so deep call sites need no extra arguments
+_generation_labels: contextvars.ContextVar[Tuple[str, str, str]] = contextvars.ContextVar(
+    "generation_labels", default=("unknown", "unknown", "unknown")
+)
+GENERATION_LABELS = ("framework", "language", "styling")
+# Request fields are free-form strings: labels are limited to these values (any other is "other")
+# so clients cannot create unbounded series
+GENERATION_LABEL_VALUES = (
+    ("React", "Vue"),
+    ("JavaScript", "TypeScript"),
+    ("TailwindCSS", "NucleusCSS")
+)
+# Token usage accumulated for the generation running in the current task (None outside track_usage)
+_generation_usage: contextvars.ContextVar[Optional[Dict[str, int]]] = contextvars.ContextVar(
+    "generation_usage", default=None
+)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _Metric:
+    type_name = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+
+
+class Counter(_Metric):
+    type_name = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = super().render()
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {value:g}")
+        return lines
+
+
+class Histogram(_Metric):
+    type_name = "histogram"
+    DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # key -> (per-bucket counts, +Inf count, sum)
+        self._values: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            counts = self._values.setdefault(key, [[0] * len(self.buckets), 0, 0.0])
+            index = bisect.bisect_left(self.buckets, value)
+            if index < len(self.buckets):
+                counts[0][index] += 1
+            counts[1] += 1
+            counts[2] += value
+
+    def render(self) -> List[str]:
+        lines = super().render()
+        with self._lock:
+            for key, (bucket_counts, count, total) in sorted(self._values.items()):
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets, bucket_counts):
+                    cumulative += bucket_count
+                    bucket_labels = _format_labels(self.labelnames, key, 'le="%g"' % bound)
+                    lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+                inf_labels = _format_labels(self.labelnames, key, 'le="+Inf"')
+                lines.append(f"{self.name}_bucket{inf_labels} {count}")
+                lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {total:g}")
+                lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    """Minimal Prometheus text exposition (format 0.0.4) for this process' metrics"""
+
+    CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+STAGE_SECONDS = registry.register(Histogram(
+    "webbuilder_generation_stage_seconds",
+    "Duration of a generation stage (queue_wait, render, llm_first_token, llm_total, llm_hedge_delay, "
+    "parse, validate, write, zip, upload, package)",
+    ("stage",) + GENERATION_LABELS
+))
+LLM_TOKENS = registry.register(Counter(
+    "webbuilder_llm_tokens_total",
+    "Azure OpenAI tokens reported in response.usage",
+    ("kind",) + GENERATION_LABELS
+))
+REPAIRED_FILES = registry.register(Counter(
+    "webbuilder_repaired_files_total",
+    "Generated files recovered by the tolerant JSON parser",
+    GENERATION_LABELS
+))
+VALIDATION_ISSUES = registry.register(Counter(
+    "webbuilder_validation_issues_total",
+    "Problems found by static validation of generated projects, before any repair",
+    ("kind",) + GENERATION_LABELS
+))
+LLM_HEDGES = registry.register(Counter(
+    "webbuilder_llm_hedges_total",
+    "Hedged completion requests by outcome (primary_won, hedge_won, failed, over_budget)",
+    ("kind", "outcome")
+))
+GENERATIONS = registry.register(Counter(
+    "webbuilder_generations_total",
+    "Finished generations by outcome",
+    ("status",) + GENERATION_LABELS
+))
+PROMPT_CACHE_RATIO = registry.register(Histogram(
+    "webbuilder_llm_prompt_cache_ratio",
+    "Share of each completion's prompt tokens served from the provider prompt cache",
+    GENERATION_LABELS,
+    buckets=(0, 0.1, 0.25, 0.5, 0.75, 0.9, 1)
+))
+PREVIEW_SECONDS = registry.register(Histogram(
+    "webbuilder_preview_launch_seconds",
+    "Preview launch duration by phase "
+    "(prepare: download, unpack, node_modules; ready: until the port accepts connections)",
+    ("phase", "outcome")
+))
+
+
+@contextmanager
+def generation_context(framework: str, language: str, styling: str) -> Iterator[None]:
+    """Label every metric recorded inside the block (including threads it starts) with this generation"""
+    token = _generation_labels.set(tuple(
+        _label_value(value, allowed) for value, allowed in zip((framework, language, styling), GENERATION_LABEL_VALUES)
+    ))
+    try:
+        yield
+    finally:
+        _generation_labels.reset(token)
+
+
+def _label_value(value: Optional[str], allowed: Sequence[str]) -> str:
+    if not value:
+        return "unknown"
+    for name in allowed:
+        if str(value).strip().lower() == name.lower():
+            return name
+    return "other"
+
+
+def generation_labels() -> Dict[str, str]:
+    return dict(zip(GENERATION_LABELS, _generation_labels.get()))
+
+
+def observe_stage(stage: str, seconds: float):
+    STAGE_SECONDS.observe(seconds, stage=stage, **generation_labels())
+
+
+@contextmanager
+def track_usage() -> Iterator[Dict[str, int]]:
+    """Accumulate the token usage of every completion made inside the block into the yielded dict"""
+    usage = {"prompt_tokens": 0, "completion_tokens": 0, "cached_tokens": 0, "requests": 0}
+    token = _generation_usage.set(usage)
+    try:
+        yield usage
+    finally:
+        _generation_usage.reset(token)
+
+
+def usage_counts(usage) -> Dict[str, int]:
+    """prompt/completion/cached token counts of an OpenAI usage object"""
+    details = getattr(usage, "prompt_tokens_details", None)
+    return {
+        "prompt_tokens": getattr(usage, "prompt_tokens", None) or 0,
+        "completion_tokens": getattr(usage, "completion_tokens", None) or 0,
+        "cached_tokens": (getattr(details, "cached_tokens", None) if details is not None else None) or 0
+    }
+
+
+def record_tokens(usage) -> None:
+    """Count prompt/completion/cached tokens from an OpenAI usage object (None is ignored)"""
+    if usage is None:
+        return
+    labels = generation_labels()
+    counts = usage_counts(usage)
+    for kind, value in counts.items():
+        if value:
+            LLM_TOKENS.inc(value, kind=kind.split("_")[0], **labels)
+    if counts["prompt_tokens"]:
+        PROMPT_CACHE_RATIO.observe(counts["cached_tokens"] / counts["prompt_tokens"], **labels)
+
+    accumulated = _generation_usage.get()
+    if accumulated is not None:
+        for kind, value in counts.items():
+            accumulated[kind] += value
+        accumulated["requests"] += 1
+
+
+@contextmanager
+def stage_timer(stage: str, **attributes) -> Iterator[None]:
+    """Time a stage into STAGE_SECONDS, inside a trace span when tracing is enabled"""
+    start = time.perf_counter()
+    with span(f"generation.{stage}", **attributes):
+        try:
+            yield
+        finally:
+            observe_stage(stage, time.perf_counter() - start)
+
+
+@contextmanager
+def span(name: str, **attributes) -> Iterator[Optional[object]]:
+    """
+    OpenTelemetry span when TRACING_ENABLED and opentelemetry is installed, otherwise a no-op.
+    Exporters are configured by the deployment (e.g. opentelemetry-instrument).
+    """
+    if not settings.TRACING_ENABLED or otel_trace is None:
+        yield None
+        return
+    tracer = otel_trace.get_tracer("webbuilder")
+    with tracer.start_as_current_span(name) as current:
+        for key, value in {**generation_labels(), **attributes}.items():
+            if value is not None:
+                current.set_attribute(key, value if isinstance(value, (bool, int, float)) else str(value))
+        yield current
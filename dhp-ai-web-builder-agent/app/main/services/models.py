@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import Optional
+from typing import Dict, List, Optional
 from datetime import datetime
 from enum import Enum
 
@@ -11,18 +11,46 @@ class SimpleGenerationRequest(BaseModel):
     styling: str = Field(default="TailwindCSS", description="Styling framework (TailwindCSS or NucleusCSS)")
     projectName: str = Field(..., description="Name of the project to be generated")
     template: str = Field(default="", description="Template to use for generation (for future use)")
+    mode: Optional[str] = Field(
+        default=None,
+        description=(
+            "Generation mode: 'single' (one completion) or "
+            "'staged' (plan, parallel pages, router; React with NucleusCSS)"
+        )
+    )
+    bypass_cache: bool = Field(
+        default=False,
+        description="Always run a fresh generation instead of reusing a cached one"
+    )
+    scaffold_overlay: Optional[bool] = Field(
+        default=None,
+        description="Generate only src/ files and overlay them on the base project scaffold (server default if unset)"
+    )
 
     class Config:
         use_enum_values = True
         extra = "ignore"
 
 
+class ProjectEditRequest(BaseModel):
+    instructions: str = Field(..., description="Change to make to the generated project")
+
+    class Config:
+        extra = "ignore"
+
+
 class SimpleProjectResult(BaseModel):
     project_name: str
     framework: str
     language: str
     files: dict  # filename -> content mapping
     instructions: str
+    repaired_files: List[str] = []  # files recovered from malformed JSON
+    validation_issues: List[str] = []  # static validation problems left after targeted regeneration
+    # Scaffold overlay: base_projects variant the files are overlaid on (None = files are the whole project)
+    scaffold: Optional[str] = None
+    dependencies: Dict[str, str] = {}  # merged into the scaffold's package.json
+    dev_dependencies: Dict[str, str] = {}
 
 
 class Framework(str, Enum):
@@ -37,13 +65,18 @@ class Language(str, Enum):
 
 class GenerationStatus(BaseModel):
     id: str
-    # starting, planning, generating, routing, packaging, completed, failed
+    # queued, starting, planning, generating, routing, editing, packaging, completed, failed
     status: str
     progress: int = Field(default=0, ge=0, le=100)
     message: str = ""
     error: Optional[str] = None
     created_at: datetime
+    started_at: Optional[datetime] = None
     completed_at: Optional[datetime] = None
+    queue_position: Optional[int] = None  # 1-based while queued, 0 once running
+    eta_seconds: Optional[float] = None
+    # Tokens used by the completions of this generation (prompt, completion, cached, requests)
+    token_usage: Optional[Dict[str, int]] = None
     project_info: Optional['ProjectInfo'] = None
 
 
@@ -56,6 +89,7 @@ class ProjectInfo(BaseModel):
     created_at: datetime
     download_path: str
     size_mb: Optional[float] = None
+    parent_id: Optional[str] = None  # project this revision was edited from
 
 
 # Update forward reference
@@ -0,0 +1,203 @@
+import errno
+import hashlib
+import json
+import logging
+import os
+import shutil
+import subprocess
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Dict, Optional
+
+from app.main.configs.MainConfig import settings
+
+
+class NodeModulesCacheService:
+    """
+    Content-addressed cache of installed node_modules trees.
+
+    Entries live in NODE_MODULES_CACHE_PATH/<hash>/node_modules, where the hash covers
+    the package.json dependency set and the Node.js version. A project gets its own
+    node_modules made of hardlinks into the entry (a plain copy when the cache is on
+    another filesystem), so `npm install` only runs on a cache miss. Entries are
+    evicted least-recently-used first once the cache exceeds its disk quota.
+    """
+
+    DEPENDENCY_FIELDS = ("dependencies", "devDependencies", "optionalDependencies", "overrides")
+    USED_MARKER = ".last_used"
+    SIZE_MARKER = ".size"
+
+    def __init__(
+        self,
+        cache_path: Optional[str] = settings.NODE_MODULES_CACHE_PATH,
+        max_bytes: int = int(settings.NODE_MODULES_CACHE_MAX_GB * 1024 ** 3),
+        install_timeout: float = settings.NPM_INSTALL_TIMEOUT_SECONDS
+    ):
+        self.cache_dir = Path(cache_path or os.path.join(settings.OUTPUT_PATH, "node_modules_cache"))
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.install_timeout = install_timeout
+        self.logger = logging.getLogger(__name__)
+
+        self._node_version: Optional[str] = None
+        self._locks: Dict[str, threading.Lock] = {}
+        self._locks_guard = threading.Lock()
+        self.counters = {"hits": 0, "misses": 0, "installs_failed": 0, "evictions": 0}
+
+    def dependency_hash(self, package_json: dict) -> str:
+        """Hash of the dependency set; scripts, name and version do not affect node_modules"""
+        payload = json.dumps(
+            {
+                "node": self.node_version(),
+                **{field: package_json.get(field) or {} for field in self.DEPENDENCY_FIELDS}
+            },
+            sort_keys=True
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:32]
+
+    def node_version(self) -> str:
+        if self._node_version is None:
+            try:
+                result = subprocess.run(["node", "--version"], capture_output=True, text=True, timeout=10)
+                self._node_version = result.stdout.strip() or "unknown"
+            except (OSError, subprocess.SubprocessError):
+                self._node_version = "unknown"
+        return self._node_version
+
+    def provision(self, project_dir: str) -> bool:
+        """
+        Give project_dir a node_modules for its package.json from the cache,
+        installing into the cache first on a miss. Returns False when the project
+        should fall back to its own `npm install`.
+        """
+        project_path = Path(project_dir)
+        try:
+            with open(project_path / "package.json", "r", encoding="utf-8") as f:
+                package_json = json.load(f)
+        except (OSError, ValueError) as e:
+            self.logger.warning(f"Cannot read package.json in {project_dir}: {str(e)}")
+            return False
+
+        key = self.dependency_hash(package_json)
+        entry = self.cache_dir / key
+        with self._key_lock(key):
+            if (entry / "node_modules").is_dir():
+                self.counters["hits"] += 1
+                self.logger.info(f"node_modules cache hit {key} for {project_path.name}")
+            else:
+                self.counters["misses"] += 1
+                self.logger.info(f"node_modules cache miss {key} for {project_path.name}, installing")
+                if not self._install(entry, project_path):
+                    self.counters["installs_failed"] += 1
+                    return False
+            (entry / self.USED_MARKER).touch()
+
+            target = project_path / "node_modules"
+            if target.exists():
+                shutil.rmtree(target)
+            self._link_tree(entry / "node_modules", target)
+
+        self.evict()
+        return True
+
+    def _install(self, entry: Path, project_path: Path) -> bool:
+        """Run npm install in a staging directory, then publish it atomically as the cache entry"""
+        staging = self.cache_dir / f".staging-{uuid.uuid4().hex}"
+        staging.mkdir()
+        try:
+            for name in ("package.json", "package-lock.json", ".npmrc"):
+                if (project_path / name).is_file():
+                    shutil.copy2(project_path / name, staging / name)
+
+            result = subprocess.run(
+                ["npm", "install", "--no-audit", "--no-fund"],
+                cwd=staging,
+                capture_output=True,
+                text=True,
+                timeout=self.install_timeout
+            )
+            if result.returncode != 0:
+                self.logger.error(f"npm install failed for {entry.name}: {result.stderr[-2000:]}")
+                return False
+
+            entry.mkdir(exist_ok=True)
+            os.replace(staging / "node_modules", entry / "node_modules")
+            (entry / self.SIZE_MARKER).write_text(str(self._tree_size(entry / "node_modules")))
+            return True
+        except (OSError, subprocess.SubprocessError) as e:
+            self.logger.error(f"npm install failed for {entry.name}: {str(e)}")
+            return False
+        finally:
+            shutil.rmtree(staging, ignore_errors=True)
+
+    def _link_tree(self, source: Path, target: Path):
+        """Recreate the tree with hardlinked files, copying instead across filesystems"""
+        def link(src: str, dst: str):
+            try:
+                os.link(src, dst)
+            except OSError as e:
+                if e.errno not in (errno.EXDEV, errno.EPERM, errno.EMLINK):
+                    raise
+                shutil.copy2(src, dst)
+
+        shutil.copytree(source, target, symlinks=True, copy_function=link)
+
+    @staticmethod
+    def _tree_size(path: Path) -> int:
+        total = 0
+        for root, _dirs, files in os.walk(path):
+            for name in files:
+                try:
+                    total += os.lstat(os.path.join(root, name)).st_size
+                except OSError:
+                    pass
+        return total
+
+    def _entries(self) -> list:
+        """(last_used, size, path) of every published entry"""
+        entries = []
+        for entry in self.cache_dir.iterdir():
+            if entry.name.startswith(".") or not (entry / "node_modules").is_dir():
+                continue
+            try:
+                size = int((entry / self.SIZE_MARKER).read_text())
+            except (OSError, ValueError):
+                size = self._tree_size(entry / "node_modules")
+            used_marker = entry / self.USED_MARKER
+            last_used = used_marker.stat().st_mtime if used_marker.exists() else 0.0
+            entries.append((last_used, size, entry))
+        return entries
+
+    def evict(self) -> int:
+        """Remove least recently used entries until the cache fits its quota"""
+        entries = sorted(self._entries(), key=lambda entry: entry[0])
+        total = sum(size for _, size, _ in entries)
+        evicted = 0
+        # Never evict the most recently used entry, it was just linked into a project
+        for last_used, size, entry in entries[:-1]:
+            if total <= self.max_bytes:
+                break
+            with self._key_lock(entry.name):
+                shutil.rmtree(entry, ignore_errors=True)
+            total -= size
+            evicted += 1
+            self.logger.info(
+                f"Evicted node_modules cache entry {entry.name} (unused for {time.time() - last_used:.0f}s)"
+            )
+        self.counters["evictions"] += evicted
+        return evicted
+
+    def stats(self) -> dict:
+        entries = self._entries()
+        return {
+            **self.counters,
+            "entries": len(entries),
+            "bytes": sum(size for _, size, _ in entries),
+            "max_bytes": self.max_bytes
+        }
+
+    def _key_lock(self, key: str) -> threading.Lock:
+        with self._locks_guard:
+            return self._locks.setdefault(key, threading.Lock())
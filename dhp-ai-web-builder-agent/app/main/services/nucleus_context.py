@@ -0,0 +1,325 @@
+import hashlib
+import json
+import logging
+import math
+import os
+import re
+from collections import Counter, defaultdict
+from typing import Dict, Iterable, List, Optional, Set
+
+from app.main.configs.MainConfig import settings
+
+
+class CatalogEntry:
+    """A Nucleus selector or variable from data/nucleus_css"""
+
+    def __init__(self, name: str, kind: str, purpose: str, value: Optional[str] = None):
+        self.name = name
+        self.kind = kind  # "selector" or "variable"
+        self.purpose = purpose
+        self.value = value
+        self.variables: Set[str] = set()  # variables a selector's rules reference
+
+    @property
+    def family(self) -> str:
+        """Variable group used when rendering, e.g. --nt-size-spacing-24 -> size-spacing, --nb-h1-color -> nb-h1"""
+        parts = self.name.lstrip("-").split("-")
+        if parts[0] == "nt":
+            return "-".join(parts[1:-1][:2]) or parts[1]
+        return "-".join(parts[:2])
+
+    @property
+    def usable(self) -> bool:
+        """Selectors worth offering to the model: Nucleus classes, not resets or stylesheet state variants"""
+        return self.kind == "variable" or ("nb-" in self.name and not re.search(r"[:>]", self.name))
+
+    @property
+    def summary(self) -> str:
+        """First sentence of the purpose, which is all a prompt needs"""
+        return re.split(r"(?<=\.)\s", self.purpose, maxsplit=1)[0]
+
+
+class NucleusContext:
+    """Selectors and variables chosen for one prompt"""
+
+    def __init__(self, selectors: List[CatalogEntry], variables: List[CatalogEntry]):
+        self.selectors = selectors
+        self.variables = variables
+
+    def render_selectors(self) -> str:
+        return "\n".join(f"- {entry.name}: {entry.summary}" for entry in self.selectors)
+
+    def render_variables(self) -> str:
+        families: Dict[str, List[str]] = defaultdict(list)
+        for entry in self.variables:
+            families[entry.family].append(f"{entry.name} ({entry.value})" if entry.value else entry.name)
+        return "\n".join(f"- {family}: {', '.join(names)}" for family, names in families.items())
+
+    def render(self) -> str:
+        return (
+            "NUCLEUS CSS REFERENCE - use only these classes and variables:\n"
+            "Classes and selectors:\n"
+            f"{self.render_selectors()}\n"
+            "Variables (use as var(--name)):\n"
+            f"{self.render_variables()}"
+        )
+
+    def names(self) -> Set[str]:
+        return {entry.name for entry in self.selectors + self.variables}
+
+
+class NucleusContextService:
+    """
+    Local retrieval index over the Nucleus CSS catalog (data/nucleus_css).
+
+    Instead of pasting the whole selector and variable reference into every prompt,
+    select() returns a fixed core set plus the entries most relevant to the request
+    (BM25 over names and purposes, with a small query expansion table), within a
+    token budget. Selectors pull in the variables their rules reference.
+    """
+
+    # Always available: the component classes and scales every generated app needs
+    CORE_SELECTORS = (
+        ".nb-container", ".nb-btn", ".nb-btn--primary", ".nb-btn--secondary",
+        "h1,.nb-h1", "h2,.nb-h2", "h3,.nb-h3", "p,.nb-paragraph", ".nb-list", ".nb-list-item",
+    )
+    CORE_VARIABLES = (
+        "--nt-color-accent-primary-1", "--nt-color-accent-primary-2", "--nt-color-accent-secondary-1",
+        "--nt-color-action-primary-default", "--nt-color-action-primary-active", "--nt-color-action-link-default",
+        "--nt-color-background-base", "--nt-color-background-gray-050", "--nt-color-background-accent-light",
+        "--nt-color-font-primary", "--nt-color-font-secondary", "--nt-color-font-heading", "--nt-color-font-reversed",
+        "--nt-color-grayscale-200", "--nt-font-weight-regular", "--nt-font-weight-semibold", "--nt-font-weight-bold",
+        "--nt-shadow-card", "--nt-size-borders-container", "--nt-size-radius-rounded",
+        "--nt-size-spacing-8", "--nt-size-spacing-16", "--nt-size-spacing-24", "--nt-size-spacing-32",
+        "--nt-size-spacing-48", "--nt-size-spacing-72", "--nt-size-font-sm", "--nt-size-font-base",
+        "--nt-size-font-lg", "--nt-size-font-2xl", "--nt-size-font-4xl", "--nt-size-font-6xl",
+        "--nt-breakpoint-medium", "--nt-breakpoint-large",
+    )
+    # Request vocabulary -> catalog vocabulary
+    QUERY_EXPANSIONS = {
+        "form": ("input", "select", "textarea", "fieldset", "label", "button", "form"),
+        "contact": ("form", "input", "textarea"),
+        "login": ("form", "input", "button"),
+        "signup": ("form", "input", "button"),
+        "register": ("form", "input", "button"),
+        "search": ("search", "input"),
+        "table": ("table", "thead", "tbody", "td"),
+        "dashboard": ("table", "card", "shadow", "data", "visualization", "grid"),
+        "analytics": ("data", "visualization"),
+        "chart": ("data", "visualization"),
+        "report": ("data", "visualization", "table"),
+        "blog": ("paragraph", "heading", "link", "list"),
+        "article": ("paragraph", "heading", "link"),
+        "news": ("paragraph", "heading", "link"),
+        "shop": ("card", "shadow", "button", "selection"),
+        "store": ("card", "shadow", "button", "selection"),
+        "ecommerce": ("card", "shadow", "button", "selection"),
+        "product": ("card", "shadow", "img"),
+        "cart": ("button", "list", "table"),
+        "modal": ("shadow", "popover", "index"),
+        "dialog": ("shadow", "popover", "index"),
+        "dropdown": ("popover", "shadow", "index"),
+        "menu": ("link", "list", "button", "index"),
+        "navigation": ("link", "list", "button"),
+        "navbar": ("link", "list", "button"),
+        "gallery": ("img", "figure", "radius"),
+        "portfolio": ("img", "figure", "radius"),
+        "image": ("img", "figure"),
+        "photo": ("img", "figure"),
+        "video": ("video",),
+        "icon": ("icon", "svg"),
+        "alert": ("notification", "utility", "error", "success"),
+        "notification": ("notification",),
+        "error": ("error", "notification"),
+        "status": ("utility", "success", "error"),
+        "health": ("careplus", "centerwell"),
+        "healthcare": ("careplus", "centerwell"),
+        "medical": ("careplus", "centerwell"),
+        "insurance": ("careplus", "centerwell"),
+        "dark": ("reversed",),
+        "faq": ("summary", "details", "list"),
+        "accordion": ("summary", "details"),
+        "quote": ("blockquote",),
+        "testimonial": ("blockquote", "paragraph"),
+    }
+    _TOKEN = re.compile(r"[a-z0-9]+")
+    _VARIABLE = re.compile(r"--n[bt]-[\w-]+")
+    _CLASS = re.compile(r"(?<![\w-])(nb-[a-z0-9]+(?:-{1,2}[a-z0-9]+)*)")
+    BM25_K1 = 1.2
+    BM25_B = 0.75
+
+    def __init__(
+        self,
+        catalog_path: Optional[str] = settings.NUCLEUS_CATALOG_PATH,
+        token_budget: int = settings.NUCLEUS_CONTEXT_TOKEN_BUDGET
+    ):
+        agent_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+        self.catalog_path = catalog_path or os.path.join(os.path.dirname(agent_dir), "data", "nucleus_css")
+        self.token_budget = token_budget
+        self.logger = logging.getLogger(__name__)
+
+        self.entries: List[CatalogEntry] = []
+        self.by_name: Dict[str, CatalogEntry] = {}
+        self._class_selectors: Dict[str, str] = {}
+        self.version = ""
+        self._postings: Dict[str, Dict[int, int]] = {}
+        self._lengths: List[int] = []
+        self._idf: Dict[str, float] = {}
+        self._load()
+
+    @property
+    def available(self) -> bool:
+        return bool(self.entries)
+
+    def _load(self):
+        """Read the catalog and precompute the term index"""
+        digest = hashlib.sha256()
+        try:
+            raw = {}
+            for name in ("selectors", "variables", "nucleus"):
+                with open(os.path.join(self.catalog_path, f"{name}.json"), "rb") as f:
+                    content = f.read()
+                digest.update(content)
+                raw[name] = json.loads(content)
+        except (OSError, ValueError) as e:
+            self.logger.warning(f"Nucleus catalog unavailable at {self.catalog_path}: {str(e)}")
+            return
+        self.version = digest.hexdigest()[:16]
+
+        rules: Dict[str, dict] = {}
+        self._collect_rules(raw["nucleus"], rules)
+        values = {key: str(value) for key, value in rules.get(":root", {}).items() if key.startswith("--")}
+
+        for item in raw["selectors"]:
+            entry = CatalogEntry(item["name"], "selector", item.get("purpose", ""))
+            declarations = json.dumps(rules.get(self._normalize_selector(entry.name), {}))
+            entry.variables = set(self._VARIABLE.findall(declarations))
+            self.entries.append(entry)
+        for item in raw["variables"]:
+            purpose = re.sub(r"\s*Value:.*$", "", item.get("purpose", ""))
+            self.entries.append(CatalogEntry(item["name"], "variable", purpose, values.get(item["name"])))
+        self.by_name = {entry.name: entry for entry in self.entries}
+        self._class_selectors: Dict[str, str] = {}
+        for entry in self.entries:
+            if entry.kind == "selector" and entry.usable:
+                for name in self._CLASS.findall(entry.name):
+                    self._class_selectors.setdefault(name, entry.name)
+
+        for index, entry in enumerate(self.entries):
+            terms = self._tokens(entry.name) + self._tokens(entry.purpose)
+            self._lengths.append(len(terms))
+            for term, count in Counter(terms).items():
+                self._postings.setdefault(term, {})[index] = count
+        total = len(self.entries)
+        self._idf = {
+            term: math.log(1 + (total - len(postings) + 0.5) / (len(postings) + 0.5))
+            for term, postings in self._postings.items()
+        }
+        self.logger.info(f"Indexed {total} Nucleus catalog entries ({len(self._postings)} terms)")
+
+    @classmethod
+    def _collect_rules(cls, node: dict, rules: Dict[str, dict]):
+        """Flatten nucleus.json into selector -> declarations; base rules win over later media query overrides"""
+        for key, value in node.items():
+            if not isinstance(value, dict):
+                continue
+            if all(not isinstance(item, dict) for item in value.values()):
+                declarations = rules.setdefault(cls._normalize_selector(key), {})
+                for name, declaration in value.items():
+                    declarations.setdefault(name, declaration)
+            else:
+                cls._collect_rules(value, rules)
+
+    @staticmethod
+    def _normalize_selector(selector: str) -> str:
+        return re.sub(r"\s*,\s*", ",", selector.strip())
+
+    def _tokens(self, text: str) -> List[str]:
+        tokens = []
+        # CamelCase component names (BookCard, ContactForm) carry the useful words
+        for token in self._TOKEN.findall(re.sub(r"([a-z])([A-Z])", r"\1 \2", text).lower()):
+            if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+                token = token[:-1]
+            tokens.append(token)
+        return tokens
+
+    def _query_terms(self, text: str) -> List[str]:
+        terms = self._tokens(text)
+        expanded = list(terms)
+        for term in terms:
+            for extra in self.QUERY_EXPANSIONS.get(term, ()):
+                expanded.extend(self._tokens(extra))
+        return expanded
+
+    def _scores(self, query: str) -> Dict[int, float]:
+        average_length = sum(self._lengths) / len(self._lengths)
+        scores: Dict[int, float] = defaultdict(float)
+        for term, query_count in Counter(self._query_terms(query)).items():
+            postings = self._postings.get(term)
+            if not postings:
+                continue
+            idf = self._idf[term]
+            for index, count in postings.items():
+                norm = self.BM25_K1 * (1 - self.BM25_B + self.BM25_B * self._lengths[index] / average_length)
+                scores[index] += query_count * idf * count * (self.BM25_K1 + 1) / (count + norm)
+        return scores
+
+    def core(self) -> List[CatalogEntry]:
+        return [self.by_name[name] for name in self.CORE_SELECTORS + self.CORE_VARIABLES if name in self.by_name]
+
+    def referenced_names(self, text: str) -> Set[str]:
+        """Catalog entries a text mentions by class (nb-btn) or variable name, e.g. in template rules"""
+        names = {name for name in self._VARIABLE.findall(text) if name in self.by_name}
+        names |= {self._class_selectors[name] for name in self._CLASS.findall(text) if name in self._class_selectors}
+        return names
+
+    def select(self, query: str, token_budget: Optional[int] = None, pinned: Iterable[str] = ()) -> NucleusContext:
+        """Core and pinned entries plus the best matches for the query, within the token budget"""
+        budget = self.token_budget if token_budget is None else token_budget
+        chosen: Dict[str, CatalogEntry] = {entry.name: entry for entry in self.core()}
+        chosen.update((name, self.by_name[name]) for name in pinned if name in self.by_name)
+        used = sum(self._cost(entry) for entry in chosen.values())
+        if used > budget:
+            self.logger.warning(f"Nucleus core context ({used} tokens) exceeds the {budget} token budget")
+
+        ranked = sorted(self._scores(query).items(), key=lambda item: -item[1])
+        for index, _score in ranked:
+            entry = self.entries[index]
+            if not entry.usable:
+                continue
+            candidates = [entry] + [self.by_name[name] for name in sorted(entry.variables) if name in self.by_name]
+            candidates = [candidate for candidate in candidates if candidate.name not in chosen]
+            cost = sum(self._cost(candidate) for candidate in candidates)
+            if not candidates or used + cost > budget:
+                continue
+            for candidate in candidates:
+                chosen[candidate.name] = candidate
+            used += cost
+
+        # Catalog order keeps related variables together and the prompt byte-stable for a given selection
+        ordered = [entry for entry in self.entries if entry.name in chosen]
+        return NucleusContext(
+            [entry for entry in ordered if entry.kind == "selector"],
+            [entry for entry in ordered if entry.kind == "variable"]
+        )
+
+    @staticmethod
+    def _cost(entry: CatalogEntry) -> int:
+        """Approximate prompt tokens of an entry as rendered (4 characters per token)"""
+        if entry.kind == "selector":
+            return (len(entry.name) + len(entry.summary) + 5) // 4 + 1
+        return (len(entry.name) + len(entry.value or "") + 5) // 4 + 1
+
+    @staticmethod
+    def estimate_tokens(text: str) -> int:
+        return len(text) // 4
+
+    def unknown_names(self, names: Iterable[str]) -> Set[str]:
+        """Classes (nb-*) and variables (--nt-*, --nb-*) that the catalog does not define"""
+        selectors = " ".join(entry.name for entry in self.entries if entry.kind == "selector")
+        known_classes = set(self._CLASS.findall(selectors))
+        return {
+            name for name in names
+            if (name.startswith(("--nt-", "--nb-")) and name not in self.by_name)
+            or (name.startswith("nb-") and name not in known_classes)
+        }
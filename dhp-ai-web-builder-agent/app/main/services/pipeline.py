@@ -0,0 +1,276 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import re
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+from app.main.configs.MainConfig import settings
+from app.main.services.llm_client import get_llm_client
+from app.main.services.models import SimpleProjectResult
+from app.main.services.nucleus_context import NucleusContextService
+from app.main.services.scaffold import ScaffoldService
+
+
+class PipelineGeneratorService:
+    """
+    Staged generation pipeline (ported from notebooks/gen_pipeline.ipynb):
+    project plan -> pages generated concurrently -> router -> assembled onto the base project.
+
+    Each stage is a small completion, so pages run in parallel and a failing page
+    is retried on its own instead of regenerating the whole project.
+    """
+
+    PROMPT_FILES = (
+        "project/project-plan-sys.md",
+        "project/project-plan-user.md",
+        "page/gen/common.md",
+        "page/gen/react-only.md",
+        "page/gen/user.md",
+        "css/variables_small.md",
+        "css/selectors.md",
+        "router/router-gen-sys.md",
+        "router/router-gen-user.md",
+    )
+
+    def __init__(self):
+        self.llm = get_llm_client()
+        self.scaffold_service = ScaffoldService()
+        self.logger = logging.getLogger(__name__)
+
+        # Retrieval index over the Nucleus catalog; None sends the full CSS references
+        self.nucleus_context = NucleusContextService() if settings.NUCLEUS_CONTEXT_COMPACT else None
+        if self.nucleus_context is not None and not self.nucleus_context.available:
+            self.nucleus_context = None
+
+        # Staged prompts live in the workspace-level prompts/ folder unless PROMPTS_PATH says otherwise
+        agent_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+        self.prompts_dir = settings.PROMPTS_PATH or os.path.join(os.path.dirname(agent_dir), "prompts")
+
+        self.page_concurrency = max(1, settings.PIPELINE_PAGE_CONCURRENCY)
+        self.page_retries = max(0, settings.PIPELINE_PAGE_RETRIES)
+
+    def supports(self, framework: str, styling: str) -> bool:
+        """
+        Page prompts (page/gen/) are written for React components styled with the Nucleus CSS
+        references (page/page-gen-vue-*.md are empty placeholders), and every prompt must be present
+        """
+        if framework.lower() != "react" or styling.lower() != "nucleuscss":
+            return False
+        return all(os.path.isfile(os.path.join(self.prompts_dir, path)) for path in self.PROMPT_FILES)
+
+    def prompt_version(self) -> str:
+        """Content hash of every prompt used by the pipeline"""
+        digest = hashlib.sha256()
+        for relative_path in self.PROMPT_FILES:
+            digest.update(self._load_prompt(relative_path).encode("utf-8"))
+        if self.nucleus_context is not None:
+            digest.update(f"nucleus:{self.nucleus_context.version}:{self.nucleus_context.token_budget}".encode("utf-8"))
+        return digest.hexdigest()[:16]
+
+    def _load_prompt(self, relative_path: str) -> str:
+        with open(os.path.join(self.prompts_dir, relative_path), "r", encoding="utf-8") as file:
+            return file.read()
+
+    @staticmethod
+    def _fill(template: str, values: Dict[str, str]) -> str:
+        """Substitute {NAME} / {{NAME}} placeholders; prompts contain literal braces so str.format is unusable"""
+        for name, value in values.items():
+            template = template.replace("{{" + name + "}}", value).replace("{" + name + "}", value)
+        return template
+
+    @staticmethod
+    def _short_language(language: str) -> str:
+        return "TS" if language.lower() in ["typescript", "ts"] else "JS"
+
+    async def generate_project(
+        self,
+        instructions: str,
+        framework: str = "React",
+        language: str = "JavaScript",
+        styling: str = "NucleusCSS",
+        project_name: str = "AI Generated Project",
+        progress_callback: Optional[Callable[[int, str], None]] = None,
+        file_callback: Optional[Callable[[str, str], None]] = None
+    ) -> SimpleProjectResult:
+        """Run plan -> pages -> router; the result is overlaid onto the matching scaffold when packaged"""
+        if not self.supports(framework, styling):
+            raise ValueError(f"Staged pipeline has no page prompts for {framework} with {styling}")
+
+        if progress_callback:
+            progress_callback(10, "AI is planning your project...")
+
+        plan = await self._plan_project(instructions, framework, language)
+        pages = [page for page in plan.get("pages", []) if page.get("name") and page.get("filepath")]
+        if not pages:
+            raise ValueError("Project plan does not contain any pages")
+
+        if progress_callback:
+            progress_callback(20, f"AI is building {len(pages)} pages...")
+
+        page_files = await self._generate_pages(plan, pages, progress_callback, file_callback)
+        generated_pages = [page for page in pages if page["filepath"] in page_files]
+        if not generated_pages:
+            raise ValueError("All page generations failed")
+
+        if progress_callback:
+            progress_callback(85, "AI is wiring up navigation...")
+
+        router_path, router_code = await self._generate_router(plan, generated_pages, framework, language)
+        if file_callback:
+            file_callback(router_path, router_code)
+
+        # Generated pages + router; packaging overlays them onto the base project
+        files = dict(page_files)
+        files[router_path] = router_code
+
+        if progress_callback:
+            progress_callback(90, "Project ready!")
+
+        return SimpleProjectResult(
+            project_name=project_name,
+            framework=framework,
+            language=language,
+            instructions=plan.get("description", "AI generated web application"),
+            files=files,
+            scaffold=self.scaffold_service.variant(framework, language)
+        )
+
+    async def _plan_project(self, instructions: str, framework: str, language: str) -> dict:
+        system_prompt = self._load_prompt("project/project-plan-sys.md")
+        user_prompt = self._fill(self._load_prompt("project/project-plan-user.md"), {
+            "FRAMEWORK": framework,
+            "LANGUAGE": self._short_language(language),
+            "USER_REQUIREMENT": instructions
+        })
+
+        response = await self._call_llm(system_prompt, user_prompt, temperature=0.0)
+        json_start = response.find("{")
+        json_end = response.rfind("}") + 1
+        if json_start == -1 or json_end == 0:
+            raise ValueError("No JSON found in project plan response")
+
+        plan = json.loads(response[json_start:json_end])
+        plan["framework"] = framework
+        plan["language"] = self._short_language(language)
+        self.logger.info(f"Project plan created with {len(plan.get('pages', []))} pages")
+        return plan
+
+    async def _generate_pages(
+        self,
+        plan: dict,
+        pages: List[dict],
+        progress_callback: Optional[Callable[[int, str], None]],
+        file_callback: Optional[Callable[[str, str], None]]
+    ) -> Dict[str, str]:
+        """Generate all pages with bounded fan-out; failed pages are left out"""
+        system_prompt = self._load_prompt("page/gen/common.md") + self._load_prompt("page/gen/react-only.md")
+        user_template = self._load_prompt("page/gen/user.md")
+        plan_values = {"PROJECT_PLAN": json.dumps(plan, indent=2)}
+        if self.nucleus_context is None:
+            plan_values["CSS_VARIABLES"] = self._load_prompt("css/variables_small.md")
+            plan_values["CSS_SELECTORS"] = self._load_prompt("css/selectors.md")
+
+        semaphore = asyncio.Semaphore(self.page_concurrency)
+        page_files: Dict[str, str] = {}
+
+        async def generate(page: dict):
+            async with semaphore:
+                values = {**plan_values, **self._page_css_values(plan, page), "PAGE_NAME": page["name"]}
+                user_prompt = self._fill(user_template, values)
+                code = await self._generate_page(page, system_prompt, user_prompt)
+
+            if code is None:
+                return
+            page_files[page["filepath"]] = code
+            if file_callback:
+                file_callback(page["filepath"], code)
+            if progress_callback:
+                progress = 20 + int(60 * len(page_files) / len(pages))
+                progress_callback(progress, f"AI generated {page['name']} ({len(page_files)}/{len(pages)} pages)...")
+
+        await asyncio.gather(*(generate(page) for page in pages))
+        return page_files
+
+    def _page_css_values(self, plan: dict, page: dict) -> Dict[str, str]:
+        """Nucleus selectors and variables relevant to one page, when compaction is enabled"""
+        if self.nucleus_context is None:
+            return {}
+        query = " ".join(
+            str(value) for value in (
+                page.get("name"), page.get("description"), page.get("usage"),
+                " ".join(str(component) for component in page.get("components") or []), plan.get("designNote")
+            ) if value
+        )
+        context = self.nucleus_context.select(query)
+        return {"CSS_VARIABLES": context.render_variables(), "CSS_SELECTORS": context.render_selectors()}
+
+    async def _generate_page(self, page: dict, system_prompt: str, user_prompt: str) -> Optional[str]:
+        """Generate one page, retrying only this page on failure"""
+        for attempt in range(self.page_retries + 1):
+            try:
+                response = await self._call_llm(system_prompt, user_prompt, temperature=0.3)
+                code = self._extract_code(response)
+                if not code:
+                    raise ValueError("No code found in page response")
+                self.logger.info(f"Generated page {page['name']} ({len(code)} chars)")
+                return code
+            except Exception as e:
+                self.logger.warning(
+                    f"Page {page['name']} failed (attempt {attempt + 1}/{self.page_retries + 1}): {str(e)}"
+                )
+        self.logger.error(f"Giving up on page {page['name']}")
+        return None
+
+    async def _generate_router(self, plan: dict, pages: List[dict], framework: str, language: str) -> tuple:
+        short_language = self._short_language(language)
+        if framework.lower() == "react":
+            router_path = "src/App.tsx" if short_language == "TS" else "src/App.jsx"
+        else:
+            router_path = "src/router/index.ts" if short_language == "TS" else "src/router/index.js"
+
+        page_routes = [
+            {"name": page["name"], "route": page.get("route", "/"), "filepath": page["filepath"]}
+            for page in pages
+        ]
+        system_prompt = self._load_prompt("router/router-gen-sys.md")
+        user_prompt = self._fill(self._load_prompt("router/router-gen-user.md"), {
+            "FRAMEWORK": framework,
+            "LANGUAGE": short_language,
+            "PAGE_ROUTES": json.dumps(page_routes, indent=2),
+            "FILEPATH": router_path
+        })
+
+        response = await self._call_llm(system_prompt, user_prompt, temperature=0.2)
+        code = self._extract_code(response)
+        if not code:
+            raise ValueError("No code found in router response")
+
+        if framework.lower() == "react":
+            # main.jsx/tsx already provides the BrowserRouter
+            code = code.replace("<BrowserRouter>", "").replace("</BrowserRouter>", "")
+        return router_path, code
+
+    @staticmethod
+    def _extract_code(markdown: str) -> str:
+        """Return the first fenced code block, or the raw text when the model skipped the fence"""
+        match = re.search(r"```[\w-]*\n(.*?)```", markdown, re.DOTALL)
+        if match:
+            return match.group(1).strip()
+        return markdown.strip()
+
+    async def _call_llm(self, system_prompt: str, user_prompt: str, temperature: float) -> str:
+        start_time = datetime.now()
+        response = await self.llm.chat_completion(
+            messages=[
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": user_prompt}
+            ],
+            temperature=temperature,
+            timeout=settings.LLM_TIMEOUT_SECONDS
+        )
+        elapsed_time = (datetime.now() - start_time).total_seconds()
+        self.logger.info(f"Pipeline stage completed in {elapsed_time:.2f} seconds")
+        return response.choices[0].message.content
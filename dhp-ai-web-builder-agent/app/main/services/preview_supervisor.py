@@ -0,0 +1,280 @@
+import asyncio
+import logging
+import os
+import signal
+import socket
+import subprocess
+import time
+import uuid
+from typing import Dict, List, Optional
+
+from app.main.configs.MainConfig import settings
+
+
+class PreviewCapacityError(Exception):
+    """Raised when the maximum number of concurrent previews is running"""
+
+
+class PortUnavailableError(Exception):
+    """Raised when no (or not the requested) preview port is free"""
+
+
+class Preview:
+    """A supervised Vite dev server"""
+
+    def __init__(self, preview_id: str, project_name: str, port: int, process: subprocess.Popen):
+        self.id = preview_id
+        self.project_name = project_name
+        self.port = port
+        self.process = process
+        self.status = "starting"  # starting, ready, exited, stopped
+        self.started_at = time.time()
+        self.ready_at: Optional[float] = None
+        self.last_active = self.started_at
+
+    def to_dict(self) -> dict:
+        return {
+            "preview_id": self.id,
+            "project_name": self.project_name,
+            "port": self.port,
+            "pid": self.process.pid,
+            "status": self.status,
+            "exit_code": self.process.returncode,
+            "started_at": self.started_at,
+            "startup_seconds": round(self.ready_at - self.started_at, 2) if self.ready_at else None,
+            "idle_seconds": round(time.time() - self.last_active, 1)
+        }
+
+
+class PreviewSupervisor:
+    """
+    Owns the preview dev servers started by /v1/process/launch.
+
+    Each preview runs start_vite.sh in its own process group (the script execs Vite
+    when PREVIEW_SUPERVISED is set), on a port allocated from a fixed range. The
+    supervisor probes the port for readiness, caps concurrent previews and stops
+    previews that had no client connections for PREVIEW_IDLE_TIMEOUT_SECONDS.
+    """
+
+    def __init__(
+        self,
+        script: str = "./start_vite.sh",
+        port_start: int = settings.PREVIEW_PORT_START,
+        port_end: int = settings.PREVIEW_PORT_END,
+        max_previews: int = settings.PREVIEW_MAX_CONCURRENT,
+        ready_timeout: float = settings.PREVIEW_READY_TIMEOUT_SECONDS,
+        idle_timeout: float = settings.PREVIEW_IDLE_TIMEOUT_SECONDS,
+        reap_interval: float = settings.PREVIEW_REAP_INTERVAL_SECONDS
+    ):
+        self.script = script
+        self.port_start = port_start
+        self.port_end = port_end
+        self.max_previews = max(1, max_previews)
+        self.ready_timeout = ready_timeout
+        self.idle_timeout = idle_timeout
+        self.reap_interval = reap_interval
+        self.logger = logging.getLogger(__name__)
+
+        self._previews: Dict[str, Preview] = {}
+        self._lock = asyncio.Lock()
+        self._reaper: Optional[asyncio.Task] = None
+
+    async def start(self):
+        """Start the idle/exit reaper (idempotent)"""
+        if self._reaper is None:
+            self._reaper = asyncio.create_task(self._reap_loop(), name="preview-reaper")
+
+    async def stop(self):
+        """Stop the reaper and every running preview"""
+        if self._reaper is not None:
+            self._reaper.cancel()
+            await asyncio.gather(self._reaper, return_exceptions=True)
+            self._reaper = None
+        await asyncio.gather(*(self.stop_preview(preview_id) for preview_id in list(self._previews)))
+
+    async def launch(
+        self,
+        project_name: str,
+        allowed_hosts: str,
+        port: Optional[int] = None,
+        wait_ready: bool = True
+    ) -> Preview:
+        """Start a preview and, unless wait_ready is False, wait until its port accepts connections"""
+        async with self._lock:
+            self._forget_exited()
+            if len(self._previews) >= self.max_previews:
+                raise PreviewCapacityError(f"{self.max_previews} previews are already running")
+
+            port = self._allocate_port(port)
+            process = subprocess.Popen(
+                ["bash", self.script, project_name, str(port), allowed_hosts or ""],
+                env={**os.environ, "PREVIEW_SUPERVISED": "1"},
+                start_new_session=True
+            )
+            preview = Preview(f"preview_{uuid.uuid4().hex[:12]}", project_name, port, process)
+            self._previews[preview.id] = preview
+            self.logger.info(f"Started preview {preview.id} for {project_name} on port {port} (pid {process.pid})")
+
+        if wait_ready:
+            await self.wait_ready(preview)
+        return preview
+
+    async def wait_ready(self, preview: Preview, timeout: Optional[float] = None) -> bool:
+        """Probe the preview port until it accepts connections, the process exits or the timeout passes"""
+        deadline = time.monotonic() + (self.ready_timeout if timeout is None else timeout)
+        while time.monotonic() < deadline:
+            if preview.status == "ready":
+                return True
+            if preview.process.poll() is not None:
+                preview.status = "exited"
+                self.logger.error(
+                    f"Preview {preview.id} exited with code {preview.process.returncode} before it was ready"
+                )
+                return False
+            if await self._port_accepts(preview.port):
+                preview.status = "ready"
+                preview.ready_at = preview.last_active = time.time()
+                self.logger.info(f"Preview {preview.id} ready after {preview.ready_at - preview.started_at:.1f}s")
+                return True
+            await asyncio.sleep(0.5)
+        return False
+
+    def get(self, preview_id: str) -> Optional[Preview]:
+        preview = self._previews.get(preview_id)
+        if preview is not None:
+            preview.last_active = time.time()
+        return preview
+
+    def find_by_port(self, port: int) -> Optional[Preview]:
+        return next((preview for preview in self._previews.values() if preview.port == port), None)
+
+    def list(self) -> List[dict]:
+        return [preview.to_dict() for preview in self._previews.values()]
+
+    async def stop_preview(self, preview_id: str, grace_seconds: float = 10) -> bool:
+        """Terminate the preview's whole process group (bash, npm, node/vite)"""
+        preview = self._previews.pop(preview_id, None)
+        if preview is None:
+            return False
+
+        process = preview.process
+        # Signalled even when the leader has exited: npm/vite children stay in its process group
+        if self._signal_group(process, signal.SIGTERM):
+            deadline = time.monotonic() + grace_seconds
+            while self._group_alive(process) and time.monotonic() < deadline:
+                await asyncio.sleep(0.2)
+            if self._group_alive(process):
+                self._signal_group(process, signal.SIGKILL)
+            if process.poll() is None:
+                await asyncio.to_thread(process.wait)
+        preview.status = "stopped"
+        self.logger.info(f"Stopped preview {preview.id} on port {preview.port}")
+        return True
+
+    def stats(self) -> dict:
+        return {
+            "running": len(self._previews),
+            "max_previews": self.max_previews,
+            "ready": sum(1 for preview in self._previews.values() if preview.status == "ready"),
+            "port_range": [self.port_start, self.port_end]
+        }
+
+    @staticmethod
+    def _signal_group(process: subprocess.Popen, sig: int) -> bool:
+        """Signal the preview's process group (started as its own session, so its id is the leader's pid)"""
+        try:
+            os.killpg(process.pid, sig)
+        except ProcessLookupError:
+            return False
+        return True
+
+    @classmethod
+    def _group_alive(cls, process: subprocess.Popen) -> bool:
+        process.poll()  # reap the leader so a zombie does not count as alive
+        return cls._signal_group(process, 0)
+
+    def _allocate_port(self, requested: Optional[int]) -> int:
+        in_use = {preview.port for preview in self._previews.values()}
+        if requested:
+            if requested in in_use or not self._port_free(requested):
+                raise PortUnavailableError(f"Port {requested} is already in use")
+            return requested
+        for port in range(self.port_start, self.port_end + 1):
+            if port not in in_use and self._port_free(port):
+                return port
+        raise PortUnavailableError(f"No free preview port in {self.port_start}-{self.port_end}")
+
+    @staticmethod
+    def _port_free(port: int) -> bool:
+        with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+            try:
+                sock.bind(("0.0.0.0", port))
+                return True
+            except OSError:
+                return False
+
+    @staticmethod
+    async def _port_accepts(port: int) -> bool:
+        try:
+            _, writer = await asyncio.wait_for(asyncio.open_connection("127.0.0.1", port), timeout=1)
+        except (OSError, asyncio.TimeoutError):
+            return False
+        writer.close()
+        return True
+
+    @staticmethod
+    def _established_ports() -> set:
+        """Local ports with established TCP connections (Linux /proc), e.g. open HMR websockets"""
+        ports = set()
+        for table in ("/proc/net/tcp", "/proc/net/tcp6"):
+            try:
+                with open(table, "r") as f:
+                    next(f, None)
+                    for line in f:
+                        fields = line.split()
+                        if len(fields) > 3 and fields[3] == "01":
+                            ports.add(int(fields[1].rsplit(":", 1)[1], 16))
+            except OSError:
+                continue
+        return ports
+
+    def _forget_exited(self):
+        for preview_id, preview in list(self._previews.items()):
+            if preview.process.poll() is not None:
+                self.logger.warning(f"Preview {preview_id} exited with code {preview.process.returncode}")
+                preview.status = "exited"
+                del self._previews[preview_id]
+                # Children the leader left behind would keep the port
+                self._signal_group(preview.process, signal.SIGTERM)
+
+    async def _reap_loop(self):
+        while True:
+            await asyncio.sleep(self.reap_interval)
+            try:
+                await self.reap()
+            except Exception as e:
+                self.logger.error(f"Preview reaping failed: {str(e)}")
+
+    async def reap(self) -> int:
+        """Forget exited previews and stop the ones idle for longer than the idle timeout"""
+        async with self._lock:
+            self._forget_exited()
+
+        now = time.time()
+        connected = self._established_ports()
+        idle = []
+        # wait_ready awaits, so launches and stops may change the previews meanwhile
+        for preview in list(self._previews.values()):
+            if preview.status == "starting":
+                if now - preview.started_at > self.ready_timeout and not await self.wait_ready(preview, timeout=0.5):
+                    idle.append(preview.id)
+                continue
+            if preview.port in connected:
+                preview.last_active = now
+            elif now - preview.last_active > self.idle_timeout:
+                idle.append(preview.id)
+
+        for preview_id in idle:
+            self.logger.info(f"Reaping idle preview {preview_id}")
+            await self.stop_preview(preview_id)
+        return len(idle)
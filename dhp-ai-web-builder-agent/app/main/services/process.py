@@ -1,53 +1,114 @@
+import asyncio
+import os
 import subprocess
-from azure.storage.fileshare import ShareFileClient
+import time
+import zipfile
 from fastapi import APIRouter
 
-from app.main.configs import MainConfig
+from app.main.configs.MainConfig import settings
+from app.main.services import metrics
+from app.main.services.node_modules_cache import NodeModulesCacheService
+from app.main.services.preview_supervisor import PreviewSupervisor
+from app.main.services.project_manager import ProjectManagerService
+from app.main.services.storage import StorageService
+from app.main.services.zip_cache import ProjectZipCache
 
 router = APIRouter()
 
 
 class ProcessService:
 
-    def __init__(self):
-        self.__connection_string = MainConfig.SA_CONNECTION
-        self.__share_name = MainConfig.SA_SHARE_NAME
+    def __init__(self, supervisor: PreviewSupervisor = None, project_manager: ProjectManagerService = None):
+        self.supervisor = supervisor
+        self.storage_service = StorageService()
+        self.node_modules_cache = NodeModulesCacheService() if settings.NODE_MODULES_CACHE_ENABLED else None
+        # The generator's project manager lets previews reuse archives packaged in this process
+        self.zip_cache = ProjectZipCache(self.storage_service, project_manager) if settings.ZIP_CACHE_ENABLED else None
 
     def download_file(self, file_path, local_path):
-        connection_string = self.__connection_string
-        share_name = self.__share_name
-
-        file_client = ShareFileClient.from_connection_string(
-            conn_str=connection_string, share_name=share_name, file_path=file_path
-        )
+        file_client = self.storage_service.get_fileshare_client(file_path)
 
         with open(local_path, "wb") as file_handle:
-            data = file_client.download_file()
-            file_handle.write(data.readall())
+            file_client.download_file().readinto(file_handle)
 
         print(f"File downloaded to {local_path}")
 
-    def launch_project(self, request_body):
-        file_path = request_body.file_path
-        live_preview_port = request_body.live_preview_port
-        live_preview_path = request_body.live_preview_path
-
+    def extract_project(self, local_path, project_dir):
+        """Unzip a project archive, refusing entries that would escape project_dir"""
+        root = os.path.realpath(project_dir)
+        with zipfile.ZipFile(local_path) as archive:
+            for member in archive.namelist():
+                target = os.path.realpath(os.path.join(root, member))
+                if target != root and not target.startswith(root + os.sep):
+                    raise ValueError(f"Unsafe path in project archive: {member}")
+            archive.extractall(root)
+
+    def prepare_project(self, file_path):
+        """Download and unpack the project archive; returns the project name"""
         local_path = f"projects/{file_path.split('/')[-1]}"
-
-        self.download_file(file_path, local_path)
-
-        params = [
-            file_path.split("/")[-1].replace(".zip", ""),
-            str(live_preview_port),
-            live_preview_path,
-        ]
-
-        command = ["bash", "./start_vite.sh"] + params
-        subprocess.Popen(command)
-
-        return {"message": "Project launched successfully"}
-
-    def stop_project(self, request_body):
+        project_name = file_path.split("/")[-1].replace(".zip", "")
+
+        if self.zip_cache is not None:
+            self.zip_cache.fetch(file_path, local_path)
+        else:
+            self.download_file(file_path, local_path)
+
+        # Unpack here and reuse a cached node_modules so start_vite.sh can skip unzip and npm install
+        # (start_vite.sh restores vite.config from the archive on relaunches to apply the new port);
+        # runs in a worker thread, a cache miss installs for up to NPM_INSTALL_TIMEOUT_SECONDS
+        if self.node_modules_cache is not None:
+            project_dir = f"projects/{project_name}"
+            if not os.path.isdir(project_dir):
+                self.extract_project(local_path, project_dir)
+            self.node_modules_cache.provision(project_dir)
+
+        return project_name
+
+    async def launch_project(self, request_body):
+        started = time.perf_counter()
+        try:
+            project_name = await asyncio.to_thread(self.prepare_project, request_body.file_path)
+        except Exception:
+            metrics.PREVIEW_SECONDS.observe(time.perf_counter() - started, phase="prepare", outcome="error")
+            raise
+        metrics.PREVIEW_SECONDS.observe(time.perf_counter() - started, phase="prepare", outcome="ok")
+
+        if self.supervisor is None:
+            params = [
+                project_name,
+                str(request_body.live_preview_port),
+                request_body.live_preview_path,
+            ]
+
+            command = ["bash", "./start_vite.sh"] + params
+            subprocess.Popen(command)
+            return {"message": "Project launched successfully"}
+
+        started = time.perf_counter()
+        preview = await self.supervisor.launch(
+            project_name,
+            request_body.live_preview_path,
+            port=request_body.live_preview_port,
+            wait_ready=request_body.wait_ready
+        )
+        if request_body.wait_ready:
+            metrics.PREVIEW_SECONDS.observe(time.perf_counter() - started, phase="ready", outcome=preview.status)
+        return {"message": "Project launched successfully", **preview.to_dict()}
+
+    async def stop_project(self, request_body):
+        if self.supervisor is not None:
+            preview = (
+                self.supervisor.get(request_body.preview_id) if request_body.preview_id
+                else self.supervisor.find_by_port(request_body.pid) if request_body.pid
+                else None
+            )
+            if preview is not None:
+                await self.supervisor.stop_preview(preview.id)
+                return {"message": "Project stopped successfully", "preview_id": preview.id}
+            if request_body.preview_id:
+                return None
+
+        # Previews not started by this process (e.g. before a restart) are still found by port
         params = [str(request_body.pid)]
 
         subprocess.Popen(["bash", "-c", f'{"./kill_process.sh"} {" ".join(params)}'])
@@ -1,21 +1,40 @@
+import asyncio
+import copy
 import os
 import json
+import logging
 import shutil
+import tempfile
+import threading
 import zipfile
+from collections import OrderedDict
 from datetime import datetime
-from typing import Optional
-from pathlib import Path
+from typing import IO, Dict, Optional
+from pathlib import Path, PurePosixPath
 
 from app.main.configs.MainConfig import settings
+from app.main.services import metrics
 from app.main.services.models import ProjectInfo, SimpleProjectResult
+from app.main.services.scaffold import ScaffoldService
 from app.main.services.storage import StorageService
 
 
 class ProjectManagerService:
+    SKIPPED_NAMES = {'.DS_Store', 'Thumbs.db', '.git'}
+
     def __init__(self):
         self.output_path = Path(settings.OUTPUT_PATH)
         self.base_projects_path = Path(settings.BASE_PROJECTS_PATH)
         self.storage_service = StorageService()
+        self.scaffold_service = ScaffoldService(str(self.base_projects_path))
+        self.packaging_mode = settings.PACKAGING_MODE.lower()
+        self.logger = logging.getLogger(__name__)
+        self.spool_max_bytes = int(settings.PACKAGING_SPOOL_MAX_MB * 1024 * 1024)
+        self.archive_cache_max_bytes = int(settings.PACKAGING_MEMORY_CACHE_MB * 1024 * 1024)
+        # Recently built archives (project id -> zip bytes), served before falling back to disk
+        self._archives: "OrderedDict[str, bytes]" = OrderedDict()
+        self._archives_bytes = 0
+        self._archives_lock = threading.Lock()
         # Ensure output directories exist
         self.output_path.mkdir(exist_ok=True)
         (self.output_path / "projects").mkdir(exist_ok=True)
@@ -28,15 +47,27 @@ class ProjectManagerService:
             return str(zip_path)
         return None
 
+    async def get_project_archive(self, project_id: str) -> Optional[bytes]:
+        """Get an in-memory project archive built by the memory packaging mode"""
+        return self.cached_archive(project_id)
+
+    def cached_archive(self, project_id: str) -> Optional[bytes]:
+        """Synchronous get_project_archive, for callers running in worker threads"""
+        with self._archives_lock:
+            archive = self._archives.get(project_id)
+            if archive is not None:
+                self._archives.move_to_end(project_id)
+            return archive
+
     async def _create_zip(self, project_dir: Path, project_id: str) -> str:
         """Create a zip file of the project"""
         zip_path = self.output_path / "zips" / f"{project_id}.zip"
 
-        with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
+        with metrics.stage_timer("zip"), zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
             for file_path in project_dir.rglob('*'):
                 if file_path.is_file():
                     # Skip certain files
-                    if file_path.name in ['.DS_Store', 'Thumbs.db', '.git']:
+                    if file_path.name in self.SKIPPED_NAMES:
                         continue
 
                     arcname = file_path.relative_to(project_dir)
@@ -44,6 +75,69 @@ class ProjectManagerService:
 
         return str(zip_path)
 
+    def _build_archive(self, files: Dict[str, str], project_info_data: dict) -> tempfile.SpooledTemporaryFile:
+        """
+        Zip the generated files and project-info.json straight from memory.
+        The buffer only spills to an anonymous temp file past PACKAGING_SPOOL_MAX_MB.
+        """
+        spool = tempfile.SpooledTemporaryFile(max_size=self.spool_max_bytes)
+        with metrics.stage_timer("zip"), zipfile.ZipFile(spool, 'w', zipfile.ZIP_DEFLATED) as zipf:
+            for filepath, content in files.items():
+                arcname = self._archive_name(filepath)
+                if arcname is None:
+                    continue
+                zipf.writestr(arcname, content)
+            zipf.writestr("project-info.json", json.dumps(project_info_data, indent=2))
+        return spool
+
+    def _build_revision_archive(
+        self,
+        base_archive: IO[bytes],
+        changes: Dict[str, Optional[str]],
+        project_info_data: dict
+    ) -> tempfile.SpooledTemporaryFile:
+        """
+        Build a new revision of an archive: unchanged entries are copied over,
+        changed files (None = deleted) are written with their new content.
+        """
+        spool = tempfile.SpooledTemporaryFile(max_size=self.spool_max_bytes)
+        with metrics.stage_timer("zip"), zipfile.ZipFile(base_archive) as source, \
+                zipfile.ZipFile(spool, 'w', zipfile.ZIP_DEFLATED) as target:
+            for info in source.infolist():
+                if info.filename in changes or info.filename == "project-info.json":
+                    continue
+                self._copy_entry(source, target, info)
+            for filepath, content in changes.items():
+                if content is not None:
+                    target.writestr(filepath, content)
+            target.writestr("project-info.json", json.dumps(project_info_data, indent=2))
+        return spool
+
+    @staticmethod
+    def _copy_entry(source: zipfile.ZipFile, target: zipfile.ZipFile, info: zipfile.ZipInfo):
+        """Copy an entry to another archive, keeping its name, timestamp, attributes and compression"""
+        target.writestr(copy.copy(info), source.read(info))
+
+    def _archive_name(self, filepath: str) -> Optional[str]:
+        """Normalize a generated path to a safe relative archive name (None = skip)"""
+        parts = [part for part in PurePosixPath(filepath.replace('\\', '/')).parts if part not in ('/', '.')]
+        if not parts or '..' in parts or parts[-1] in self.SKIPPED_NAMES:
+            return None
+        return '/'.join(parts)
+
+    def _remember_archive(self, project_id: str, archive: bytes):
+        if len(archive) > self.archive_cache_max_bytes:
+            return
+        with self._archives_lock:
+            previous = self._archives.pop(project_id, None)
+            if previous is not None:
+                self._archives_bytes -= len(previous)
+            self._archives[project_id] = archive
+            self._archives_bytes += len(archive)
+            while self._archives_bytes > self.archive_cache_max_bytes:
+                _, evicted = self._archives.popitem(last=False)
+                self._archives_bytes -= len(evicted)
+
     async def package_simple_project(
         self,
         generation_id: str,
@@ -51,20 +145,6 @@ class ProjectManagerService:
     ) -> ProjectInfo:
         """Package a simple AI-generated project"""
 
-        # Create project directory
-        project_dir = self.output_path / "projects" / generation_id
-        if project_dir.exists():
-            shutil.rmtree(project_dir)
-        project_dir.mkdir(parents=True)
-
-        # Write all files from the AI response
-        for filepath, content in project_result.files.items():
-            file_path = project_dir / filepath
-            file_path.parent.mkdir(parents=True, exist_ok=True)
-
-            with open(file_path, "w", encoding="utf-8") as f:
-                f.write(content)
-
         # Create project info file
         project_info_data = {
             "id": generation_id,
@@ -76,15 +156,26 @@ class ProjectManagerService:
             "type": "simple_generated"
         }
 
-        with open(project_dir / "project-info.json", "w", encoding="utf-8") as f:
-            json.dump(project_info_data, f, indent=2)
+        if project_result.scaffold:
+            # Overlay the generated application files onto the base project
+            files = self.scaffold_service.compose(
+                project_result.scaffold,
+                project_result.files,
+                project_result.dependencies,
+                project_result.dev_dependencies
+            )
+            project_result = project_result.model_copy(update={"files": files})
+
+        if self.packaging_mode == "disk":
+            size_bytes = await self._package_on_disk(generation_id, project_result, project_info_data)
+        else:
+            # Zipping and uploading block, keep them off the event loop
+            size_bytes = await asyncio.to_thread(
+                self._package_in_memory, generation_id, project_result, project_info_data
+            )
 
-        # Create zip file
-        zip_path = await self._create_zip(project_dir, generation_id)
-        print("Created zip file:", zip_path)
         # Calculate size
-        size_mb = round(os.path.getsize(zip_path) / (1024 * 1024), 2)
-        self.storage_service.upload_zip_file(zip_path)
+        size_mb = round(size_bytes / (1024 * 1024), 2)
 
         return ProjectInfo(
             id=generation_id,
@@ -97,6 +188,111 @@ class ProjectManagerService:
                                                                                    '.tsx',
                                                                                    '.vue'))]),
             created_at=datetime.now(),
-            download_path=f"web-builder-projects/{generation_id}.zip",
+            download_path=f"{StorageService.PROJECTS_DIRECTORY}/{generation_id}.zip",
             size_mb=size_mb
         )
+
+    async def package_project_revision(
+        self,
+        revision_id: str,
+        base_archive: IO[bytes],
+        base_info: dict,
+        changes: Dict[str, Optional[str]],
+        files: Dict[str, str],
+        instructions: str
+    ) -> ProjectInfo:
+        """Package an edited project as a new revision of base_info's project"""
+        project_info_data = {
+            **base_info,
+            "id": revision_id,
+            "parent_id": base_info.get("id"),
+            "edit_instructions": instructions,
+            "created_at": datetime.now().isoformat(),
+            "type": "edited"
+        }
+
+        def build() -> int:
+            with self._build_revision_archive(base_archive, changes, project_info_data) as spool:
+                size_bytes = spool.tell()
+                spool.seek(0)
+                if self.packaging_mode == "disk":
+                    zip_path = self.output_path / "zips" / f"{revision_id}.zip"
+                    with open(zip_path, "wb") as f:
+                        shutil.copyfileobj(spool, f)
+                    project_dir = self.output_path / "projects" / revision_id
+                    if project_dir.exists():
+                        shutil.rmtree(project_dir)
+                    with zipfile.ZipFile(zip_path) as zipf:
+                        zipf.extractall(project_dir)
+                    self.storage_service.upload_zip_file(str(zip_path))
+                else:
+                    self.storage_service.upload_zip_stream(f"{revision_id}.zip", spool, size_bytes)
+                    spool.seek(0)
+                    self._remember_archive(revision_id, spool.read())
+                return size_bytes
+
+        # Zipping and uploading block, keep them off the event loop
+        size_bytes = await asyncio.to_thread(build)
+        self.logger.info(f"Created revision zip {revision_id}: {size_bytes} bytes, {len(changes)} changed files")
+
+        return ProjectInfo(
+            id=revision_id,
+            name=base_info.get("name", revision_id),
+            framework=base_info.get("framework", "React"),
+            language=base_info.get("language", "JavaScript"),
+            pages_count=len([f for f in files.keys() if f.endswith(('.js', '.jsx', '.ts', '.tsx', '.vue'))]),
+            created_at=datetime.now(),
+            download_path=f"{StorageService.PROJECTS_DIRECTORY}/{revision_id}.zip",
+            size_mb=round(size_bytes / (1024 * 1024), 2),
+            parent_id=base_info.get("id")
+        )
+
+    def _package_in_memory(
+        self,
+        generation_id: str,
+        project_result: SimpleProjectResult,
+        project_info_data: dict
+    ) -> int:
+        """Build the zip in a spooled buffer and upload it without intermediate files"""
+        with self._build_archive(project_result.files, project_info_data) as spool:
+            size_bytes = spool.tell()
+            self.storage_service.upload_zip_stream(f"{generation_id}.zip", spool, size_bytes)
+            spool.seek(0)
+            self._remember_archive(generation_id, spool.read())
+        self.logger.info(f"Created in-memory zip {generation_id}: {size_bytes} bytes")
+        return size_bytes
+
+    async def _package_on_disk(
+        self,
+        generation_id: str,
+        project_result: SimpleProjectResult,
+        project_info_data: dict
+    ) -> int:
+        """Legacy packaging: write the project tree, zip it and upload the zip file"""
+        project_dir = self.output_path / "projects" / generation_id
+        self._write_project_tree(project_dir, project_result.files, project_info_data)
+
+        # Create zip file
+        zip_path = await self._create_zip(project_dir, generation_id)
+        print("Created zip file:", zip_path)
+        await asyncio.to_thread(self.storage_service.upload_zip_file, zip_path)
+        return os.path.getsize(zip_path)
+
+    def _write_project_tree(self, project_dir: Path, files: Dict[str, str], project_info_data: dict):
+        """Write the generated files and project-info.json to a fresh project directory"""
+        with metrics.stage_timer("write"):
+            # Create project directory
+            if project_dir.exists():
+                shutil.rmtree(project_dir)
+            project_dir.mkdir(parents=True)
+
+            # Write all files from the AI response
+            for filepath, content in files.items():
+                file_path = project_dir / filepath
+                file_path.parent.mkdir(parents=True, exist_ok=True)
+
+                with open(file_path, "w", encoding="utf-8") as f:
+                    f.write(content)
+
+            with open(project_dir / "project-info.json", "w", encoding="utf-8") as f:
+                json.dump(project_info_data, f, indent=2)
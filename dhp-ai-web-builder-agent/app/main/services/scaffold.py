@@ -0,0 +1,129 @@
+import json
+import logging
+import re
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from app.main.configs.MainConfig import settings
+
+
+class ScaffoldService:
+    """Access to the base_projects/{react,vue}-{js,ts} Vite scaffolds"""
+
+    SKIPPED_NAMES = {"node_modules", ".gitkeep", ".DS_Store", "Thumbs.db"}
+    # Generated code may only add or replace application files; configuration stays the scaffold's
+    OVERLAY_PREFIXES = ("src/",)
+    # The scaffold entry files import Nucleus CSS, so it must always be installed
+    REQUIRED_DEPENDENCIES = {"@nucleus/css": "^6.46.0"}
+    VITE_MARKER = "update_me"
+
+    _PACKAGE_NAME = re.compile(r"^(@[a-z0-9][\w.-]*/)?[a-z0-9][\w.-]*$")
+    _PACKAGE_VERSION = re.compile(r"^(latest|[\^~]?\d+(\.(\d+|x|\*)){0,2}([-+][\w.-]+)?|\*)$")
+
+    def __init__(self, base_projects_path: str = settings.BASE_PROJECTS_PATH):
+        self.base_projects_path = Path(base_projects_path) if base_projects_path else None
+        self.logger = logging.getLogger(__name__)
+        self._files_cache: Dict[str, Dict[str, str]] = {}
+
+    @staticmethod
+    def variant(framework: str, language: str) -> str:
+        """Scaffold directory name, e.g. ('React', 'TypeScript') -> 'react-ts'"""
+        framework_key = "vue" if framework.lower() == "vue" else "react"
+        language_key = "ts" if language.lower() in ["typescript", "ts"] else "js"
+        return f"{framework_key}-{language_key}"
+
+    def get_scaffold_dir(self, framework: str, language: str) -> Path:
+        return self._variant_dir(self.variant(framework, language))
+
+    def _variant_dir(self, variant: str) -> Path:
+        if self.base_projects_path is None:
+            raise ValueError("BASE_PROJECTS_PATH is not configured")
+
+        scaffold_dir = self.base_projects_path / variant
+        if not scaffold_dir.is_dir():
+            raise FileNotFoundError(f"Base project not found: {scaffold_dir}")
+        return scaffold_dir
+
+    def load_files(self, framework: str, language: str) -> Dict[str, str]:
+        """
+        Return the scaffold's text files as a relative path -> content mapping.
+        Scaffolds are static, so each variant is read from disk only once.
+        """
+        return self.load_variant(self.variant(framework, language))
+
+    def load_variant(self, variant: str) -> Dict[str, str]:
+        if variant not in self._files_cache:
+            scaffold_dir = self._variant_dir(variant)
+            files = {}
+            for file_path in sorted(scaffold_dir.rglob("*")):
+                relative = file_path.relative_to(scaffold_dir)
+                if not file_path.is_file() or self.SKIPPED_NAMES.intersection(relative.parts):
+                    continue
+                try:
+                    files[relative.as_posix()] = file_path.read_text(encoding="utf-8")
+                except UnicodeDecodeError:
+                    self.logger.warning(f"Skipping binary scaffold file: {file_path}")
+            self._files_cache[variant] = files
+
+        return dict(self._files_cache[variant])
+
+    def describe(self, framework: str, language: str) -> List[str]:
+        """Paths the scaffold already provides, for prompts"""
+        return sorted(self.load_files(framework, language))
+
+    def compose(
+        self,
+        variant: str,
+        files: Dict[str, str],
+        dependencies: Optional[Dict[str, str]] = None,
+        dev_dependencies: Optional[Dict[str, str]] = None
+    ) -> Dict[str, str]:
+        """
+        Overlay generated application files onto a scaffold.
+        Files outside src/ are ignored, the dependency delta is merged into the
+        scaffold's package.json and the vite.config `update_me` marker is guaranteed.
+        """
+        project = self.load_variant(variant)
+
+        ignored = []
+        for path, content in files.items():
+            if path.startswith(self.OVERLAY_PREFIXES):
+                project[path] = content
+            else:
+                ignored.append(path)
+        if ignored:
+            self.logger.warning(f"Ignoring generated files owned by the {variant} scaffold: {ignored}")
+
+        project["package.json"] = self._merge_package_json(
+            project["package.json"],
+            {**self.REQUIRED_DEPENDENCIES, **(dependencies or {})},
+            dev_dependencies or {}
+        )
+
+        for path, content in project.items():
+            if path.startswith("vite.config.") and self.VITE_MARKER not in content:
+                raise ValueError(f"{variant}/{path} is missing the {self.VITE_MARKER} marker used by start_vite.sh")
+        return project
+
+    def _merge_package_json(
+        self,
+        package_json: str,
+        dependencies: Dict[str, str],
+        dev_dependencies: Dict[str, str]
+    ) -> str:
+        """Add missing packages; versions pinned by the scaffold always win"""
+        package = json.loads(package_json)
+        installed = {**package.get("devDependencies", {}), **package.get("dependencies", {})}
+
+        for section, delta in (("dependencies", dependencies), ("devDependencies", dev_dependencies)):
+            for name, version in delta.items():
+                if name in installed:
+                    continue
+                valid = isinstance(version, str) and self._PACKAGE_VERSION.match(version.strip())
+                if not valid or not self._PACKAGE_NAME.match(name):
+                    self.logger.warning(f"Skipping invalid dependency {name!r}: {version!r}")
+                    continue
+                package.setdefault(section, {})[name] = version.strip()
+                installed[name] = version
+
+        return json.dumps(package, indent=2) + "\n"
@@ -0,0 +1,69 @@
+import hashlib
+import json
+import uuid
+from datetime import datetime
+from typing import Callable, Dict, Optional
+
+from app.main.services.cache import GenerationCacheService
+from app.main.services.models import SimpleGenerationRequest
+
+
+def new_generation_id() -> str:
+    """Time-ordered, collision-proof generation id, e.g. simple_20250101_120000_3f9c2a1b7d4e"""
+    return f"simple_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:12]}"
+
+
+def request_fingerprint(request: SimpleGenerationRequest) -> str:
+    """Hash of everything that affects the generated project; equal fingerprints produce equivalent jobs"""
+    payload = json.dumps([
+        GenerationCacheService.normalize_instructions(request.instructions),
+        request.framework.strip().lower(),
+        request.language.strip().lower(),
+        request.styling.strip().lower(),
+        request.projectName.strip(),
+        (request.mode or "").strip().lower(),
+        request.bypass_cache,
+        request.scaffold_overlay
+    ])
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class InflightRegistry:
+    """
+    Single-flight table of queued/running generations keyed by request fingerprint,
+    so an identical request attaches to the job already in progress instead of
+    starting another LLM run.
+    """
+
+    def __init__(self):
+        self._by_fingerprint: Dict[str, str] = {}
+        self._by_generation: Dict[str, str] = {}
+        self.counters = {"started": 0, "coalesced": 0}
+
+    def find(self, fingerprint: str) -> Optional[str]:
+        return self._by_fingerprint.get(fingerprint)
+
+    def attach(self, fingerprint: str, is_live: Callable[[str], bool]) -> Optional[str]:
+        """
+        Return the generation for this fingerprint if is_live() says it is still queued or
+        running, counting the coalesced request; None (and nothing counted) otherwise.
+        """
+        generation_id = self.find(fingerprint)
+        if generation_id is None or not is_live(generation_id):
+            return None
+        self.counters["coalesced"] += 1
+        return generation_id
+
+    def register(self, fingerprint: str, generation_id: str):
+        self._by_fingerprint[fingerprint] = generation_id
+        self._by_generation[generation_id] = fingerprint
+        self.counters["started"] += 1
+
+    def release(self, generation_id: str):
+        """Forget a generation once it reaches a terminal state (or was never queued)"""
+        fingerprint = self._by_generation.pop(generation_id, None)
+        if fingerprint is not None and self._by_fingerprint.get(fingerprint) == generation_id:
+            del self._by_fingerprint[fingerprint]
+
+    def stats(self) -> dict:
+        return {"inflight": len(self._by_generation), **self.counters}
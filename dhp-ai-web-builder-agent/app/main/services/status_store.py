@@ -0,0 +1,465 @@
+import asyncio
+import json
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from datetime import datetime
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from app.main.configs.MainConfig import settings
+from app.main.services.models import GenerationStatus
+
+
+TERMINAL_STATUSES = ("completed", "failed")
+
+
+class StatusStore(ABC):
+    """
+    Generation status store.
+
+    Jobs running in this process are kept as live GenerationStatus objects that the
+    router mutates in place; `save()` marks them dirty and a background task writes
+    dirty entries to the backend in batches. Terminal statuses are written immediately
+    and evicted once they are older than the TTL. Jobs without a status update for
+    `stale_seconds` (e.g. in flight when their process restarted) are marked failed;
+    queued jobs and jobs `job_is_active` reports (the generation queue still holds
+    them) are kept fresh instead, however long they wait.
+
+    The store also binds Idempotency-Key headers to generation ids with the same TTL.
+
+    Backends implement `_read`, `_write_many`, `_delete`, `_evict`, `_fail_stale_rows`,
+    `_reserve_key`, `_release_key` and `_evict_keys`.
+    """
+
+    backend = "base"
+    persistent = True
+
+    def __init__(
+        self,
+        flush_interval: float = settings.STATUS_FLUSH_INTERVAL_SECONDS,
+        ttl_seconds: float = settings.STATUS_TTL_SECONDS,
+        eviction_interval: float = settings.STATUS_EVICTION_INTERVAL_SECONDS,
+        stale_seconds: float = settings.STATUS_STALE_SECONDS
+    ):
+        self.flush_interval = flush_interval
+        self.ttl_seconds = ttl_seconds
+        self.eviction_interval = eviction_interval
+        self.stale_seconds = stale_seconds
+        self.logger = logging.getLogger(__name__)
+
+        self._live: Dict[str, GenerationStatus] = {}
+        self._saved_at: Dict[str, float] = {}
+        self._dirty: set = set()
+        self._task: Optional[asyncio.Task] = None
+        self.job_is_active: Callable[[str], bool] = lambda generation_id: False
+        self.counters = {"writes": 0, "flushes": 0, "evictions": 0, "stale": 0}
+
+    async def start(self):
+        """Fail jobs left unfinished by a previous process, then start the flush/eviction loop (idempotent)"""
+        if self._task is None:
+            await self._maintain(self._fail_stale_rows, time.time() - self.stale_seconds, set(self._live))
+            self._task = asyncio.create_task(self._run(), name="status-store")
+
+    async def stop(self):
+        """Stop the background loop and persist whatever is still dirty"""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        self.flush()
+
+    def get(self, generation_id: str) -> Optional[GenerationStatus]:
+        status = self._live.get(generation_id)
+        if status is not None:
+            return status
+        return self._read(generation_id)
+
+    def is_local(self, generation_id: str) -> bool:
+        """True if the job is owned (queued or running) by this process"""
+        return generation_id in self._live
+
+    def save(self, status: GenerationStatus, immediate: bool = False):
+        """
+        Record a (possibly mutated) status. Progress updates are batched;
+        new and terminal statuses are written right away so other workers see them.
+        """
+        self._live[status.id] = status
+        self._saved_at[status.id] = time.time()
+        if immediate or status.status in TERMINAL_STATUSES:
+            self._dirty.discard(status.id)
+            self._persist([status])
+        else:
+            self._dirty.add(status.id)
+
+    def delete(self, generation_id: str):
+        self._live.pop(generation_id, None)
+        self._saved_at.pop(generation_id, None)
+        self._dirty.discard(generation_id)
+        self._delete(generation_id)
+
+    async def reserve_idempotency_key(self, key: str, fingerprint: str, generation_id: str) -> Tuple[str, str]:
+        """
+        Bind an Idempotency-Key to generation_id unless it is already bound.
+        Returns the (generation_id, request fingerprint) that owns the key.
+        """
+        return await self._maintain(self._reserve_key, key, fingerprint, generation_id, time.time())
+
+    async def release_idempotency_key(self, key: str):
+        await self._maintain(self._release_key, key)
+
+    def flush(self):
+        """Write all dirty statuses in one batch"""
+        if not self._dirty:
+            return
+        batch = [self._live[generation_id] for generation_id in self._dirty if generation_id in self._live]
+        self._dirty.clear()
+        self._persist(batch)
+
+    def evict_expired(self) -> int:
+        """Drop terminal statuses older than the TTL"""
+        cutoff = time.time() - self.ttl_seconds
+        evicted = self._evict(cutoff)
+        self._evict_keys(cutoff)
+        self.counters["evictions"] += evicted
+        if evicted:
+            self.logger.info(f"Evicted {evicted} expired generation statuses")
+        return evicted
+
+    def fail_stale(self) -> int:
+        """
+        Mark live jobs without a status update for stale_seconds as failed. Jobs that are
+        only waiting (queued, or still held by the generation queue) are saved again instead,
+        so neither this process nor another worker sharing the backend fails them.
+        """
+        cutoff = time.time() - self.stale_seconds
+        stale = []
+        for generation_id, status in list(self._live.items()):
+            if status.status in TERMINAL_STATUSES or self._saved_at.get(generation_id, cutoff) >= cutoff:
+                continue
+            if status.status == "queued" or self.job_is_active(generation_id):
+                self.save(status)
+            else:
+                stale.append(status)
+        for status in stale:
+            self._mark_stale(status)
+            self.save(status)
+        self.counters["stale"] += len(stale)
+        if stale:
+            self.logger.warning(f"Marked {len(stale)} stalled generations as failed")
+        return len(stale)
+
+    def _mark_stale(self, status: GenerationStatus):
+        status.status = "failed"
+        status.error = f"No progress for {self.stale_seconds:.0f} seconds, the job was interrupted"
+        status.message = f"Generation failed: {status.error}"
+        status.completed_at = datetime.now()
+
+    def stats(self) -> dict:
+        return {"backend": self.backend, "live": len(self._live), "dirty": len(self._dirty), **self.counters}
+
+    def _persist(self, batch: List[GenerationStatus]):
+        if not batch:
+            return
+        try:
+            self._write_many(batch)
+        except Exception as e:
+            self._written(batch, e)
+            return
+        self._written(batch, None)
+
+    def _written(self, batch: List[GenerationStatus], error: Optional[Exception]):
+        """Bookkeeping once a batch is stored (or failed to be)"""
+        if error is not None:
+            # Keep the statuses dirty so the next flush retries them
+            self.logger.error(f"Failed to persist {len(batch)} generation statuses: {str(error)}")
+            self._dirty.update(status.id for status in batch)
+            return
+        self.counters["writes"] += len(batch)
+        self.counters["flushes"] += 1
+        if self.persistent:
+            # Finished jobs no longer need a live copy once they are safely stored
+            for status in batch:
+                live = self._live.get(status.id)
+                if status.status in TERMINAL_STATUSES and live is not None and live.status in TERMINAL_STATUSES:
+                    del self._live[status.id]
+                    self._saved_at.pop(status.id, None)
+
+    async def _run(self):
+        last_eviction = time.monotonic()
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                self.flush()
+                if time.monotonic() - last_eviction >= self.eviction_interval:
+                    last_eviction = time.monotonic()
+                    self.fail_stale()
+                    await self._maintain(self._fail_stale_rows, time.time() - self.stale_seconds, set(self._live))
+                    await self._maintain(self.evict_expired)
+            except Exception as e:
+                self.logger.error(f"Status store maintenance failed: {str(e)}")
+
+    async def _maintain(self, function, *args):
+        """Run a backend call in a worker thread when it does I/O (the memory backend works on _live in place)"""
+        if self.persistent:
+            return await asyncio.to_thread(function, *args)
+        return function(*args)
+
+    @abstractmethod
+    def _read(self, generation_id: str) -> Optional[GenerationStatus]:
+        ...
+
+    @abstractmethod
+    def _write_many(self, batch: List[GenerationStatus]):
+        ...
+
+    @abstractmethod
+    def _delete(self, generation_id: str):
+        ...
+
+    @abstractmethod
+    def _evict(self, cutoff: float) -> int:
+        ...
+
+    @abstractmethod
+    def _fail_stale_rows(self, cutoff: float, owned: Iterable[str]) -> int:
+        """Mark stored non-terminal statuses last written before cutoff as failed, except jobs owned here"""
+
+    @abstractmethod
+    def _reserve_key(self, key: str, fingerprint: str, generation_id: str, now: float) -> Tuple[str, str]:
+        ...
+
+    @abstractmethod
+    def _release_key(self, key: str):
+        ...
+
+    @abstractmethod
+    def _evict_keys(self, cutoff: float):
+        ...
+
+
+class MemoryStatusStore(StatusStore):
+    """Process-local store: the live objects are the storage, only eviction applies"""
+
+    backend = "memory"
+    persistent = False
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self._keys: Dict[str, Tuple[str, str, float]] = {}
+
+    def _read(self, generation_id: str) -> Optional[GenerationStatus]:
+        return None
+
+    def _write_many(self, batch: List[GenerationStatus]):
+        pass
+
+    def _delete(self, generation_id: str):
+        pass
+
+    def _evict(self, cutoff: float) -> int:
+        expired = [
+            generation_id for generation_id, status in self._live.items()
+            if status.status in TERMINAL_STATUSES and status.completed_at and status.completed_at.timestamp() < cutoff
+        ]
+        for generation_id in expired:
+            del self._live[generation_id]
+            self._saved_at.pop(generation_id, None)
+        return len(expired)
+
+    def _fail_stale_rows(self, cutoff: float, owned: Iterable[str]) -> int:
+        # Nothing outlives the process; stalled live jobs are handled by fail_stale()
+        return 0
+
+    def _reserve_key(self, key: str, fingerprint: str, generation_id: str, now: float) -> Tuple[str, str]:
+        owner = self._keys.setdefault(key, (generation_id, fingerprint, now))
+        return owner[0], owner[1]
+
+    def _release_key(self, key: str):
+        self._keys.pop(key, None)
+
+    def _evict_keys(self, cutoff: float):
+        for key in [key for key, (_, _, created_at) in self._keys.items() if created_at < cutoff]:
+            del self._keys[key]
+
+
+class SQLiteStatusStore(StatusStore):
+    """
+    SQLite (WAL mode) backend, shareable by every uvicorn worker on the host
+    or by replicas mounting the same volume.
+    """
+
+    backend = "sqlite"
+
+    def __init__(self, path: str = settings.STATUS_STORE_PATH, **kwargs):
+        super().__init__(**kwargs)
+        self.path = path or os.path.join(settings.OUTPUT_PATH, "status.db")
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(self.path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS generation_status ("
+            " id TEXT PRIMARY KEY,"
+            " status TEXT NOT NULL,"
+            " completed_at REAL,"
+            " updated_at REAL NOT NULL,"
+            " data TEXT NOT NULL)"
+        )
+        self._connection.execute(
+            "CREATE INDEX IF NOT EXISTS generation_status_completed_at ON generation_status (completed_at)"
+        )
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS idempotency_keys ("
+            " key TEXT PRIMARY KEY,"
+            " generation_id TEXT NOT NULL,"
+            " fingerprint TEXT NOT NULL,"
+            " created_at REAL NOT NULL)"
+        )
+        # Point reads run on the event loop: a connection of their own never waits for the
+        # writer thread's lock, and WAL readers are not blocked by a commit in progress
+        self._read_lock = threading.Lock()
+        self._reader = sqlite3.connect(self.path, timeout=30, check_same_thread=False, isolation_level=None)
+
+        # Status writes (up to the 30 s busy timeout) run on a writer thread, never on the event loop
+        self._writes: "queue.Queue[Optional[List[GenerationStatus]]]" = queue.Queue()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._writer = threading.Thread(target=self._write_loop, name="status-store-writer", daemon=True)
+        self._writer.start()
+
+    async def start(self):
+        self._loop = asyncio.get_running_loop()
+        await super().start()
+
+    def _persist(self, batch: List[GenerationStatus]):
+        if batch:
+            # Copies, so the router can keep mutating the live objects while the batch is serialized
+            self._writes.put([status.model_copy(deep=True) for status in batch])
+
+    def _write_loop(self):
+        while True:
+            batch = self._writes.get()
+            if batch is None:
+                return
+            error = None
+            try:
+                self._write_many(batch)
+            except Exception as e:
+                error = e
+            loop = self._loop
+            if loop is not None and not loop.is_closed():
+                try:
+                    loop.call_soon_threadsafe(self._written, batch, error)
+                    continue
+                except RuntimeError:
+                    pass  # loop closed meanwhile
+            self._written(batch, error)
+
+    def _read(self, generation_id: str) -> Optional[GenerationStatus]:
+        with self._read_lock:
+            row = self._reader.execute(
+                "SELECT data FROM generation_status WHERE id = ?", (generation_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        return GenerationStatus(**json.loads(row[0]))
+
+    def _write_many(self, batch: List[GenerationStatus]):
+        now = time.time()
+        rows = [
+            (
+                status.id,
+                status.status,
+                status.completed_at.timestamp() if status.completed_at else None,
+                now,
+                status.model_dump_json()
+            )
+            for status in batch
+        ]
+        with self._lock:
+            self._connection.execute("BEGIN")
+            try:
+                self._connection.executemany(
+                    "INSERT INTO generation_status (id, status, completed_at, updated_at, data) VALUES (?, ?, ?, ?, ?)"
+                    " ON CONFLICT(id) DO UPDATE SET status = excluded.status, completed_at = excluded.completed_at,"
+                    " updated_at = excluded.updated_at, data = excluded.data",
+                    rows
+                )
+                self._connection.execute("COMMIT")
+            except Exception:
+                self._connection.execute("ROLLBACK")
+                raise
+
+    def _delete(self, generation_id: str):
+        with self._lock:
+            self._connection.execute("DELETE FROM generation_status WHERE id = ?", (generation_id,))
+
+    def _evict(self, cutoff: float) -> int:
+        with self._lock:
+            cursor = self._connection.execute(
+                "DELETE FROM generation_status WHERE completed_at IS NOT NULL AND completed_at < ?", (cutoff,)
+            )
+            return cursor.rowcount
+
+    def _fail_stale_rows(self, cutoff: float, owned: Iterable[str]) -> int:
+        owned = set(owned)
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT id, data FROM generation_status WHERE completed_at IS NULL AND updated_at < ?", (cutoff,)
+            ).fetchall()
+        stale = []
+        for generation_id, data in rows:
+            if generation_id in owned:
+                continue
+            status = GenerationStatus(**json.loads(data))
+            self._mark_stale(status)
+            stale.append(status)
+        if stale:
+            self._write_many(stale)
+            self.counters["stale"] += len(stale)
+            self.logger.warning(f"Marked {len(stale)} interrupted generations as failed")
+        return len(stale)
+
+    def _reserve_key(self, key: str, fingerprint: str, generation_id: str, now: float) -> Tuple[str, str]:
+        with self._lock:
+            # INSERT OR IGNORE makes the first writer win across workers
+            self._connection.execute(
+                "INSERT OR IGNORE INTO idempotency_keys (key, generation_id, fingerprint, created_at) "
+                "VALUES (?, ?, ?, ?)",
+                (key, generation_id, fingerprint, now)
+            )
+            row = self._connection.execute(
+                "SELECT generation_id, fingerprint FROM idempotency_keys WHERE key = ?", (key,)
+            ).fetchone()
+        return row[0], row[1]
+
+    def _release_key(self, key: str):
+        with self._lock:
+            self._connection.execute("DELETE FROM idempotency_keys WHERE key = ?", (key,))
+
+    def _evict_keys(self, cutoff: float):
+        with self._lock:
+            self._connection.execute("DELETE FROM idempotency_keys WHERE created_at < ?", (cutoff,))
+
+    async def stop(self):
+        await super().stop()
+        self._writes.put(None)
+        await asyncio.to_thread(self._writer.join)
+        with self._lock:
+            self._connection.close()
+        with self._read_lock:
+            self._reader.close()
+
+
+def create_status_store(backend: str = settings.STATUS_STORE_BACKEND) -> StatusStore:
+    """Build the status store selected by STATUS_STORE_BACKEND"""
+    backend = backend.lower()
+    if backend == "sqlite":
+        return SQLiteStatusStore()
+    if backend != "memory":
+        logging.getLogger(__name__).warning(f"Unknown status store backend {backend!r}, using memory")
+    return MemoryStatusStore()
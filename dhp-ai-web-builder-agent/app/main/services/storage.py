@@ -1,39 +1,133 @@
-from azure.storage.fileshare import ShareFileClient, ShareDirectoryClient
+from azure.core.exceptions import ResourceExistsError, ResourceNotFoundError
+from azure.storage.fileshare import ShareClient, ShareFileClient, ShareServiceClient
 from app.main.configs.MainConfig import settings
+from app.main.services import metrics
 
+import hashlib
 import os
+import threading
+from typing import IO, Dict, Iterator, Optional, Set, Tuple
+
+
+_share_clients: Dict[Tuple[str, str], ShareClient] = {}
+_known_directories: Set[Tuple[str, str]] = set()
+_clients_lock = threading.Lock()
+
+
+def get_share_client(conn_str: str, share_name: str) -> ShareClient:
+    """Process-wide share client so every StorageService reuses one connection pool"""
+    key = (conn_str, share_name)
+    with _clients_lock:
+        if key not in _share_clients:
+            chunk_size = settings.DOWNLOAD_CHUNK_SIZE_KB * 1024
+            service_client = ShareServiceClient.from_connection_string(
+                conn_str=conn_str,
+                max_range_size=int(settings.STORAGE_UPLOAD_RANGE_MB * 1024 * 1024),
+                max_single_get_size=chunk_size,
+                max_chunk_get_size=chunk_size
+            )
+            _share_clients[key] = service_client.get_share_client(share_name)
+        return _share_clients[key]
+
+
+def archive_etag(md5_hex: str) -> str:
+    """
+    Content ETag of an archive, the same whether it is served from memory, local disk or the share
+    (share copies carry the MD5 in their metadata)
+    """
+    return f'"{md5_hex}"'
+
+
+def stream_md5(stream: IO[bytes], chunk_size: int = 1024 * 1024) -> str:
+    """MD5 of a seekable binary stream, read from the start"""
+    digest = hashlib.md5()
+    stream.seek(0)
+    for chunk in iter(lambda: stream.read(chunk_size), b""):
+        digest.update(chunk)
+    stream.seek(0)
+    return digest.hexdigest()
 
 
 class StorageService:
+    PROJECTS_DIRECTORY = "web-builder-projects"
+    CONTENT_MD5_METADATA = "content_md5"
+
     def __init__(self):
         # Azure Storage configuration
         self.conn_str = settings.SA_CONNECTION
         self.fileshare_name = settings.SA_SHARE_NAME
+        self.download_chunk_size = settings.DOWNLOAD_CHUNK_SIZE_KB * 1024
+        self.upload_concurrency = max(1, settings.STORAGE_UPLOAD_CONCURRENCY)
 
-    def get_fileshare_client(self, file_share_path: str) -> ShareFileClient:
+    @property
+    def share_client(self) -> ShareClient:
+        return get_share_client(self.conn_str, self.fileshare_name)
+
+    def get_fileshare_client(self, file_share_path: str, **kwargs) -> ShareFileClient:
+        if not kwargs:
+            return self.share_client.get_file_client(file_share_path)
+        # Per-client transfer settings need a dedicated client
         return ShareFileClient.from_connection_string(
             conn_str=self.conn_str,
             share_name=self.fileshare_name,
-            file_path=file_share_path
+            file_path=file_share_path,
+            **kwargs
         )
 
     def create_directory_fileshare_if_not_exist(self, directory_path: str):
-        share_dictory_client = ShareDirectoryClient.from_connection_string(
-            conn_str=self.conn_str,
-            share_name=self.fileshare_name,
-            directory_path=directory_path
-        )
-        if not share_dictory_client.exists():
-            share_dictory_client.create_directory()
+        key = (self.fileshare_name, directory_path)
+        if key in _known_directories:
+            return
+        try:
+            self.share_client.get_directory_client(directory_path).create_directory()
+        except ResourceExistsError:
+            pass
+        _known_directories.add(key)
 
     def upload_zip_file(self, local_zip_path: str):
+        with open(local_zip_path, "rb") as f:
+            self.upload_zip_stream(os.path.basename(local_zip_path), f, os.path.getsize(local_zip_path))
+
+    def upload_zip_stream(self, file_name: str, stream: IO[bytes], length: int) -> str:
+        """
+        Upload an archive from any readable binary stream, returning its file share path.
+        Archives larger than STORAGE_UPLOAD_RANGE_MB are uploaded as parallel ranges.
+        Blocking: call it from a worker thread when on the event loop.
+        """
         print("Uploading zip file...")
-        dic_name = "web-builder-projects"
-        file_share_path = dic_name + "/" + os.path.basename(local_zip_path)
+        file_share_path = self.PROJECTS_DIRECTORY + "/" + file_name
 
-        self.create_directory_fileshare_if_not_exist(dic_name)
+        self.create_directory_fileshare_if_not_exist(self.PROJECTS_DIRECTORY)
         file_client = self.get_fileshare_client(file_share_path)
 
-        with open(local_zip_path, "rb") as f:
-            file_client.upload_file(f)
+        # Stored with the file so downloads from the share get the same ETag as local copies
+        metadata = {self.CONTENT_MD5_METADATA: stream_md5(stream)}
+        with metrics.stage_timer("upload", bytes=length):
+            file_client.upload_file(stream, length=length, metadata=metadata, max_concurrency=self.upload_concurrency)
         print("Zip file uploaded.")
+        return file_share_path
+
+    def get_file_properties(self, file_share_path: str) -> Optional[Tuple[int, str]]:
+        """
+        Return (size, etag) of a file on the share, or None if it does not exist.
+        The etag is the content ETag for archives uploaded with their MD5, the share's own ETag otherwise.
+        """
+        try:
+            properties = self.get_fileshare_client(file_share_path).get_file_properties()
+        except ResourceNotFoundError:
+            return None
+        md5_hex = (properties.metadata or {}).get(self.CONTENT_MD5_METADATA)
+        return properties.size, archive_etag(md5_hex) if md5_hex else properties.etag
+
+    def iter_file_range(self, file_share_path: str, offset: int, length: int, chunk_size: int) -> Iterator[bytes]:
+        """Download a byte range from the share as an iterator of chunks"""
+        if chunk_size == self.download_chunk_size:
+            file_client = self.get_fileshare_client(file_share_path)
+        else:
+            file_client = self.get_fileshare_client(
+                file_share_path,
+                max_single_get_size=chunk_size,
+                max_chunk_get_size=chunk_size
+            )
+        downloader = file_client.download_file(offset=offset, length=length, max_concurrency=1)
+        return downloader.chunks()
@@ -0,0 +1,156 @@
+import json
+from typing import List, Optional, Tuple
+
+from app.main.services.json_repair import restore_path_escapes
+
+
+class StreamingFilesExtractor:
+    """
+    Incrementally scans a streamed project JSON response and yields every
+    entry of the top-level "files" object as soon as its value string closes,
+    or every {"path", "content"} item of a "files" array (structured output)
+    as soon as the item closes.
+
+    The scanner keeps its state between feeds and only buffers the string that
+    is currently open, so the total work is linear in the response size. It
+    only tracks string/nesting state; the complete response is still parsed
+    by SimpleGeneratorService once the stream ends.
+    """
+
+    def __init__(self):
+        self._text = ""
+        self._pos = 0
+        self._started = False
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._string_start = 0
+        self._last_string: Optional[str] = None
+        self._key: Optional[str] = None
+        self._files_depth: Optional[int] = None
+        self._files_array_depth: Optional[int] = None
+        self._item: Optional[dict] = None
+        self.files: dict = {}
+
+    def feed(self, chunk: str) -> List[Tuple[str, str]]:
+        """Add a chunk of streamed text and return the files completed by it"""
+        self._text += chunk
+        completed = []
+        text = self._text
+        pos = self._pos
+
+        while pos < len(text):
+            char = text[pos]
+
+            if not self._started:
+                if char == "{":
+                    self._started = True
+                else:
+                    pos += 1
+                    continue
+
+            entry = None
+            if self._in_string:
+                entry = self._string_char(char, text, pos)
+            elif char == '"':
+                self._in_string = True
+                self._string_start = pos
+            elif char == ":":
+                self._key = self._last_string
+            elif char == ",":
+                self._key = None
+            elif char in "{[":
+                self._open(char)
+            elif char in "}]":
+                entry = self._close()
+            if entry:
+                completed.append(entry)
+
+            pos += 1
+
+        # Only an unfinished string needs to be kept for the next feed
+        if self._in_string:
+            self._text = text[self._string_start:]
+            self._pos = pos - self._string_start
+            self._string_start = 0
+        else:
+            self._text = ""
+            self._pos = 0
+        return completed
+
+    def _string_char(self, char: str, text: str, pos: int) -> Optional[Tuple[str, str]]:
+        """Advance inside an open string; returns a file completed by its closing quote"""
+        if self._escape:
+            self._escape = False
+        elif char == "\\":
+            self._escape = True
+        elif char == '"':
+            self._in_string = False
+            return self._on_string(text[self._string_start:pos + 1])
+        return None
+
+    def _open(self, char: str):
+        """Enter an object or array, noting where the "files" object/array and its items start"""
+        if self._key == "files" and self._depth == 1:
+            if char == "{":
+                self._files_depth = self._depth + 1
+            else:
+                self._files_array_depth = self._depth + 1
+        elif char == "{" and self._depth == self._files_array_depth:
+            self._item = {}
+        self._depth += 1
+        self._key = None
+
+    def _close(self) -> Optional[Tuple[str, str]]:
+        """Leave an object or array; returns the file of a completed "files" array item"""
+        self._depth -= 1
+        if self._files_depth is not None and self._depth < self._files_depth:
+            self._files_depth = None
+        entry = None
+        if self._item is not None and self._depth == self._files_array_depth:
+            entry = self._on_item(self._item)
+            self._item = None
+        if self._files_array_depth is not None and self._depth < self._files_array_depth:
+            self._files_array_depth = None
+        return entry
+
+    def _on_string(self, raw: str) -> Optional[Tuple[str, str]]:
+        if self._key is None:
+            # A key (or a bare string in an array); remember it for the next ':'
+            self._last_string = self._decode(raw, is_key=True)
+            return None
+
+        key = self._key
+        self._key = None
+        if self._item is not None and self._depth == self._files_array_depth + 1:
+            if key in ("path", "content"):
+                self._item[key] = self._decode(raw, is_key=key == "path")
+            return None
+        if self._files_depth is None or self._depth != self._files_depth:
+            return None
+
+        content = self._decode(raw, is_key=False)
+        self.files[key] = content
+        return key, content
+
+    def _on_item(self, item: dict) -> Optional[Tuple[str, str]]:
+        path, content = item.get("path"), item.get("content")
+        if path is None or content is None:
+            return None
+        self.files[path] = content
+        return path, content
+
+    @staticmethod
+    def _decode(raw: str, is_key: bool) -> str:
+        try:
+            # strict=False accepts raw newlines/tabs inside string values
+            value = json.loads(raw, strict=False)
+        except json.JSONDecodeError:
+            if is_key:
+                # Windows-style paths such as "src\components\App.jsx"
+                return raw[1:-1].replace("\\", "/")
+            return raw[1:-1]
+        if is_key and "\\" in raw:
+            # "src\types\index.ts" decodes without error, with a tab in place of "\t"
+            return restore_path_escapes(value).replace("\\", "/")
+        return value
@@ -0,0 +1,59 @@
+import openai
+
+# Strict mode needs every property required and no free-form maps, so files and the
+# dependency delta are arrays of objects instead of the prompt templates' path -> content maps
+_PACKAGE_LIST = {
+    "type": "array",
+    "description": "Scaffold overlay mode only: npm packages to add to the scaffold's package.json, otherwise empty",
+    "items": {
+        "type": "object",
+        "properties": {
+            "name": {"type": "string"},
+            "version": {"type": "string", "description": "Semver range, e.g. ^1.2.0"}
+        },
+        "required": ["name", "version"],
+        "additionalProperties": False
+    }
+}
+
+PROJECT_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "project_name": {"type": "string"},
+        "framework": {"type": "string"},
+        "language": {"type": "string"},
+        "instructions": {"type": "string", "description": "Brief instructions for the project"},
+        "files": {
+            "type": "array",
+            "description": "Every file to write, each with its complete content",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "path": {"type": "string", "description": "Path relative to the project root, e.g. src/App.jsx"},
+                    "content": {"type": "string", "description": "Complete file content"}
+                },
+                "required": ["path", "content"],
+                "additionalProperties": False
+            }
+        },
+        "dependencies": _PACKAGE_LIST,
+        "devDependencies": _PACKAGE_LIST
+    },
+    "required": ["project_name", "framework", "language", "instructions", "files", "dependencies", "devDependencies"],
+    "additionalProperties": False
+}
+
+PROJECT_RESPONSE_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {"name": "web_project", "strict": True, "schema": PROJECT_SCHEMA}
+}
+
+SYSTEM_NOTE = "Return the project in the required response schema: files is an array of {path, content} objects."
+
+
+def is_unsupported(error: Exception) -> bool:
+    """True if a deployment (model or API version) rejected the json_schema response format"""
+    if not isinstance(error, openai.BadRequestError):
+        return False
+    message = str(error).lower()
+    return any(term in message for term in ("response_format", "json_schema", "structured output"))
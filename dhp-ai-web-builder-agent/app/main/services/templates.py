@@ -0,0 +1,181 @@
+import hashlib
+import logging
+import os
+import string
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+
+from app.main.configs.MainConfig import settings
+
+# The agent's own prompt templates (instruction, overlay, repair, edit); the staged pipeline's
+# notebook prompts are read from the workspace prompts/ folder or PROMPTS_PATH instead
+AGENT_PROMPTS_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))), "prompts"
+)
+
+
+class TemplateError(Exception):
+    """Raised when an instruction template is missing or malformed"""
+
+
+class CompiledTemplate:
+    """
+    An instruction template pre-split into (literal, placeholder) segments.
+    Rendering is a single join, with the same semantics as str.format for plain {name} fields.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        text: str,
+        mtime: float = 0.0,
+        path: Optional[str] = None,
+        required: Optional[Set[str]] = None
+    ):
+        self.name = name
+        self.path = path
+        self.mtime = mtime
+        self.required = TemplateRegistry.REQUIRED_PLACEHOLDERS if required is None else required
+        self.version = hashlib.sha256(text.encode("utf-8")).hexdigest()[:16]
+        self.segments, self.placeholders = self._compile(name, text, self.required)
+
+    @staticmethod
+    def _compile(name: str, text: str, required: Set[str]) -> Tuple[List[Tuple[str, Optional[str]]], set]:
+        try:
+            parsed = list(string.Formatter().parse(text))
+        except ValueError as e:
+            raise TemplateError(f"{name}: {str(e)} (escape literal braces as {{{{ and }}}})")
+
+        segments = []
+        placeholders = set()
+        for literal, field, format_spec, conversion in parsed:
+            if field is not None:
+                if field not in TemplateRegistry.ALLOWED_PLACEHOLDERS:
+                    raise TemplateError(
+                        f"{name}: unknown placeholder {{{field}}} (escape literal braces as {{{{ and }}}})"
+                    )
+                if format_spec or conversion:
+                    raise TemplateError(f"{name}: format specs and conversions are not supported in {{{field}}}")
+                placeholders.add(field)
+            segments.append((literal, field))
+
+        missing = required - placeholders
+        if missing:
+            raise TemplateError(f"{name}: missing required placeholders {sorted(missing)}")
+        return segments, placeholders
+
+    def render(self, values: Dict[str, str]) -> str:
+        parts = []
+        for literal, field in self.segments:
+            parts.append(literal)
+            if field is not None:
+                parts.append(values[field])
+        return "".join(parts)
+
+
+class TemplateRegistry:
+    """
+    Loads every prompts/*_instruction.md variant once, validates it up front and
+    hot-reloads a template only when its file mtime changes.
+    """
+
+    ALLOWED_PLACEHOLDERS = {
+        "instructions", "framework", "language", "styling",
+        "project_name", "file_ext", "main_ext", "config_files",
+        "scaffold_files", "entry_file", "file_list", "file_contents", "issues"
+    }
+    REQUIRED_PLACEHOLDERS = {"instructions"}
+    DEFAULT_TEMPLATE = "react_instruction.md"
+
+    def __init__(
+        self,
+        prompts_dir: str,
+        pattern: str = "*_instruction.md",
+        reload_interval: float = settings.TEMPLATE_RELOAD_INTERVAL_SECONDS,
+        required_placeholders: Optional[Set[str]] = None,
+        default_template: Optional[str] = DEFAULT_TEMPLATE
+    ):
+        self.prompts_dir = Path(prompts_dir)
+        self.pattern = pattern
+        self.reload_interval = reload_interval
+        if required_placeholders is None:
+            required_placeholders = self.REQUIRED_PLACEHOLDERS
+        self.required_placeholders = required_placeholders
+        self.default_template = default_template
+        self.logger = logging.getLogger(__name__)
+        self._templates: Dict[str, CompiledTemplate] = {}
+        self._checked_at: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def load_all(self):
+        """Compile every template; raises TemplateError listing all problems"""
+        templates = {}
+        errors = []
+        for path in sorted(self.prompts_dir.glob(self.pattern)):
+            try:
+                templates[path.name] = self._load(path)
+            except (TemplateError, OSError) as e:
+                errors.append(str(e))
+
+        if self.default_template and self.default_template not in templates and not errors:
+            errors.append(f"default template {self.default_template} not found in {self.prompts_dir}")
+        if errors:
+            raise TemplateError("Invalid instruction templates:\n" + "\n".join(errors))
+
+        with self._lock:
+            self._templates = templates
+            self._checked_at = {name: time.monotonic() for name in templates}
+        self.logger.info(f"Loaded {len(templates)} instruction templates from {self.prompts_dir}")
+
+    def _load(self, path: Path) -> CompiledTemplate:
+        mtime = os.stat(path).st_mtime
+        with open(path, "r", encoding="utf-8") as file:
+            return CompiledTemplate(
+                path.name, file.read(), mtime=mtime, path=str(path), required=self.required_placeholders
+            )
+
+    def get(self, name: str) -> Optional[CompiledTemplate]:
+        """Return a compiled template, reloading it if the file changed since it was loaded"""
+        template = self._templates.get(name)
+        if template is None or self.reload_interval < 0:
+            return template
+
+        now = time.monotonic()
+        if now - self._checked_at.get(name, 0.0) < self.reload_interval:
+            return template
+
+        with self._lock:
+            self._checked_at[name] = now
+            try:
+                mtime = os.stat(template.path).st_mtime
+                if mtime != template.mtime:
+                    template = self._load(Path(template.path))
+                    self._templates[name] = template
+                    self.logger.info(f"Reloaded instruction template {name}")
+            except (TemplateError, OSError) as e:
+                # Keep serving the last good version instead of breaking live traffic
+                self.logger.error(f"Failed to reload {name}, keeping previous version: {str(e)}")
+        return self._templates[name]
+
+    def resolve(self, framework: str, styling: str) -> CompiledTemplate:
+        """
+        Pick the template for a framework/styling pair.
+        Falls back to the React variant of the same styling, then to React Tailwind.
+        """
+        framework_lower = framework.lower()
+        if styling.lower() == "nucleuscss":
+            candidates = [f"{framework_lower}_nucleus_instruction.md", "react_nucleus_instruction.md"]
+        else:
+            candidates = [f"{framework_lower}_instruction.md"]
+        if self.default_template:
+            candidates.append(self.default_template)
+
+        for index, name in enumerate(candidates):
+            template = self.get(name)
+            if template is not None:
+                if index > 0:
+                    self.logger.warning(f"No {styling} template found for {framework}, using {name} as fallback")
+                return template
+        raise TemplateError(f"No instruction template available for {framework}/{styling}")
@@ -0,0 +1,198 @@
+import json
+import logging
+import posixpath
+import re
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+
+class ValidationIssue:
+    """A problem found in a generated project and the file that has to be (re)generated to fix it"""
+
+    def __init__(self, kind: str, path: str, message: str, target: Optional[str] = None, module: Optional[str] = None):
+        self.kind = kind  # invalid_json, unresolved_import, missing_default_export, missing_dependency
+        self.path = path  # file the problem was found in
+        self.message = message
+        self.target = target or path  # file to regenerate or create
+        self.module = module  # import specifier or package name involved
+
+    def __str__(self) -> str:
+        return f"{self.path}: {self.message}"
+
+
+class ProjectValidator:
+    """
+    Static checks of a generated Vite project that catch what would otherwise only
+    fail after npm install: unparsable JSON files, relative imports of files that
+    were never generated, default imports of modules without a default export and
+    packages imported but missing from package.json.
+    """
+
+    SCRIPT_EXTENSIONS = (".js", ".jsx", ".ts", ".tsx", ".mjs", ".vue")
+    RESOLVE_EXTENSIONS = (".ts", ".tsx", ".js", ".jsx", ".vue", ".mjs", ".json", ".css")
+    # Only modules written in JS/TS can lack a default export (.vue, .css, .json always have one)
+    DEFAULT_EXPORT_EXTENSIONS = (".js", ".jsx", ".ts", ".tsx", ".mjs")
+    # Assets the model cannot generate; their imports are left to the bundler
+    BINARY_EXTENSIONS = (
+        ".png", ".jpg", ".jpeg", ".gif", ".webp", ".ico", ".bmp", ".woff", ".woff2", ".ttf", ".otf", ".mp4", ".mp3"
+    )
+    # Node built-in modules (imported bare by vite.config and other build scripts), never npm packages
+    NODE_BUILTINS = frozenset((
+        "assert", "async_hooks", "buffer", "child_process", "cluster", "console", "constants", "crypto",
+        "dgram", "diagnostics_channel", "dns", "domain", "events", "fs", "http", "http2", "https", "inspector",
+        "module", "net", "os", "path", "perf_hooks", "process", "punycode", "querystring", "readline", "repl",
+        "stream", "string_decoder", "sys", "timers", "tls", "trace_events", "tty", "url", "util", "v8", "vm",
+        "wasi", "worker_threads", "zlib"
+    ))
+
+    _BLOCK_COMMENT = re.compile(r"/\*.*?\*/", re.S)
+    _LINE_COMMENT = re.compile(r"^\s*//.*$", re.M)
+    _STATIC_IMPORT = re.compile(
+        r"""(?:^|[;\n}])\s*(?P<keyword>import|export)\s+"""
+        r"""(?:(?P<clause>[\w$*{},\s]+?)\s+from\s+)?['"](?P<spec>[^'"\n]+)['"]"""
+    )
+    _DYNAMIC_IMPORT = re.compile(r"""(?P<lazy>lazy\(\s*\(\)\s*=>\s*)?\bimport\(\s*['"](?P<spec>[^'"\n]+)['"]\s*\)""")
+    _CSS_IMPORT = re.compile(r"""@import\s+(?:url\()?['"](?P<spec>[^'"\n]+)['"]""")
+    # tsconfig/jsconfig files are JSON with comments and trailing commas
+    _JSONC_TOKEN = re.compile(r'("(?:\\.|[^"\\])*")|//[^\n]*|/\*.*?\*/', re.S)
+    _TRAILING_COMMA = re.compile(r",(\s*[}\]])")
+    _DEFAULT_EXPORT = re.compile(r"\bexport\s+default\b|\bexport\s*\{[^}]*\bdefault\b[^}]*\}|\bmodule\.exports\b")
+
+    def __init__(self):
+        self.logger = logging.getLogger(__name__)
+
+    def validate(self, files: Dict[str, str]) -> List[ValidationIssue]:
+        """Check every file of the project (path -> content); an empty list means no problems were found"""
+        issues: List[ValidationIssue] = []
+        default_imports: Dict[str, Set[str]] = defaultdict(set)  # resolved module -> importers
+        packages: Dict[str, Set[str]] = defaultdict(set)  # package name -> importers
+
+        for path, content in files.items():
+            if path.endswith(".json"):
+                issue = self._check_json(path, content)
+                if issue:
+                    issues.append(issue)
+            elif path.endswith(self.SCRIPT_EXTENSIONS) or path.endswith(".css"):
+                for spec, is_default in self.imports(path, content):
+                    if spec.startswith((".", "/")):
+                        resolved = self.resolve(path, spec, files)
+                        if resolved is None:
+                            if not spec.lower().endswith(self.BINARY_EXTENSIONS):
+                                issues.append(ValidationIssue(
+                                    "unresolved_import", path, f"imports '{spec}', which does not exist",
+                                    target=self._missing_module_path(path, spec),
+                                    module=spec
+                                ))
+                        elif is_default:
+                            default_imports[resolved].add(path)
+                    elif ":" not in spec and not spec.startswith(("@/", "~")):
+                        # Bare specifiers are packages (URLs, node: and virtual: modules and aliases are skipped)
+                        name = self._package_name(spec)
+                        if name not in self.NODE_BUILTINS:
+                            packages[name].add(path)
+
+        for module, importers in default_imports.items():
+            if module.endswith(self.DEFAULT_EXPORT_EXTENSIONS) and not self._DEFAULT_EXPORT.search(files[module]):
+                issues.append(ValidationIssue(
+                    "missing_default_export", module,
+                    f"has no default export but is default-imported by {', '.join(sorted(importers))}"
+                ))
+
+        issues.extend(self._check_dependencies(files, packages))
+        return issues
+
+    def _check_json(self, path: str, content: str) -> Optional[ValidationIssue]:
+        if posixpath.basename(path).startswith(("tsconfig", "jsconfig")):
+            content = self._JSONC_TOKEN.sub(lambda match: match.group(1) or "", content)
+            content = self._TRAILING_COMMA.sub(r"\1", content)
+        try:
+            data = json.loads(content)
+        except json.JSONDecodeError as e:
+            return ValidationIssue("invalid_json", path, f"is not valid JSON ({str(e)})")
+        if path == "package.json":
+            scripts = data.get("scripts") if isinstance(data, dict) else None
+            if not isinstance(scripts, dict) or not isinstance(scripts.get("dev"), str):
+                return ValidationIssue("invalid_json", path, "has no scripts.dev command for the preview server")
+        return None
+
+    def _check_dependencies(self, files: Dict[str, str], packages: Dict[str, Set[str]]) -> List[ValidationIssue]:
+        try:
+            package = json.loads(files.get("package.json", ""))
+        except json.JSONDecodeError:
+            return []  # reported as invalid_json, or no package.json to check against
+        if not isinstance(package, dict):
+            return []
+        declared = set()
+        for section in ("dependencies", "devDependencies", "peerDependencies"):
+            if isinstance(package.get(section), dict):
+                declared.update(package[section])
+
+        issues = []
+        for name, importers in sorted(packages.items()):
+            if name not in declared:
+                issues.append(ValidationIssue(
+                    "missing_dependency", "package.json",
+                    f"does not list '{name}', imported by {', '.join(sorted(importers))}",
+                    module=name
+                ))
+        return issues
+
+    def imports(self, path: str, content: str) -> Iterable[Tuple[str, bool]]:
+        """(specifier, is default import) of every import and re-export in a file"""
+        if path.endswith(".css"):
+            for match in self._CSS_IMPORT.finditer(content):
+                yield match.group("spec"), False
+            return
+
+        code = self._LINE_COMMENT.sub("", self._BLOCK_COMMENT.sub("", content))
+        for match in self._STATIC_IMPORT.finditer(code):
+            clause = (match.group("clause") or "").strip()
+            is_default = (
+                match.group("keyword") == "import"
+                and bool(clause)
+                and not clause.startswith(("{", "*", "type "))
+            )
+            yield match.group("spec"), is_default
+        for match in self._DYNAMIC_IMPORT.finditer(code):
+            # React.lazy needs the module's default export
+            yield match.group("spec"), bool(match.group("lazy"))
+
+    def resolve(self, importer: str, spec: str, files: Dict[str, str]) -> Optional[str]:
+        """Path of the project file a relative (or root-absolute) import refers to, None if there is none"""
+        spec = spec.split("?", 1)[0]
+        if spec.startswith("/"):
+            # Vite serves root-absolute paths from the project root, then from public/
+            candidates = [spec.lstrip("/"), "public" + spec]
+        else:
+            candidates = [posixpath.normpath(posixpath.join(posixpath.dirname(importer), spec))]
+
+        for base in candidates:
+            stem, ext = posixpath.splitext(base)
+            options = [base]
+            # TypeScript lets "./util.js" refer to util.ts
+            if ext in (".js", ".jsx"):
+                options += [stem + ".ts", stem + ".tsx"]
+            options += [base + extension for extension in self.RESOLVE_EXTENSIONS]
+            options += [f"{base}/index{extension}" for extension in self.RESOLVE_EXTENSIONS]
+            for option in options:
+                if option in files:
+                    return option
+        return None
+
+    def _missing_module_path(self, importer: str, spec: str) -> str:
+        """Where a missing module should be created, e.g. src/App.jsx + './pages/About' -> src/pages/About.jsx"""
+        spec = spec.split("?", 1)[0]
+        if spec.startswith("/"):
+            path = spec.lstrip("/")
+        else:
+            path = posixpath.normpath(posixpath.join(posixpath.dirname(importer), spec))
+        if posixpath.splitext(path)[1]:
+            return path
+        importer_ext = posixpath.splitext(importer)[1]
+        return path + (".js" if importer_ext == ".vue" else importer_ext)
+
+    @staticmethod
+    def _package_name(spec: str) -> str:
+        """'react-dom/client' -> 'react-dom', '@scope/pkg/sub' -> '@scope/pkg'"""
+        parts = spec.split("/")
+        return "/".join(parts[:2]) if spec.startswith("@") else parts[0]
@@ -0,0 +1,192 @@
+import hashlib
+import json
+import logging
+import os
+import shutil
+import threading
+import uuid
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, Optional
+
+from app.main.configs.MainConfig import settings
+from app.main.services.storage import StorageService
+
+if TYPE_CHECKING:
+    from app.main.services.project_manager import ProjectManagerService
+
+
+class ProjectZipCache:
+    """
+    Local cache of project archives fetched from the Azure file share for previews.
+
+    Archives the generator packaged in this process are used as-is: the project
+    manager's in-memory archive cache (PACKAGING_MODE=memory), then OUTPUT_PATH/zips
+    (PACKAGING_MODE=disk). Otherwise entries are keyed on the share path and validated against the file's
+    ETag, so an unchanged archive is never downloaded twice. Misses are streamed to
+    disk in chunks and entries are evicted least-recently-used past ZIP_CACHE_MAX_MB.
+    """
+
+    def __init__(
+        self,
+        storage_service: Optional[StorageService] = None,
+        project_manager: Optional["ProjectManagerService"] = None,
+        cache_path: Optional[str] = settings.ZIP_CACHE_PATH,
+        max_bytes: int = int(settings.ZIP_CACHE_MAX_MB * 1024 * 1024),
+        chunk_size: int = settings.DOWNLOAD_CHUNK_SIZE_KB * 1024
+    ):
+        self.storage_service = storage_service or StorageService()
+        self.project_manager = project_manager
+        self.output_zips = Path(settings.OUTPUT_PATH) / "zips" if settings.OUTPUT_PATH else None
+        self.cache_dir = Path(cache_path or os.path.join(settings.OUTPUT_PATH, "zip_cache"))
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.chunk_size = chunk_size
+        self.logger = logging.getLogger(__name__)
+
+        self._locks: Dict[str, threading.Lock] = {}
+        self._locks_guard = threading.Lock()
+        self.counters = {"memory_hits": 0, "local_hits": 0, "hits": 0, "misses": 0, "evictions": 0}
+
+    def fetch(self, file_share_path: str, local_path: str) -> str:
+        """Place the archive at file_share_path at local_path, downloading it only when needed"""
+        archive = self._generator_archive(file_share_path)
+        if archive is not None:
+            self.counters["memory_hits"] += 1
+            self.logger.info(f"Using in-memory archive of {file_share_path}")
+            self._write(archive, local_path)
+            return local_path
+
+        local_zip = self._generator_output(file_share_path)
+        if local_zip is not None:
+            self.counters["local_hits"] += 1
+            self.logger.info(f"Using locally generated archive {local_zip}")
+            self._materialize(local_zip, local_path)
+            return local_path
+
+        key = hashlib.sha256(file_share_path.encode("utf-8")).hexdigest()[:32]
+        entry = self.cache_dir / f"{key}.zip"
+        metadata_path = self.cache_dir / f"{key}.json"
+
+        with self._key_lock(key):
+            properties = self.storage_service.get_file_properties(file_share_path)
+            if properties is None:
+                raise FileNotFoundError(f"{file_share_path} not found on the file share")
+            size, etag = properties
+
+            if entry.is_file() and self._metadata(metadata_path).get("etag") == etag:
+                self.counters["hits"] += 1
+                os.utime(entry)
+                self.logger.info(f"Zip cache hit for {file_share_path}")
+            else:
+                self.counters["misses"] += 1
+                self._download(file_share_path, size, entry)
+                metadata_path.write_text(json.dumps({"path": file_share_path, "etag": etag, "size": size}))
+                self.logger.info(f"Zip cache miss for {file_share_path}, downloaded {size} bytes")
+
+            # Linked while holding the entry lock so eviction cannot remove it first
+            self._materialize(entry, local_path)
+
+        self.evict(keep=entry)
+        return local_path
+
+    @staticmethod
+    def _project_archive_name(file_share_path: str) -> Optional[str]:
+        """File name of an archive in the file share's projects directory, None for any other path"""
+        directory, _, name = file_share_path.rpartition("/")
+        if directory != StorageService.PROJECTS_DIRECTORY or not name.endswith(".zip"):
+            return None
+        return name
+
+    def _generator_archive(self, file_share_path: str) -> Optional[bytes]:
+        """Archive still held by the project manager's in-memory cache (memory packaging mode)"""
+        name = self._project_archive_name(file_share_path)
+        if self.project_manager is None or name is None:
+            return None
+        return self.project_manager.cached_archive(name[:-len(".zip")])
+
+    def _generator_output(self, file_share_path: str) -> Optional[Path]:
+        """Archives under the projects directory were packaged here if OUTPUT_PATH/zips has them"""
+        name = self._project_archive_name(file_share_path)
+        if self.output_zips is None or name is None:
+            return None
+        local_zip = self.output_zips / name
+        return local_zip if local_zip.is_file() else None
+
+    def _download(self, file_share_path: str, size: int, entry: Path):
+        """Stream the file to a temporary name, then publish it atomically"""
+        staging = self.cache_dir / f".download-{uuid.uuid4().hex}"
+        try:
+            with open(staging, "wb") as f:
+                if size:
+                    for chunk in self.storage_service.iter_file_range(file_share_path, 0, size, self.chunk_size):
+                        f.write(chunk)
+            os.replace(staging, entry)
+        finally:
+            if staging.exists():
+                staging.unlink()
+
+    @staticmethod
+    def _metadata(metadata_path: Path) -> dict:
+        try:
+            return json.loads(metadata_path.read_text())
+        except (OSError, ValueError):
+            return {}
+
+    def evict(self, keep: Optional[Path] = None) -> int:
+        """Remove least recently used archives until the cache fits its quota"""
+        entries = []
+        for entry in self.cache_dir.glob("*.zip"):
+            try:
+                stat = entry.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, entry))
+        entries.sort(key=lambda item: item[0])
+
+        total = sum(size for _, size, _ in entries)
+        evicted = 0
+        for _, size, entry in entries:
+            if total <= self.max_bytes:
+                break
+            if entry == keep:
+                continue
+            with self._key_lock(entry.stem):
+                entry.unlink(missing_ok=True)
+                entry.with_suffix(".json").unlink(missing_ok=True)
+            total -= size
+            evicted += 1
+            self.logger.info(f"Evicted cached archive {entry.name}")
+        self.counters["evictions"] += evicted
+        return evicted
+
+    def stats(self) -> dict:
+        sizes = [entry.stat().st_size for entry in self.cache_dir.glob("*.zip")]
+        return {**self.counters, "entries": len(sizes), "bytes": sum(sizes), "max_bytes": self.max_bytes}
+
+    def _key_lock(self, key: str) -> threading.Lock:
+        with self._locks_guard:
+            return self._locks.setdefault(key, threading.Lock())
+
+    @staticmethod
+    def _write(archive: bytes, local_path: str):
+        """Write an in-memory archive to local_path through a temporary name"""
+        os.makedirs(os.path.dirname(local_path) or ".", exist_ok=True)
+        staging = f"{local_path}.{uuid.uuid4().hex}.tmp"
+        try:
+            with open(staging, "wb") as f:
+                f.write(archive)
+            os.replace(staging, local_path)
+        finally:
+            if os.path.exists(staging):
+                os.unlink(staging)
+
+    @staticmethod
+    def _materialize(cached_zip: Path, local_path: str):
+        """Place the archive at local_path (hardlink when possible)"""
+        os.makedirs(os.path.dirname(local_path) or ".", exist_ok=True)
+        if os.path.lexists(local_path):
+            os.unlink(local_path)
+        try:
+            os.link(cached_zip, local_path)
+        except OSError:
+            shutil.copyfile(cached_zip, local_path)
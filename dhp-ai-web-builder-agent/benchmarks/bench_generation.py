@@ -0,0 +1,309 @@
+"""
+Offline benchmark of the generation pipeline.
+
+Recorded Azure OpenAI responses (fixtures/responses, valid and malformed) are
+replayed through a stub LLM client and packaging uploads go to a local directory
+instead of the Azure file share, so no network access or credentials are needed.
+
+Stages (latency percentiles over --iterations runs, plus peak Python memory of
+one extra traced run):
+    render_prompt   instruction template rendering per framework/styling
+    parse_response  response parsing (strict JSON, then the tolerant parser)
+    write_files     writing the project tree to disk
+    create_zip      zipping a written tree (disk packaging)
+    build_archive   zipping in memory (memory packaging)
+    upload          upload to the local storage stand-in
+    package_disk    full disk packaging (write, zip, upload)
+    package_memory  full memory packaging (zip, upload)
+
+End to end: POST /v1/generator/generate through the ASGI app with N clients,
+each submitting and polling until the generation finishes, for every level in
+--concurrency. Reports throughput and completion latency.
+
+Results are printed (or written with --output) as JSON so runs can be diffed
+across commits.
+
+Usage (from dhp-ai-web-builder-agent/):
+    python benchmarks/bench_generation.py [--iterations 20] [--concurrency 1,4,16]
+        [--requests 32] [--llm-latency-ms 0] [--output results.json]
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import logging
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+
+REPO_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_DIR))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+# Isolated, offline configuration; must be in place before the app modules are imported
+BENCH_DIR = tempfile.mkdtemp(prefix="bench-generation-")
+os.environ["OUTPUT_PATH"] = BENCH_DIR
+os.environ["GENERATION_CACHE_ENABLED"] = "false"
+os.environ["STATUS_STORE_BACKEND"] = "memory"
+# Validation repair calls would replay further fixtures; set VALIDATION_ENABLED=true to include them
+os.environ.setdefault("VALIDATION_ENABLED", "false")
+os.environ.setdefault("AZURE_ENDPOINT", "https://bench.invalid")
+os.environ.setdefault("AZURE_MODEL", "bench")
+os.environ.setdefault("AZURE_API_VERSION", "2024-02-01")
+os.environ.setdefault("AZURE_OPENAI_API_KEY", "bench")
+if (REPO_DIR.parent / "base_projects").is_dir():
+    os.environ.setdefault("BASE_PROJECTS_PATH", str(REPO_DIR.parent / "base_projects"))
+
+from stubs import LocalStorage, StubLLMClient, load_responses  # noqa: E402
+
+from app.main.services import llm_client  # noqa: E402
+
+RENDER_CASES = [
+    ("React", "JavaScript", "TailwindCSS"),
+    ("React", "TypeScript", "NucleusCSS"),
+    ("Vue", "JavaScript", "NucleusCSS"),
+    ("Vue", "TypeScript", "TailwindCSS"),
+]
+
+
+def summarize(timings: list) -> dict:
+    ordered = sorted(timings)
+    return {
+        "ms_median": round(statistics.median(ordered), 3),
+        "ms_p95": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))], 3),
+        "ms_max": round(ordered[-1], 3)
+    }
+
+
+async def measure(fn, iterations: int) -> dict:
+    """Time fn over the iterations, then run it once more under tracemalloc for peak memory"""
+    async def call():
+        result = fn()
+        if asyncio.iscoroutine(result):
+            result = await result
+        return result
+
+    timings = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        await call()
+        timings.append((time.perf_counter() - start) * 1000)
+
+    tracemalloc.start()
+    try:
+        await call()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {**summarize(timings), "peak_kb": round(peak / 1024, 1)}
+
+
+async def bench_stages(generator_router, responses, iterations: int) -> list:
+    generator = generator_router.simple_generator
+    project_manager = generator_router.project_manager
+    results = []
+
+    for framework, language, styling in RENDER_CASES:
+        stats = await measure(
+            lambda: generator._create_ultimate_instruction(
+                "A recipe sharing site with search and favourites", framework, language, styling, "Bench"
+            ),
+            iterations
+        )
+        results.append({"stage": "render_prompt", "case": f"{framework}/{language}/{styling}", **stats})
+
+    project = None
+    for name, text in responses:
+        parsed = generator._parse_project_response(text, "Bench")
+        stats = await measure(lambda: generator._parse_project_response(text, "Bench"), iterations)
+        results.append({
+            "stage": "parse_response",
+            "case": name,
+            "bytes": len(text.encode("utf-8")),
+            "files": len(parsed.files) if parsed else 0,
+            "repaired_files": len(parsed.repaired_files) if parsed else 0,
+            **stats
+        })
+        if project is None and parsed is not None:
+            project = parsed
+
+    if project is None:
+        return results
+
+    info = {"id": "bench", "name": project.project_name, "type": "simple_generated"}
+    case = f"{len(project.files)} files"
+    project_dir = Path(BENCH_DIR) / "projects" / "bench-stage"
+    archive_path = Path(BENCH_DIR) / "bench-stage.zip"
+    with project_manager._build_archive(project.files, info) as spool:
+        spool.seek(0)
+        archive_path.write_bytes(spool.read())
+
+    def write_files():
+        project_manager._write_project_tree(project_dir, project.files, info)
+
+    def upload():
+        with open(archive_path, "rb") as f:
+            project_manager.storage_service.upload_zip_stream("bench-stage.zip", f, archive_path.stat().st_size)
+
+    results.append({"stage": "write_files", "case": case, **await measure(write_files, iterations)})
+    results.append({"stage": "create_zip", "case": case, **await measure(
+        lambda: project_manager._create_zip(project_dir, "bench-stage"), iterations
+    )})
+    results.append({"stage": "build_archive", "case": case, **await measure(
+        lambda: project_manager._build_archive(project.files, info).close(), iterations
+    )})
+    results.append({
+        "stage": "upload", "case": f"{archive_path.stat().st_size} bytes", **await measure(upload, iterations)
+    })
+    results.append({"stage": "package_disk", "case": case, **await measure(
+        lambda: project_manager._package_on_disk("bench-disk", project, info), iterations
+    )})
+    results.append({"stage": "package_memory", "case": case, **await measure(
+        lambda: project_manager._package_in_memory("bench-memory", project, info), iterations
+    )})
+    return results
+
+
+async def bench_endpoint(app, generator_router, stub, concurrency: int, total: int, poll_interval: float) -> dict:
+    import httpx
+
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies, outcomes = [], {"completed": 0, "failed": 0, "rejected": 0}
+    calls_before = stub.calls
+
+    async def one(client, index: int):
+        async with semaphore:
+            body = {
+                "instructions": f"Benchmark project {concurrency}-{index}",
+                "projectName": f"bench-{concurrency}-{index}",
+                "bypass_cache": True
+            }
+            start = time.perf_counter()
+            while True:
+                response = await client.post("/v1/generator/generate", json=body)
+                if response.status_code != 429:
+                    break
+                outcomes["rejected"] += 1
+                await asyncio.sleep(poll_interval)
+            response.raise_for_status()
+            generation_id = response.json()["generation_id"]
+
+            while True:
+                status = (await client.get(f"/v1/generator/status/{generation_id}")).json()
+                if status["status"] in ("completed", "failed"):
+                    break
+                await asyncio.sleep(poll_interval)
+            latencies.append((time.perf_counter() - start) * 1000)
+            outcomes[status["status"]] += 1
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        start = time.perf_counter()
+        await asyncio.gather(*(one(client, index) for index in range(total)))
+        elapsed = time.perf_counter() - start
+
+    return {
+        "concurrency": concurrency,
+        "requests": total,
+        "workers": generator_router.generation_queue.max_concurrency,
+        "seconds": round(elapsed, 3),
+        "generations_per_second": round(total / elapsed, 3),
+        **{f"latency_{key}": value for key, value in summarize(latencies).items()},
+        **outcomes,
+        "llm_calls": stub.calls - calls_before
+    }
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=REPO_DIR, capture_output=True, text=True, timeout=10
+        ).stdout.strip() or "unknown"
+    except (OSError, subprocess.SubprocessError):
+        return "unknown"
+
+
+async def run(args) -> dict:
+    responses = load_responses(Path(args.fixtures))
+    stub = StubLLMClient(
+        responses,
+        latency=args.llm_latency_ms / 1000,
+        chunk_interval=args.chunk_interval_ms / 1000
+    )
+    # Every service picks up the process-wide client on construction
+    llm_client._llm_client = stub
+
+    from app.main.main import create_app
+    from app.main.routers import generator as generator_router
+
+    logging.getLogger().setLevel(args.log_level)
+    generator_router.project_manager.storage_service = LocalStorage(os.path.join(BENCH_DIR, "share"))
+
+    stages = await bench_stages(generator_router, responses, args.iterations)
+
+    app = create_app()
+    await generator_router.status_store.start()
+    await generator_router.generation_queue.start()
+    try:
+        endpoint = [
+            await bench_endpoint(app, generator_router, stub, level, args.requests, args.poll_interval_ms / 1000)
+            for level in args.concurrency
+        ]
+    finally:
+        await generator_router.generation_queue.stop()
+        await generator_router.status_store.stop()
+
+    return {
+        "benchmark": "generation",
+        "revision": git_revision(),
+        "timestamp": datetime.now().isoformat(),
+        "python": platform.python_version(),
+        "config": {
+            "iterations": args.iterations,
+            "requests": args.requests,
+            "llm_latency_ms": args.llm_latency_ms,
+            "chunk_interval_ms": args.chunk_interval_ms,
+            "streaming": os.getenv("LLM_STREAMING", "true"),
+            "packaging_mode": generator_router.project_manager.packaging_mode,
+            "fixtures": [name for name, _ in responses]
+        },
+        "stages": stages,
+        "endpoint": endpoint
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument(
+        "--concurrency", type=lambda value: [int(level) for level in value.split(",")], default=[1, 4, 16]
+    )
+    parser.add_argument("--requests", type=int, default=32, help="generations per concurrency level")
+    parser.add_argument("--llm-latency-ms", type=float, default=0, help="simulated time to first token")
+    parser.add_argument("--chunk-interval-ms", type=float, default=0, help="simulated delay between streamed chunks")
+    parser.add_argument("--poll-interval-ms", type=float, default=10)
+    parser.add_argument("--fixtures", default=str(Path(__file__).resolve().parent / "fixtures" / "responses"))
+    parser.add_argument("--log-level", default="ERROR")
+    parser.add_argument("--output", help="write results to this file instead of stdout")
+    args = parser.parse_args()
+
+    # The services print progress; keep stdout for the results
+    with contextlib.redirect_stdout(sys.stderr):
+        results = asyncio.run(run(args))
+
+    output = json.dumps(results, indent=2)
+    if args.output:
+        Path(args.output).write_text(output + "\n", encoding="utf-8")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
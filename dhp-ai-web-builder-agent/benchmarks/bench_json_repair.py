@@ -0,0 +1,102 @@
+"""
+Benchmark the LLM response parser on the fixture corpus in fixtures/responses.
+
+Each fixture reproduces one failure mode seen in model output (raw newlines,
+unescaped quotes, Windows paths, truncation, fenced/trailing-comma output,
+truncated structured-output "files" arrays).
+File names are normalized like the generator does, and both the full parse and
+the streaming extractor report names that still contain control characters
+(e.g. "src\types" decoded as a tab). Results are printed as JSON so runs can be diffed.
+
+Usage (from dhp-ai-web-builder-agent/):
+    python benchmarks/bench_json_repair.py [--iterations 20]
+"""
+import argparse
+import json
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.main.services.json_repair import JSONRepairError, parse_project_json, restore_path_escapes  # noqa: E402
+from app.main.services.stream_parser import StreamingFilesExtractor  # noqa: E402
+
+FIXTURES_DIR = Path(__file__).resolve().parent / "fixtures" / "responses"
+
+
+def parse_response(text: str):
+    """Same strategy as SimpleGeneratorService._parse_project_response: strict fast path, then repair"""
+    json_start = text.find("{")
+    try:
+        data, _end = json.JSONDecoder().raw_decode(text, json_start)
+        return data, []
+    except ValueError:
+        return parse_project_json(text)
+
+
+def normalize_path(path: str) -> str:
+    """Same file name normalization as SimpleGeneratorService._parse_project_response"""
+    return restore_path_escapes(path).replace("\\", "/")
+
+
+def invalid_paths(paths) -> list:
+    return sorted(path for path in paths if any(ord(char) < 32 for char in path))
+
+
+def streamed_paths(text: str, chunk_size: int = 64) -> list:
+    extractor = StreamingFilesExtractor()
+    paths = []
+    for start in range(0, len(text), chunk_size):
+        paths.extend(path for path, _content in extractor.feed(text[start:start + chunk_size]))
+    return paths
+
+
+def bench_fixture(path: Path, iterations: int) -> dict:
+    text = path.read_text(encoding="utf-8")
+    timings = []
+    data, repaired = {}, []
+    error = None
+    for _ in range(iterations):
+        start = time.perf_counter()
+        try:
+            data, repaired = parse_response(text)
+        except JSONRepairError as e:
+            error = str(e)
+        timings.append((time.perf_counter() - start) * 1000)
+
+    files = data.get("files", {}) if isinstance(data, dict) else {}
+    if isinstance(files, list):
+        # Structured output: [{"path", "content"}]
+        files = {item["path"]: item.get("content") for item in files if isinstance(item, dict) and "path" in item}
+    return {
+        "fixture": path.name,
+        "bytes": len(text.encode("utf-8")),
+        "parse_ms_median": round(statistics.median(timings), 3),
+        "parse_ms_max": round(max(timings), 3),
+        "files_recovered": len(files),
+        "files_repaired": len(repaired),
+        "repaired_paths": [normalize_path(name) for name in repaired],
+        "invalid_paths": invalid_paths(normalize_path(name) for name in files),
+        "invalid_streamed_paths": invalid_paths(streamed_paths(text)),
+        "error": error
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--fixtures", default=str(FIXTURES_DIR))
+    args = parser.parse_args()
+
+    results = [
+        bench_fixture(path, args.iterations)
+        for path in sorted(Path(args.fixtures).iterdir())
+        if path.is_file()
+    ]
+    print(json.dumps({"benchmark": "json_repair", "iterations": args.iterations, "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
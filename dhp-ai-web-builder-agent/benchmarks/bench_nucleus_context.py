@@ -0,0 +1,232 @@
+"""
+Prompt size vs. output validity of the compact Nucleus CSS context.
+
+For each sample request and framework the NucleusCSS instruction is rendered with
+the full reference sections and with the retrieval-based context at every budget
+in --budgets; staged page prompts are compared the same way. Sizes are reported
+in characters and estimated tokens (4 characters per token).
+
+Validity is measured on generated projects: whether the response parses, which
+Nucleus classes (nb-*) and variables (--nt-*, --nb-*) it uses, how many of those
+the catalog does not define (invented names) and how many fall outside the
+context the compact prompt offered. Projects come from:
+    --responses DIR   recorded responses (any format the parser accepts); the
+                      context is rebuilt from each project's "instructions"
+    --live            fresh completions for every case, full and compact prompt
+                      (needs the AZURE_* settings and network access)
+Without either, only the prompt sizes and the identifiers the templates' own
+rules and examples mention (which the context should cover) are reported.
+
+Usage (from dhp-ai-web-builder-agent/):
+    python benchmarks/bench_nucleus_context.py [--budgets 400,800,1500]
+        [--responses DIR] [--live] [--output results.json]
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import logging
+import os
+import re
+import sys
+import tempfile
+from datetime import datetime
+from pathlib import Path
+
+REPO_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_DIR))
+
+os.environ.setdefault("OUTPUT_PATH", tempfile.mkdtemp(prefix="bench-nucleus-"))
+os.environ["GENERATION_CACHE_ENABLED"] = "false"
+os.environ.setdefault("AZURE_ENDPOINT", "https://bench.invalid")
+os.environ.setdefault("AZURE_MODEL", "bench")
+os.environ.setdefault("AZURE_API_VERSION", "2024-02-01")
+os.environ.setdefault("AZURE_OPENAI_API_KEY", "bench")
+
+from app.main.services.generator import SimpleGeneratorService  # noqa: E402
+
+SAMPLE_REQUESTS = [
+    "A healthcare appointment booking site with doctor profiles and a contact form",
+    "An analytics dashboard with KPI cards, a sortable data table and charts",
+    "A recipe blog with article pages, categories and a newsletter signup",
+    "An online store with a product grid, product detail modal and shopping cart",
+    "A company landing page with hero, testimonials, FAQ accordion and footer navigation",
+]
+SAMPLE_PAGE = {
+    "name": "ContactPage",
+    "description": "Contact form and office locations",
+    "usage": "Users fill in the contact form, pick a department from a dropdown and submit; links back to /home",
+    "components": ["ContactForm", "LocationCard", "NavBar"]
+}
+CLASS_PATTERN = re.compile(r"(?<![\w-])nb-[a-z0-9]+(?:-{1,2}[a-z0-9]+)*")
+VARIABLE_PATTERN = re.compile(r"--n[bt]-[a-z0-9-]*[a-z0-9]")
+
+
+def estimate(text: str) -> dict:
+    return {"chars": len(text), "tokens": len(text) // 4}
+
+
+def identifiers(text: str) -> set:
+    return set(CLASS_PATTERN.findall(text)) | set(VARIABLE_PATTERN.findall(text))
+
+
+def context_names(context) -> set:
+    """Identifiers a compact context offers (class names out of selectors, variable names)"""
+    return identifiers(context.render_selectors()) | {entry.name for entry in context.variables}
+
+
+def render(generator: SimpleGeneratorService, request: str, framework: str, budget) -> str:
+    """Instruction with the full reference sections (budget None) or a compact context"""
+    nucleus = generator.pipeline.nucleus_context
+    default_budget = nucleus.token_budget
+    generator.nucleus_context = None if budget is None else nucleus
+    nucleus.token_budget = budget or default_budget
+    try:
+        return generator._create_ultimate_instruction(request, framework, "JavaScript", "NucleusCSS", "Bench")
+    finally:
+        generator.nucleus_context = nucleus
+        nucleus.token_budget = default_budget
+
+
+def bench_prompts(generator: SimpleGeneratorService, budgets: list) -> list:
+    nucleus = generator.pipeline.nucleus_context
+    results = []
+    for framework in ("React", "Vue"):
+        for request in SAMPLE_REQUESTS:
+            full = render(generator, request, framework, None)
+            row = {"framework": framework, "request": request, "full": estimate(full), "compact": {}}
+            # Catalog names the full prompt spells out (wildcards such as --nt-color-* are not names)
+            full_names = identifiers(full) - nucleus.unknown_names(identifiers(full))
+            for budget in budgets:
+                compact = render(generator, request, framework, budget)
+                offered = identifiers(compact.split("NUCLEUS CSS REFERENCE", 1)[-1].split("\n\n", 1)[0])
+                compact_names = identifiers(compact) - nucleus.unknown_names(identifiers(compact))
+                row["compact"][str(budget)] = {
+                    **estimate(compact),
+                    "saved_tokens": (len(full) - len(compact)) // 4,
+                    "full_names_offered": round(len(full_names & offered) / max(1, len(full_names)), 3),
+                    # Names the rules or examples use without the reference defining them
+                    "mentioned_outside_context": sorted(compact_names - offered)
+                }
+            results.append(row)
+    return results
+
+
+def bench_page_prompts(generator: SimpleGeneratorService, budgets: list) -> dict:
+    pipeline = generator.pipeline
+    nucleus = pipeline.nucleus_context
+    template = pipeline._load_prompt("page/gen/user.md")
+    plan = {"description": SAMPLE_REQUESTS[0], "pages": [SAMPLE_PAGE]}
+    base = {"PROJECT_PLAN": json.dumps(plan, indent=2), "PAGE_NAME": SAMPLE_PAGE["name"]}
+
+    full = pipeline._fill(template, {
+        **base,
+        "CSS_VARIABLES": pipeline._load_prompt("css/variables_small.md"),
+        "CSS_SELECTORS": pipeline._load_prompt("css/selectors.md")
+    })
+    result = {"page": SAMPLE_PAGE["name"], "full": estimate(full), "compact": {}}
+    default_budget = nucleus.token_budget
+    try:
+        for budget in budgets:
+            nucleus.token_budget = budget
+            values = {**base, **pipeline._page_css_values(plan, SAMPLE_PAGE)}
+            result["compact"][str(budget)] = estimate(pipeline._fill(template, values))
+    finally:
+        nucleus.token_budget = default_budget
+    return result
+
+
+def validity(generator: SimpleGeneratorService, response: str, request: str, budget: int) -> dict:
+    nucleus = generator.pipeline.nucleus_context
+    project = generator._parse_project_response(response, "Bench")
+    if project is None or not project.files:
+        return {"parsed": False}
+    used = set()
+    for content in project.files.values():
+        used |= identifiers(content)
+    offered = context_names(nucleus.select(request or project.instructions, budget))
+    unknown = nucleus.unknown_names(used)
+    return {
+        "parsed": True,
+        "files": len(project.files),
+        "repaired_files": len(project.repaired_files),
+        "identifiers_used": len(used),
+        "unknown_identifiers": sorted(unknown),
+        "outside_context": sorted(used - offered - unknown)
+    }
+
+
+def bench_recorded(generator: SimpleGeneratorService, responses_dir: Path, budget: int) -> list:
+    results = []
+    for path in sorted(responses_dir.iterdir()):
+        if path.is_file():
+            results.append({"response": path.name, **validity(generator, path.read_text(encoding="utf-8"), "", budget)})
+    return results
+
+
+async def bench_live(generator: SimpleGeneratorService, budget: int) -> list:
+    results = []
+    for framework in ("React", "Vue"):
+        for request in SAMPLE_REQUESTS:
+            for variant, variant_budget in (("full", None), ("compact", budget)):
+                prompt = render(generator, request, framework, variant_budget)
+                try:
+                    response = await generator._call_llm(prompt)
+                    outcome = validity(generator, response, request, budget)
+                except Exception as e:
+                    outcome = {"parsed": False, "error": str(e)}
+                results.append({
+                    "framework": framework, "request": request, "variant": variant,
+                    "prompt_tokens": len(prompt) // 4, **outcome
+                })
+    return results
+
+
+async def run(args) -> dict:
+    logging.getLogger().setLevel(args.log_level)
+    generator = SimpleGeneratorService()
+    nucleus = generator.pipeline.nucleus_context
+    if nucleus is None:
+        raise SystemExit("Nucleus catalog not found (set NUCLEUS_CATALOG_PATH) or NUCLEUS_CONTEXT_COMPACT=false")
+    default_budget = nucleus.token_budget
+
+    results = {
+        "benchmark": "nucleus_context",
+        "timestamp": datetime.now().isoformat(),
+        "catalog_version": nucleus.version,
+        "catalog_entries": len(nucleus.entries),
+        "default_budget": default_budget,
+        "prompts": bench_prompts(generator, args.budgets),
+        "page_prompt": bench_page_prompts(generator, args.budgets)
+    }
+    if args.responses:
+        results["recorded"] = bench_recorded(generator, Path(args.responses), default_budget)
+    if args.live:
+        results["live"] = await bench_live(generator, default_budget)
+        await generator.llm.close()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument(
+        "--budgets", type=lambda value: [int(budget) for budget in value.split(",")], default=[400, 800, 1500]
+    )
+    parser.add_argument("--responses", help="directory of recorded NucleusCSS responses to check")
+    parser.add_argument("--live", action="store_true", help="generate with the configured Azure OpenAI deployment")
+    parser.add_argument("--log-level", default="ERROR")
+    parser.add_argument("--output", help="write results to this file instead of stdout")
+    args = parser.parse_args()
+
+    with contextlib.redirect_stdout(sys.stderr):
+        results = asyncio.run(run(args))
+
+    output = json.dumps(results, indent=2)
+    if args.output:
+        Path(args.output).write_text(output + "\n", encoding="utf-8")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+"""
+Check that PROMPT_LAYOUT=prefix keeps the static part of the prompt byte-stable.
+
+Several different requests are generated for every framework/language/styling
+variant through SimpleGeneratorService with the stub LLM client (offline). For
+each variant all requests must send identical leading messages (system message
+and rendered template) and differ only in the final request block. The stub
+simulates provider prompt caching, so the token usage tracked per generation
+shows the cached share from the second request on. The inline layout is run for
+comparison (longest common prefix of its prompts).
+
+Exits with status 1, naming the variant and request, if any variant's prefix
+differs between requests or a repeated prefix gets no cached tokens, so the
+check can gate CI.
+
+Usage (from dhp-ai-web-builder-agent/):
+    python benchmarks/check_prompt_prefix.py [--requests 4] [--output results.json]
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+REPO_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_DIR))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+os.environ["OUTPUT_PATH"] = tempfile.mkdtemp(prefix="check-prompt-prefix-")
+os.environ["GENERATION_CACHE_ENABLED"] = "false"
+os.environ["VALIDATION_ENABLED"] = "false"
+os.environ.setdefault("AZURE_ENDPOINT", "https://bench.invalid")
+os.environ.setdefault("AZURE_MODEL", "bench")
+os.environ.setdefault("AZURE_API_VERSION", "2024-02-01")
+os.environ.setdefault("AZURE_OPENAI_API_KEY", "bench")
+
+from stubs import StubLLMClient, load_responses  # noqa: E402
+
+from app.main.services import llm_client, metrics  # noqa: E402
+
+VARIANTS = [
+    ("React", "JavaScript", "TailwindCSS"),
+    ("React", "TypeScript", "NucleusCSS"),
+    ("Vue", "JavaScript", "NucleusCSS"),
+    ("Vue", "TypeScript", "TailwindCSS"),
+]
+REQUESTS = [
+    ("Recipes", "A recipe sharing site with search and favourites"),
+    ("Clinic", "A healthcare appointment booking site with a contact form"),
+    ("Metrics", "An analytics dashboard with KPI cards and a data table"),
+    ("Shop", "An online store with a product grid and shopping cart"),
+    ("Agency", "A company landing page with testimonials and an FAQ"),
+]
+
+
+def common_prefix_length(texts: list) -> int:
+    return len(os.path.commonprefix(texts))
+
+
+def prefix_mismatches(sent: list, cached_tokens: list) -> list:
+    """Why the leading messages of a prefix-layout variant are not a stable, cached prefix"""
+    problems = []
+    first = sent[0][:-1]
+    for index, messages in enumerate(sent[1:], start=2):
+        leading = messages[:-1]
+        if len(leading) != len(first):
+            problems.append(f"request {index} sends {len(leading)} leading messages, request 1 sent {len(first)}")
+            continue
+        differing = [position for position, (a, b) in enumerate(zip(first, leading)) if a != b]
+        if differing:
+            problems.append(f"request {index} message {differing[0]} differs from request 1")
+    for index, cached in enumerate(cached_tokens[1:], start=2):
+        if not cached:
+            problems.append(f"request {index} got no cached prompt tokens")
+    return problems
+
+
+async def run_variant(generator, stub, variant: tuple, requests: list, layout: str, stream: bool) -> dict:
+    framework, language, styling = variant
+    generator.prompt_layout = layout
+    first_request = len(stub.requests)
+    usages = []
+    for index, (project_name, instructions) in enumerate(requests):
+        with metrics.track_usage() as usage:
+            await generator.generate_complete_project(
+                instructions, framework, language, styling, project_name,
+                stream=stream and index % 2 == 1, bypass_cache=True
+            )
+        usages.append(usage)
+
+    sent = stub.requests[first_request:]
+    prompt_texts = ["\n".join(message["content"] for message in messages) for messages in sent]
+    cached_tokens = [usage["cached_tokens"] for usage in usages]
+    mismatches = prefix_mismatches(sent, cached_tokens) if layout == "prefix" else []
+    return {
+        "variant": "/".join(variant),
+        "layout": layout,
+        "requests": len(sent),
+        "prefix_stable": not mismatches,
+        "mismatches": mismatches,
+        "common_prefix_tokens": common_prefix_length(prompt_texts) // 4,
+        "prompt_tokens": [usage["prompt_tokens"] for usage in usages],
+        "cached_tokens": cached_tokens
+    }
+
+
+async def run(args) -> dict:
+    stub = StubLLMClient(load_responses())
+    llm_client._llm_client = stub
+
+    from app.main.services.generator import SimpleGeneratorService
+
+    generator = SimpleGeneratorService()
+    requests = REQUESTS[:args.requests]
+    results = []
+    for variant in VARIANTS:
+        for layout in ("inline", "prefix"):
+            results.append(await run_variant(generator, stub, variant, requests, layout, stream=True))
+    return {"check": "prompt_prefix", "results": results, "ok": all(result["prefix_stable"] for result in results)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=4, help=f"requests per variant (max {len(REQUESTS)})")
+    parser.add_argument("--output", help="write results to this file instead of stdout")
+    args = parser.parse_args()
+
+    with contextlib.redirect_stdout(sys.stderr):
+        results = asyncio.run(run(args))
+
+    output = json.dumps(results, indent=2)
+    if args.output:
+        Path(args.output).write_text(output + "\n", encoding="utf-8")
+    else:
+        print(output)
+    failures = [
+        f"{result['variant']} ({result['layout']}): {problem}"
+        for result in results["results"] for problem in result["mismatches"]
+    ]
+    if failures:
+        sys.exit("Prompt prefix check failed:\n" + "\n".join(failures))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+"""
+Offline stand-ins for the Azure services used by the benchmarks.
+
+StubLLMClient replays recorded responses from fixtures/responses through the same
+interface as app.main.services.llm_client.LLMClient (plain and streamed
+completions) and records every request's messages. It simulates provider prompt
+caching: a request whose leading messages were seen before reports them as
+cached_tokens. LocalStorage mimics StorageService on a local directory.
+"""
+import asyncio
+import itertools
+import json
+import os
+import shutil
+from pathlib import Path
+from types import SimpleNamespace
+from typing import IO, Iterator, List, Optional, Set, Tuple
+
+from app.main.services import metrics
+
+FIXTURES_DIR = Path(__file__).resolve().parent / "fixtures" / "responses"
+
+
+def load_responses(fixtures_dir: Path = FIXTURES_DIR) -> List[Tuple[str, str]]:
+    """(name, text) of every recorded response, valid and malformed"""
+    return [
+        (path.name, path.read_text(encoding="utf-8"))
+        for path in sorted(fixtures_dir.iterdir())
+        if path.is_file()
+    ]
+
+
+class StubLLMClient:
+    """
+    Replays recorded responses round-robin. latency is the simulated time to the first
+    token; streamed responses are split into chunk_chars pieces with
+    chunk_interval seconds between them.
+
+    Like Azure OpenAI, caching needs a prefix of at least 1024 tokens and is
+    reported in 128-token increments.
+    """
+
+    CACHE_MIN_TOKENS = 1024
+    CACHE_INCREMENT = 128
+
+    def __init__(
+        self,
+        responses: List[Tuple[str, str]],
+        latency: float = 0.0,
+        chunk_chars: int = 256,
+        chunk_interval: float = 0.0
+    ):
+        self.responses = responses
+        self.latency = latency
+        self.chunk_chars = chunk_chars
+        self.chunk_interval = chunk_interval
+        self._cycle = itertools.cycle(range(len(responses)))
+        self.calls = 0
+        self.requests: List[list] = []
+        self._seen_prefixes: Set[str] = set()
+
+    def next_response(self) -> str:
+        return self.responses[next(self._cycle)][1]
+
+    def _cached_tokens(self, messages: list) -> int:
+        """Tokens of the longest run of leading messages already sent by an earlier request"""
+        cached = 0
+        for end in range(1, len(messages)):
+            key = json.dumps(messages[:end], sort_keys=True)
+            tokens = sum(len(message.get("content") or "") for message in messages[:end]) // 4
+            if key in self._seen_prefixes and tokens >= self.CACHE_MIN_TOKENS:
+                cached = tokens - tokens % self.CACHE_INCREMENT
+            self._seen_prefixes.add(key)
+        return cached
+
+    async def chat_completion(self, messages: list, stream: bool = False, **kwargs):
+        self.calls += 1
+        self.requests.append(messages)
+        text = self.next_response()
+        prompt_tokens = sum(len(message.get("content") or "") for message in messages) // 4
+        usage = SimpleNamespace(
+            prompt_tokens=prompt_tokens,
+            completion_tokens=len(text) // 4,
+            total_tokens=prompt_tokens + len(text) // 4,
+            prompt_tokens_details=SimpleNamespace(cached_tokens=self._cached_tokens(messages))
+        )
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if stream:
+            return self._stream(text, usage)
+        metrics.record_tokens(usage)
+        message = SimpleNamespace(content=text)
+        return SimpleNamespace(choices=[SimpleNamespace(message=message, finish_reason="stop")], usage=usage)
+
+    async def _stream(self, text: str, usage):
+        for start in range(0, len(text), self.chunk_chars):
+            if self.chunk_interval:
+                await asyncio.sleep(self.chunk_interval)
+            delta = SimpleNamespace(content=text[start:start + self.chunk_chars])
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=delta, finish_reason=None)], usage=None)
+        # Final usage chunk, as sent with stream_options.include_usage
+        metrics.record_tokens(usage)
+        yield SimpleNamespace(choices=[], usage=usage)
+
+    async def close(self):
+        pass
+
+
+class LocalStorage:
+    """StorageService look-alike that keeps uploaded archives in a local directory"""
+
+    PROJECTS_DIRECTORY = "web-builder-projects"
+
+    def __init__(self, root: str):
+        self.root = Path(root)
+        (self.root / self.PROJECTS_DIRECTORY).mkdir(parents=True, exist_ok=True)
+        self.uploads = 0
+        self.bytes_uploaded = 0
+
+    def upload_zip_file(self, local_zip_path: str):
+        with open(local_zip_path, "rb") as f:
+            self.upload_zip_stream(os.path.basename(local_zip_path), f, os.path.getsize(local_zip_path))
+
+    def upload_zip_stream(self, file_name: str, stream: IO[bytes], length: int) -> str:
+        file_share_path = self.PROJECTS_DIRECTORY + "/" + file_name
+        stream.seek(0)
+        with open(self.root / file_share_path, "wb") as f:
+            shutil.copyfileobj(stream, f)
+        self.uploads += 1
+        self.bytes_uploaded += length
+        return file_share_path
+
+    def get_file_properties(self, file_share_path: str) -> Optional[Tuple[int, str]]:
+        path = self.root / file_share_path
+        if not path.is_file():
+            return None
+        stat = path.stat()
+        return stat.st_size, f'"{stat.st_mtime_ns:x}"'
+
+    def iter_file_range(self, file_share_path: str, offset: int, length: int, chunk_size: int) -> Iterator[bytes]:
+        with open(self.root / file_share_path, "rb") as f:
+            f.seek(offset)
+            remaining = length
+            while remaining > 0:
+                chunk = f.read(min(chunk_size, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                yield chunk
@@ -6,7 +6,14 @@ allowedHosts="$3"
 
 cd ./projects || exit
 
-unzip $folder.zip -d $folder
+# ProcessService may already have unpacked the project
+if [[ ! -d "$folder" ]]; then
+  unzip $folder.zip -d $folder
+elif [[ -f "$folder.zip" ]]; then
+  # Relaunch: an earlier launch replaced the update_me marker, so restore the archived
+  # vite.config before applying this launch's port and allowed hosts
+  unzip -o -q "$folder.zip" "vite.config.*" -d "$folder"
+fi
 
 cd "$folder" || exit
 
@@ -44,7 +51,17 @@ awk -v replacement="$SERVER_CONFIG" '
 
 mv "$TMP_FILE" "$FILE"
 
-npm install
+# node_modules is provisioned from the shared cache when available
+if [[ ! -d "node_modules" ]]; then
+  npm install
+fi
+
+# Under the service's preview supervisor Vite replaces this shell so the supervisor
+# owns the process (and its process group) directly
+if [[ -n "$PREVIEW_SUPERVISED" ]]; then
+  exec npm run dev -- --port $port
+fi
+
 npm run dev -- --port $port &
 
 disown
\ No newline at end of file